@@ -0,0 +1,4 @@
+"""
+Offline benchmarks of the bot: synthetic interactions go through the real command tree, cogs and database manager,
+with a local stand-in for Discord. Run `python -m benchmarks --help`.
+"""
@@ -0,0 +1,172 @@
+"""
+Runs the benchmarks and saves the results as JSON.
+
+    python -m benchmarks --players 10000 --iterations 2000 --compare benchmarks/results/previous.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import discord
+
+from custom.client import MyClient
+from custom.database import DatabaseManager
+from custom.ratelimit import RateLimiter
+
+from .scenarios import ALL, Scenarios, peak_rss_mb
+from .transport import FakeTransport
+
+MIGRATIONS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "databases", "schemas", "migrations"
+)
+FIRST_PLAYER_ID = 10**17
+
+
+async def seed_players(manager: DatabaseManager, count: int, seed: int) -> List[int]:
+    rng = random.Random(seed)
+    player_ids = [FIRST_PLAYER_ID + index for index in range(count)]
+
+    async with manager.transaction() as connection:
+        await connection.executemany(
+            "INSERT INTO players (user_id, level, experience, gold, class) VALUES (?, ?, ?, ?, ?)",
+            [
+                (
+                    user_id,
+                    rng.randint(1, 100),
+                    rng.randint(0, 10**6),
+                    rng.randint(0, 10**5),
+                    rng.choice(("Warrior", "Elf")),
+                )
+                for user_id in player_ids
+            ],
+        )
+
+    await manager.load_leaderboard(manager.connection)
+    return player_ids
+
+
+async def run(arguments: argparse.Namespace) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as folder:
+        manager = DatabaseManager(
+            os.path.join(folder, "benchmark.db"),
+            database_migrations_path=MIGRATIONS_PATH,
+            read_pool_size=arguments.read_pool_size,
+        )
+        client = MyClient(
+            command_prefix="!",
+            intents=discord.Intents.default(),
+            database_manager=manager,
+            extensions_folders=["events", "extensions"],
+            command_hashes_path=None,
+            sync_on_startup=False,
+            # Random players would hit the limits unevenly, only the throttled scenario sets one
+            rate_limiter=RateLimiter(None),
+        )
+
+        async with client, manager:
+            player_ids = await seed_players(manager, arguments.players, arguments.seed)
+
+            transport = FakeTransport(client)
+            await client.setup_hook()
+
+            scenarios = Scenarios(
+                client,
+                transport,
+                player_ids,
+                iterations=arguments.iterations,
+                concurrency=arguments.concurrency,
+                seed=arguments.seed,
+            )
+            results = await scenarios.run(arguments.scenarios)
+            queries = client.metrics.summary(client.metrics.queries)
+
+    return {
+        "started_at": arguments.started_at,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "discord.py": discord.__version__,
+        "options": {
+            "players": arguments.players,
+            "iterations": arguments.iterations,
+            "concurrency": arguments.concurrency,
+            "read_pool_size": arguments.read_pool_size,
+            "seed": arguments.seed,
+        },
+        "scenarios": {name: result.to_dict() for name, result in results.items()},
+        "queries": [
+            {"name": name, "count": count, "p50_ms": p50 * 1000, "p95_ms": p95 * 1000, "p99_ms": p99 * 1000}
+            for name, count, p50, p95, p99 in queries
+        ],
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(report: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> None:
+    print(f"{'scenario':<12} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+
+    for name, result in report["scenarios"].items():
+        latency = result["latency_ms"]
+        line = (
+            f"{name:<12} {result['throughput']:>10.1f} {latency['p50']:>9.3f}"
+            f" {latency['p95']:>9.3f} {latency['p99']:>9.3f} {result['errors']:>7}"
+        )
+
+        before = (previous or {}).get("scenarios", {}).get(name)
+        if before and before["throughput"] and before["latency_ms"]["p95"]:
+            line += (
+                f"   throughput x{result['throughput'] / before['throughput']:.2f},"
+                f" p95 x{latency['p95'] / before['latency_ms']['p95']:.2f}"
+            )
+
+        print(line)
+
+    if report["peak_rss_mb"] is not None:
+        print(f"peak RSS: {report['peak_rss_mb']:.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks the bot offline, through a fake Discord transport and a temporary database.",
+    )
+    parser.add_argument("--players", type=int, default=10000, help="Players seeded in the database.")
+    parser.add_argument("--iterations", type=int, default=1000, help="Operations of each scenario.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Operations at the same time.")
+    parser.add_argument("--read-pool-size", type=int, default=0, help="Read connections of the database manager.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scenarios", nargs="+", choices=ALL, default=list(ALL))
+    parser.add_argument("--output", help="Where to save the results. Defaults to benchmarks/results/<date>.json.")
+    parser.add_argument("--compare", help="Results of an earlier run to compare with.")
+    arguments = parser.parse_args()
+
+    now = datetime.datetime.now()
+    arguments.started_at = now.isoformat(timespec="seconds")
+    output = arguments.output or os.path.join(
+        os.path.dirname(__file__), "results", now.strftime(r"%Y-%m-%d_%H-%M-%S.json")
+    )
+
+    previous = None
+    if arguments.compare:
+        with open(arguments.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+
+    report = asyncio.run(run(arguments))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print_report(report, previous)
+    print(f"Saved to {output}")
+
+
+main()
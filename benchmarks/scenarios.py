@@ -0,0 +1,370 @@
+"""
+The benchmark scenarios, and the load runner measuring them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import random
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from custom.client import MyClient
+from custom.combat import Boss
+from custom.exceptions import InsufficientFunds
+from custom.paginator import EmbedPaginator
+from custom.ratelimit import RateLimit
+
+from .transport import FakeResponse, FakeTransport
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+OWNER_ID = 1
+
+
+def peak_rss_mb() -> Optional[float]:
+    """`Function`\n
+    Gets the peak resident memory of the process.
+
+    Returns:
+        `Optional[float]`: The peak in MiB, or `NoneType` where `resource` isn't available.
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def percentile(samples: Sequence[float], fraction: float) -> float:
+    """`Function`\n
+    Gets a percentile of sorted samples, by the nearest rank.
+
+    Args:
+        `samples` (`Sequence[float]`): The sorted samples.
+
+        `fraction` (`float`): The percentile, between 0 and 1.
+
+    Returns:
+        `float`: The percentile, `0.0` without samples.
+    """
+    if not samples:
+        return 0.0
+
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+class ScenarioResult:
+    """The measurements of one scenario.
+
+    Args:
+        `name` (`str`): The name of the scenario.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.samples: List[float] = []
+        self.errors: int = 0
+        self.seconds: float = 0.0
+        self.extra: Dict[str, Any] = {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        samples = sorted(self.samples)
+
+        return {
+            "operations": len(samples),
+            "errors": self.errors,
+            "seconds": round(self.seconds, 4),
+            "throughput": round(len(samples) / self.seconds, 2) if self.seconds else 0.0,
+            "latency_ms": {
+                "mean": round(sum(samples) / len(samples) * 1000, 3) if samples else 0.0,
+                "p50": round(percentile(samples, 0.50) * 1000, 3),
+                "p95": round(percentile(samples, 0.95) * 1000, 3),
+                "p99": round(percentile(samples, 0.99) * 1000, 3),
+                "max": round(samples[-1] * 1000, 3) if samples else 0.0,
+            },
+            "peak_rss_mb": peak_rss_mb(),
+            **self.extra,
+        }
+
+
+async def run_load(
+    name: str,
+    operation: Callable[[int], Awaitable[Any]],
+    *,
+    iterations: int,
+    concurrency: int,
+) -> ScenarioResult:
+    """`Coro`\n
+    Runs an operation `iterations` times, `concurrency` at a time, and measures each run.
+
+    Args:
+        `name` (`str`): The name of the scenario.
+
+        `operation` (`Callable[[int], Awaitable[Any]]`): Called with the iteration number.
+
+        `iterations` (`int`): The number of runs.
+
+        `concurrency` (`int`): The number of runs at the same time.
+
+    Returns:
+        `ScenarioResult`: The latencies of the successful runs, and the number of failed ones.
+    """
+    result = ScenarioResult(name)
+    counter = itertools.count()
+
+    async def worker() -> None:
+        while (index := next(counter)) < iterations:
+            started = time.perf_counter()
+
+            try:
+                await operation(index)
+            except Exception:
+                result.errors += 1
+            else:
+                result.samples.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    result.seconds = time.perf_counter() - started
+
+    return result
+
+
+class Scenarios:
+    """The benchmark scenarios, run on a client connected to a database seeded with `player_ids`.
+
+    Args:
+        `client` (`MyClient`): The client, with its extensions loaded.
+
+        `transport` (`FakeTransport`): The fake transport of the client.
+
+        `player_ids` (`List[int]`): The seeded players.
+
+        `iterations` (`int`): The operations of each scenario.
+
+        `concurrency` (`int`): The operations at the same time.
+
+        `seed` (`int`): The seed of the random choices.
+    """
+
+    def __init__(
+        self,
+        client: MyClient,
+        transport: FakeTransport,
+        player_ids: List[int],
+        *,
+        iterations: int,
+        concurrency: int,
+        seed: int,
+    ) -> None:
+        self.client = client
+        self.transport = transport
+        self.player_ids = player_ids
+        self.iterations = iterations
+        self.concurrency = concurrency
+        self.random = random.Random(seed)
+
+        client.owner_id = OWNER_ID
+
+    def player(self) -> int:
+        return self.random.choice(self.player_ids)
+
+    async def load(
+        self, name: str, operation: Callable[[int], Awaitable[Any]]
+    ) -> ScenarioResult:
+        return await run_load(
+            name, operation, iterations=self.iterations, concurrency=self.concurrency
+        )
+
+    async def ping(self) -> ScenarioResult:
+        """`/ping` from random players."""
+        return await self.load(
+            "ping",
+            lambda _: self.transport.command("ping", user_id=self.player()),
+        )
+
+    async def errors(self) -> ScenarioResult:
+        """`/stats` from players who aren't the owner, answered by the `Errors` cog."""
+        return await self.load(
+            "errors",
+            lambda _: self.transport.command("stats", user_id=self.player()),
+        )
+
+    async def throttled(self) -> ScenarioResult:
+        """`/ping` spammed by a single user, answered by the rate limit after the first few uses."""
+        limiter = self.client.rate_limiter
+        limiter.set_limit(RateLimit(5, 10.0), command="ping")
+        throttled = limiter.throttled
+
+        try:
+            result = await self.load(
+                "throttled",
+                lambda _: self.transport.command("ping", user_id=self.player_ids[0]),
+            )
+        finally:
+            limiter.set_limit(None, command="ping")
+
+        result.extra["throttled"] = limiter.throttled - throttled
+        return result
+
+    async def leaderboard(self) -> ScenarioResult:
+        """`/leaderboard` on a random ranking, from random players."""
+        rankings = ("level", "experience", "gold")
+
+        async def operation(_: int) -> None:
+            response = await self.transport.command(
+                "leaderboard",
+                user_id=self.player(),
+                ranking=self.random.choice(rankings),
+            )
+            self.transport.forget(response)
+
+        return await self.load("leaderboard", operation)
+
+    async def autocomplete(self) -> ScenarioResult:
+        """`/item` autocompletes of the first letters of random item names, some with a typo."""
+        names = [item.name for item in self.client.database_manager.items]
+
+        async def operation(_: int) -> None:
+            typed = self.random.choice(names)[: self.random.randint(1, 8)]
+
+            if len(typed) > 3 and self.random.random() < 0.3:
+                typed = typed[:-2] + typed[-1] + typed[-2]
+
+            await self.transport.autocomplete(
+                "item", "item", typed, user_id=self.player()
+            )
+
+        return await self.load("autocomplete", operation)
+
+    async def profile(self) -> ScenarioResult:
+        """`/profile` of random players, rendered the first time and served from the card cache after."""
+        cards = self.client.cards
+        renders = cards.renders
+
+        result = await self.load(
+            "profile",
+            lambda _: self.transport.command("profile", user_id=self.player()),
+        )
+
+        result.extra["renders"] = cards.renders - renders
+        return result
+
+    async def paginator(self, sessions: int = 16) -> ScenarioResult:
+        """Button presses on `sessions` open leaderboards, measured until the press is acknowledged."""
+        messages: List[FakeResponse] = [
+            await self.transport.command(
+                "leaderboard", user_id=self.player(), ranking="gold"
+            )
+            for _ in range(sessions)
+        ]
+        requested = EmbedPaginator.total_edits_requested
+        sent = EmbedPaginator.total_edits_sent
+
+        async def operation(index: int) -> None:
+            message = messages[index % sessions]
+            label = self.random.choice(("<", ">", "<<", ">>"))
+
+            try:
+                button = message.component(label)
+            except KeyError:
+                return
+
+            if button.get("disabled"):
+                label = ">" if label in ("<", "<<") else "<"
+
+            await self.transport.press(message, label, user_id=self.player())
+
+        result = await self.load("paginator", operation)
+
+        # Let the coalesced edits go out before counting them
+        await asyncio.sleep(0.5)
+        for message in messages:
+            self.transport.forget(message)
+
+        result.extra["edits_requested"] = EmbedPaginator.total_edits_requested - requested
+        result.extra["edits_sent"] = EmbedPaginator.total_edits_sent - sent
+        return result
+
+    async def players(self) -> ScenarioResult:
+        """Reads, cached updates, payouts and transfers of random players, without the command tree."""
+        manager = self.client.database_manager
+
+        async def operation(_: int) -> None:
+            roll = self.random.random()
+
+            if roll < 0.6:
+                await manager.get_player(self.player())
+
+            elif roll < 0.85:
+                await manager.update_player(
+                    self.player(), health=self.random.randint(1, 100)
+                )
+
+            elif roll < 0.95:
+                await manager.transactions.payout(
+                    self.random.sample(self.player_ids, 5), gold=10, experience=10
+                )
+
+            else:
+                sender_id, receiver_id = self.random.sample(self.player_ids, 2)
+
+                try:
+                    await manager.transactions.transfer(sender_id, receiver_id, 10)
+                except InsufficientFunds:
+                    pass
+
+        result = await self.load("players", operation)
+
+        started = time.perf_counter()
+        result.extra["flushed"] = await manager.flush_players()
+        result.extra["flush_seconds"] = round(time.perf_counter() - started, 4)
+        return result
+
+    async def combat(self, party: int = 50) -> ScenarioResult:
+        """Raids of `party` random players against two bosses, resolved and saved in one transaction each."""
+        engine = self.client.database_manager.combat
+        bosses = [Boss("Dragon", 20000, 60, 20, hits=5), Boss("Imp", 800, 15, 5)]
+        rounds = engine.rounds
+
+        result = await self.load(
+            "combat",
+            lambda index: engine.raid(
+                self.random.sample(self.player_ids, party), bosses, seed=index, gold=10
+            ),
+        )
+
+        result.extra["rounds"] = engine.rounds - rounds
+        return result
+
+    async def run(self, names: Sequence[str]) -> Dict[str, ScenarioResult]:
+        """`Coro`\n
+        Runs scenarios one after the other.
+
+        Args:
+            `names` (`Sequence[str]`): The names of the scenarios, see `ALL`.
+
+        Returns:
+            `Dict[str, ScenarioResult]`: The result of each scenario.
+        """
+        return {name: await getattr(self, name)() for name in names}
+
+
+ALL = (
+    "ping",
+    "errors",
+    "throttled",
+    "autocomplete",
+    "leaderboard",
+    "profile",
+    "paginator",
+    "players",
+    "combat",
+)
@@ -0,0 +1,376 @@
+"""
+Local stand-in for the Discord gateway and HTTP API.
+
+Interactions are fed to the real `INTERACTION_CREATE` parser of the client, so they go through the command tree, the views and the cogs.
+Their responses are answered by `FakeWebhookAdapter` instead of Discord.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import itertools
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import discord
+from discord.http import Route
+from discord.webhook.async_ import AsyncWebhookAdapter, async_context
+
+APPLICATION_ID = 1000000000000000001
+GUILD_ID = 1000000000000000002
+CHANNEL_ID = 1000000000000000003
+
+
+class FakeWebSocket:
+    """Replaces `MyClient.ws`, so that `latency` and `change_presence` work without a gateway connection."""
+
+    open = False
+
+    def __init__(self, latency: float = 0.05) -> None:
+        self.latency = latency
+
+    async def change_presence(self, **kwargs: Any) -> None:
+        pass
+
+
+class FakeResponse:
+    """The responses sent to one interaction.
+
+    Args:
+        `interaction_id` (`int`): The ID of the interaction.
+
+        `sent_at` (`float`): The `time.perf_counter` value at which the interaction was dispatched.
+    """
+
+    def __init__(self, interaction_id: int, sent_at: float) -> None:
+        self.interaction_id = interaction_id
+        self.sent_at = sent_at
+        self.first = asyncio.get_running_loop().create_future()
+        self.requests: List[Tuple[str, str, Optional[Dict[str, Any]]]] = []
+        self.message: Optional[Dict[str, Any]] = None
+
+    @property
+    def latency(self) -> float:
+        """The seconds between the dispatch and the first response."""
+        return self.first.result() - self.sent_at
+
+    def component(self, label: str) -> Dict[str, Any]:
+        """`Method`\n
+        Gets a component of the sent message by its label.
+
+        Args:
+            `label` (`str`): The label.
+
+        Raises:
+            `KeyError`: Raised if no component has the label.
+
+        Returns:
+            `Dict[str, Any]`: The component payload.
+        """
+        for row in (self.message or {}).get("components", []):
+            for component in row["components"]:
+                if component.get("label") == label:
+                    return component
+
+        raise KeyError(label)
+
+
+class FakeWebhookAdapter(AsyncWebhookAdapter):
+    """Answers the interaction webhook routes (responses, followups and edits) locally."""
+
+    def __init__(self, transport: FakeTransport) -> None:
+        super().__init__()
+        self.transport = transport
+
+    async def request(
+        self,
+        route: Route,
+        session: Any,
+        *,
+        payload: Optional[Dict[str, Any]] = None,
+        multipart: Optional[List[Dict[str, Any]]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        if payload is None and multipart:
+            payload = json.loads(multipart[0]["value"])
+
+        response = self.transport.responses.get(route.webhook_token)
+        if response is None:
+            raise RuntimeError(f"Unknown interaction token {route.webhook_token!r}")
+
+        response.requests.append((route.method, route.path, payload))
+        if not response.first.done():
+            response.first.set_result(time.perf_counter())
+
+        if route.path.endswith("/callback"):
+            # Only message responses create a message, deferrals don't
+            if payload and payload.get("type") == 4:
+                response.message = self.transport.message_payload(
+                    response, payload.get("data", {})
+                )
+            return None
+
+        if route.method == "GET":
+            return response.message or self.transport.message_payload(response, {})
+
+        message = self.transport.message_payload(response, payload or {})
+        if "messages/@original" in route.path:
+            response.message = message
+
+        return message
+
+
+class FakeTransport:
+    """Feeds interactions to a client and collects its responses, without connecting to Discord.
+
+    Args:
+        `client` (`discord.Client`): The client. Its setup hook must have run already.
+
+        `timeout` (`float`, optional): The seconds to wait for the first response of an interaction. Defaults to `10.0`.
+
+    Example:
+    ```python
+    transport = FakeTransport(client)
+    response = await transport.command("ping", user_id=1)
+    print(response.latency)
+    ```
+    """
+
+    def __init__(self, client: discord.Client, *, timeout: float = 10.0) -> None:
+        self.client = client
+        self.timeout = timeout
+        self.adapter = FakeWebhookAdapter(self)
+        self.responses: Dict[str, FakeResponse] = {}
+        self._ids = itertools.count(2000000000000000000)
+
+        client._connection.application_id = APPLICATION_ID
+        client.ws = FakeWebSocket()  # type: ignore
+        client.http.request = self._http_request  # type: ignore
+
+        # Tasks created from now on (the command tree and the views create one per interaction) inherit the adapter
+        async_context.set(self.adapter)
+
+    async def _http_request(self, route: Route, **kwargs: Any) -> Any:
+        raise RuntimeError(f"Not served by the fake transport: {route.method} {route.path}")
+
+    def next_id(self) -> int:
+        """`Method`\n
+        Gets a new snowflake.
+
+        Returns:
+            `int`: The snowflake.
+        """
+        return next(self._ids)
+
+    def user_payload(self, user_id: int) -> Dict[str, Any]:
+        return {
+            "id": str(user_id),
+            "username": f"player{user_id}",
+            "discriminator": "0001",
+            "avatar": None,
+        }
+
+    def member_payload(self, user_id: int) -> Dict[str, Any]:
+        return {
+            "user": self.user_payload(user_id),
+            "roles": [],
+            "joined_at": "2023-01-01T00:00:00+00:00",
+            "deaf": False,
+            "mute": False,
+            "permissions": "0",
+        }
+
+    def message_payload(
+        self, response: FakeResponse, data: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """`Method`\n
+        Makes up the message sent by a response.
+
+        Args:
+            `response` (`FakeResponse`): The responses of the interaction.
+
+            `data` (`Dict[str, Any]`): The sent content, embeds and components.
+
+        Returns:
+            `Dict[str, Any]`: The message payload.
+        """
+        previous = response.message or {}
+
+        return {
+            "id": previous.get("id", str(self.next_id())),
+            "channel_id": str(CHANNEL_ID),
+            "author": self.user_payload(APPLICATION_ID),
+            "content": data.get("content", previous.get("content", "")),
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": data.get("embeds", previous.get("embeds", [])),
+            "components": data.get("components", previous.get("components", [])),
+            "pinned": False,
+            "type": 20,
+            "flags": data.get("flags", 0),
+            "interaction": {
+                "id": str(response.interaction_id),
+                "type": 2,
+                "name": "command",
+                "user": self.user_payload(APPLICATION_ID),
+            },
+        }
+
+    async def dispatch(self, data: Dict[str, Any], user_id: int) -> FakeResponse:
+        """`Coro`\n
+        Sends an interaction through the gateway parser and waits for its first response.
+
+        Args:
+            `data` (`Dict[str, Any]`): The interaction type and data, completed with the common fields.
+
+            `user_id` (`int`): The user who interacted.
+
+        Raises:
+            `asyncio.TimeoutError`: Raised if the interaction wasn't answered in time.
+
+        Returns:
+            `FakeResponse`: The responses of the interaction.
+        """
+        interaction_id = self.next_id()
+        token = f"token{interaction_id}"
+
+        data.update(
+            id=str(interaction_id),
+            application_id=str(APPLICATION_ID),
+            token=token,
+            version=1,
+            guild_id=str(GUILD_ID),
+            channel_id=str(CHANNEL_ID),
+            member=self.member_payload(user_id),
+            locale="en-US",
+            app_permissions="0",
+        )
+
+        response = FakeResponse(interaction_id, time.perf_counter())
+        self.responses[token] = response
+
+        self.client._connection.parse_interaction_create(data)  # type: ignore
+
+        try:
+            await asyncio.wait_for(asyncio.shield(response.first), self.timeout)
+        finally:
+            # Later edits (like the paginator's) still find the interaction through `response.message`
+            if response.message is None:
+                self.responses.pop(token, None)
+
+        return response
+
+    async def command(
+        self, name: str, *, user_id: int, **options: Any
+    ) -> FakeResponse:
+        """`Coro`\n
+        Sends a slash command.
+
+        Args:
+            `name` (`str`): The name of the command.
+
+            `user_id` (`int`): The user who used the command.
+
+            `**options` (`Any`): The string or integer options of the command.
+
+        Returns:
+            `FakeResponse`: The responses of the interaction.
+        """
+        return await self.dispatch(
+            {
+                "type": 2,
+                "data": {
+                    "id": str(self.next_id()),
+                    "name": name,
+                    "type": 1,
+                    "options": [
+                        {
+                            "name": option,
+                            "type": 4 if isinstance(value, int) else 3,
+                            "value": value,
+                        }
+                        for option, value in options.items()
+                    ],
+                },
+            },
+            user_id,
+        )
+
+    async def autocomplete(
+        self, name: str, option: str, value: str, *, user_id: int
+    ) -> FakeResponse:
+        """`Coro`\n
+        Sends the autocomplete request of a string option being typed.
+
+        Args:
+            `name` (`str`): The name of the command.
+
+            `option` (`str`): The name of the focused option.
+
+            `value` (`str`): What the user typed so far.
+
+            `user_id` (`int`): The user typing.
+
+        Returns:
+            `FakeResponse`: The responses of the interaction, whose first request holds the choices.
+        """
+        return await self.dispatch(
+            {
+                "type": 4,
+                "data": {
+                    "id": str(self.next_id()),
+                    "name": name,
+                    "type": 1,
+                    "options": [
+                        {"name": option, "type": 3, "value": value, "focused": True}
+                    ],
+                },
+            },
+            user_id,
+        )
+
+    async def press(
+        self, response: FakeResponse, label: str, *, user_id: int
+    ) -> FakeResponse:
+        """`Coro`\n
+        Presses a button of the message sent by an earlier response.
+
+        Args:
+            `response` (`FakeResponse`): The response whose message has the button.
+
+            `label` (`str`): The label of the button.
+
+            `user_id` (`int`): The user who pressed the button.
+
+        Returns:
+            `FakeResponse`: The responses of the button press.
+        """
+        component = response.component(label)
+
+        return await self.dispatch(
+            {
+                "type": 3,
+                "data": {
+                    "custom_id": component["custom_id"],
+                    "component_type": component["type"],
+                },
+                "message": response.message,
+            },
+            user_id,
+        )
+
+    def forget(self, response: FakeResponse) -> None:
+        """`Method`\n
+        Stops answering the edits of an interaction.
+
+        Args:
+            `response` (`FakeResponse`): The responses of the interaction.
+        """
+        self.responses.pop(f"token{response.interaction_id}", None)
@@ -0,0 +1,283 @@
+"""
+Custom module for fast app command autocompletes.
+
+`discord.py >= 2.0.0` is required.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple, TYPE_CHECKING
+
+from discord import Interaction, app_commands
+from discord.app_commands import Choice
+
+if TYPE_CHECKING:
+    from .client import MyClient
+    from .items import Item
+
+# Discord shows at most 25 choices
+MAX_CHOICES = 25
+
+_SEPARATORS = re.compile(r"[^\w]+")
+
+
+def normalize(text: str) -> str:
+    """`Function`\n
+    Normalizes a name for matching: case folded, with words separated by single spaces.
+
+    Args:
+        `text` (`str`): The name.
+
+    Returns:
+        `str`: The normalized name.
+    """
+    return _SEPARATORS.sub(" ", text.casefold()).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """`Function`\n
+    Gets the trigrams of the words of a normalized name, each word padded so that its start weighs more.
+
+    Args:
+        `text` (`str`): The normalized name.
+
+    Returns:
+        `Set[str]`: The trigrams.
+    """
+    grams: Set[str] = set()
+
+    for word in text.split(" "):
+        padded = f"  {word} "
+        grams.update(padded[index : index + 3] for index in range(len(padded) - 2))
+
+    return grams
+
+
+class AutocompleteIndex:
+    """Finds names by prefix, or by similarity when the query has typos. Built once, then updated one name at a time.
+
+    Prefixes are looked up in a sorted array of the word suffixes of every name (a flattened trie) with `bisect`,
+    and typos through an index of the names by trigram.
+
+    Results are ranked: exact name, then name prefix, then word prefix, then share of the query trigrams found in the name,
+    the shortest names first within a rank. Short queries matching many names only rank the first `max_prefix_matches` in
+    alphabetical order, which keeps every keystroke well under a millisecond.
+
+    Args:
+        `min_similarity` (`float`, optional): The share of the query trigrams, from 0 to 1, a name must have to match despite typos. Defaults to `0.3`.
+
+        `max_prefix_matches` (`int`, optional): The number of prefix matches ranked. Defaults to `250`.
+
+    Example:
+    ```python
+    index = AutocompleteIndex()
+    index.add(1, "Health Potion")
+    index.search("potoin")
+    ```
+    """
+
+    def __init__(
+        self, *, min_similarity: float = 0.3, max_prefix_matches: int = 250
+    ) -> None:
+        self.min_similarity = min_similarity
+        self.max_prefix_matches = max_prefix_matches
+        self._names: Dict[int, str] = {}
+        self._normalized: Dict[int, str] = {}
+        self._gram_counts: Dict[int, int] = {}
+        self._suffixes: List[Tuple[str, int, int]] = []
+        self._trigrams: Dict[str, Set[int]] = {}
+        self._alphabetical: Optional[List[Tuple[int, str]]] = None
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def __contains__(self, key: int) -> bool:
+        return key in self._names
+
+    def build(self, entries: Iterable[Tuple[int, str]]) -> None:
+        """`Method`\n
+        Replaces the content of the index.
+
+        Args:
+            `entries` (`Iterable[Tuple[int, str]]`): The keys and their names.
+        """
+        self._names = {}
+        self._normalized = {}
+        self._gram_counts = {}
+        self._suffixes = []
+        self._trigrams = {}
+        self._alphabetical = None
+
+        for key, name in entries:
+            self._names[key] = name
+            self._suffixes.extend(self._index(key, name))
+
+        self._suffixes.sort()
+
+    def add(self, key: int, name: str) -> None:
+        """`Method`\n
+        Adds a name, or renames one.
+
+        Args:
+            `key` (`int`): The key returned by searches, like an item ID.
+
+            `name` (`str`): The name.
+        """
+        self.remove(key)
+        self._names[key] = name
+        self._alphabetical = None
+
+        for suffix in self._index(key, name):
+            insort(self._suffixes, suffix)
+
+    def remove(self, key: int) -> None:
+        """`Method`\n
+        Removes a name. Does nothing if the key isn't indexed.
+
+        Args:
+            `key` (`int`): The key.
+        """
+        if self._names.pop(key, None) is None:
+            return
+
+        normalized = self._normalized.pop(key)
+        del self._gram_counts[key]
+        self._alphabetical = None
+
+        for suffix in self._word_suffixes(key, normalized):
+            position = bisect_left(self._suffixes, suffix)
+            del self._suffixes[position]
+
+        for gram in trigrams(normalized):
+            keys = self._trigrams[gram]
+            keys.discard(key)
+
+            if not keys:
+                del self._trigrams[gram]
+
+    def search(
+        self, query: str, limit: int = MAX_CHOICES
+    ) -> List[Tuple[int, str]]:
+        """`Method`\n
+        Finds the names best matching a query.
+
+        Args:
+            `query` (`str`): What the user typed so far.
+
+            `limit` (`int`, optional): The maximum number of results. Defaults to `MAX_CHOICES`.
+
+        Returns:
+            `List[Tuple[int, str]]`: The keys and names, best first. Every name, alphabetically, for an empty query.
+        """
+        query = normalize(query)
+
+        if not query:
+            # The first keystroke of every user, so the order is kept until the names change
+            if self._alphabetical is None:
+                self._alphabetical = sorted(
+                    self._names.items(), key=lambda entry: self._normalized[entry[0]]
+                )[:MAX_CHOICES]
+
+            return self._alphabetical[:limit]
+
+        scores: Dict[int, float] = {}
+
+        # Prefix matches, from the first suffix starting with the query
+        position = bisect_left(self._suffixes, (query,))
+        end = min(len(self._suffixes), position + self.max_prefix_matches)
+
+        while position < end:
+            suffix, word, key = self._suffixes[position]
+            if not suffix.startswith(query):
+                break
+
+            if suffix == query and word == 0:
+                score = 3.0
+            elif word == 0:
+                score = 2.0
+            else:
+                score = 1.5
+
+            scores[key] = max(scores.get(key, 0.0), score)
+            position += 1
+
+        # Typos, only needed when the prefixes don't fill the results
+        if len(scores) < limit and len(query) >= 3:
+            query_grams = trigrams(query)
+            shared: Counter[int] = Counter()
+
+            for gram in query_grams:
+                shared.update(self._trigrams.get(gram, ()))
+
+            minimum = self.min_similarity * len(query_grams)
+
+            for key, count in shared.items():
+                if count < minimum or key in scores:
+                    continue
+
+                # Below 1, so after the prefix matches. Names with fewer other trigrams first
+                scores[key] = (count - 0.01 * (self._gram_counts[key] - count)) / len(query_grams)
+
+        ranked = sorted(
+            scores,
+            key=lambda key: (-scores[key], len(self._names[key]), self._normalized[key]),
+        )
+        return [(key, self._names[key]) for key in ranked[:limit]]
+
+    def choices(self, query: str, limit: int = MAX_CHOICES) -> List[Choice[str]]:
+        """`Method`\n
+        Finds the names best matching a query, as autocomplete choices whose value is the name.
+
+        Args:
+            `query` (`str`): What the user typed so far.
+
+            `limit` (`int`, optional): The maximum number of choices. Defaults to `MAX_CHOICES`.
+
+        Returns:
+            `List[Choice[str]]`: The choices, best first.
+        """
+        return [Choice(name=name, value=name) for _, name in self.search(query, limit)]
+
+    def _index(self, key: int, name: str) -> List[Tuple[str, int, int]]:
+        normalized = normalize(name)
+        grams = trigrams(normalized)
+        self._normalized[key] = normalized
+        self._gram_counts[key] = len(grams)
+
+        for gram in grams:
+            self._trigrams.setdefault(gram, set()).add(key)
+
+        return self._word_suffixes(key, normalized)
+
+    @staticmethod
+    def _word_suffixes(key: int, normalized: str) -> List[Tuple[str, int, int]]:
+        # "health potion" is found by "he" and by "po"
+        suffixes = [(normalized, 0, key)]
+        for word, match in enumerate(re.finditer(" ", normalized), start=1):
+            suffixes.append((normalized[match.end() :], word, key))
+
+        return suffixes
+
+
+class ItemTransformer(app_commands.Transformer):
+    """Item argument of app commands: autocompleted from `DatabaseManager.items`, and converted to an `Item`.
+
+    Example:
+    ```python
+    async def use(self, interaction: Interaction, item: app_commands.Transform[Item, ItemTransformer]):
+        ...
+    ```
+    """
+
+    async def autocomplete(
+        self, interaction: Interaction, value: str
+    ) -> List[Choice[str]]:
+        client: MyClient = interaction.client  # type: ignore
+        return client.database_manager.items.search_index.choices(value)
+
+    async def transform(self, interaction: Interaction, value: str) -> Item:
+        client: MyClient = interaction.client  # type: ignore
+        return client.database_manager.items.find(value)
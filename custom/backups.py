@@ -0,0 +1,437 @@
+"""
+Custom module for the database backups catalog.
+
+No third-party dependency is required.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import bisect
+import datetime
+import glob
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from typing import Any, Dict, List, Optional, Set
+
+LOGGER = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class BackupEntry:
+    """A backup file recorded in the catalog.
+
+    Args:
+        `file_name` (`str`): The name of the file, relative to the backups folder.
+
+        `created_at` (`float`): The POSIX timestamp of the backup.
+
+        `size` (`int`): The size in bytes of the uncompressed database.
+
+        `checksum` (`str`): The SHA-256 hex digest of the uncompressed database.
+
+        `compressed` (`bool`, optional): Whether the file is gzip compressed. Defaults to `False`.
+    """
+
+    __slots__ = ("file_name", "created_at", "size", "checksum", "compressed")
+
+    def __init__(
+        self,
+        file_name: str,
+        created_at: float,
+        size: int,
+        checksum: str,
+        compressed: bool = False,
+    ) -> None:
+        self.file_name = file_name
+        self.created_at = created_at
+        self.size = size
+        self.checksum = checksum
+        self.compressed = compressed
+
+    @property
+    def key(self) -> str:
+        """The file name without the compression suffix, which identifies the backup."""
+        return self.file_name[: -len(".gz")] if self.compressed else self.file_name
+
+    @property
+    def created_datetime(self) -> datetime.datetime:
+        """The local date and time of the backup."""
+        return datetime.datetime.fromtimestamp(self.created_at)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> BackupEntry:
+        return cls(**{name: data[name] for name in cls.__slots__ if name in data})
+
+    def __repr__(self) -> str:
+        return f"<BackupEntry file_name={self.file_name!r} created_at={self.created_datetime} size={self.size}>"
+
+
+class RetentionPolicy:
+    """Which backups to keep when the catalog is pruned.
+
+    A backup is kept if it matches at least one rule, the others are deleted.
+
+    Args:
+        `keep_last` (`int`, optional): The number of most recent backups to keep. Defaults to `10`.
+
+        `keep_hourly` (`int`, optional): The number of past hours for which the newest backup is kept. Defaults to `24`.
+
+        `keep_daily` (`int`, optional): The number of past days for which the newest backup is kept. Defaults to `7`.
+
+        `compress_after` (`Optional[int]`, optional): Kept backups older than this many most recent ones are gzip compressed. `NoneType` disables compression. Defaults to `None`.
+    """
+
+    def __init__(
+        self,
+        *,
+        keep_last: int = 10,
+        keep_hourly: int = 24,
+        keep_daily: int = 7,
+        compress_after: Optional[int] = None,
+    ) -> None:
+        self.keep_last = keep_last
+        self.keep_hourly = keep_hourly
+        self.keep_daily = keep_daily
+        self.compress_after = compress_after
+
+    def select(self, entries: List[BackupEntry]) -> Set[str]:
+        """`Method`\n
+        Selects the backups to keep.
+
+        Args:
+            `entries` (`List[BackupEntry]`): The backups, oldest first.
+
+        Returns:
+            `Set[str]`: The file names of the backups to keep.
+        """
+        newest_first = entries[::-1]
+        keep = {entry.file_name for entry in newest_first[: self.keep_last]}
+
+        for pattern, count in ((r"%Y%m%d%H", self.keep_hourly), (r"%Y%m%d", self.keep_daily)):
+            periods: Set[str] = set()
+
+            for entry in newest_first:
+                if len(periods) >= count:
+                    break
+
+                period = entry.created_datetime.strftime(pattern)
+                if period not in periods:
+                    periods.add(period)
+                    keep.add(entry.file_name)
+
+        return keep
+
+
+class BackupCatalog:
+    """Index of the backup files, stored as a JSON manifest in the backups folder.
+
+    The manifest is read when the catalog is created, or built by hashing every backup file if it doesn't exist yet,
+    so create it off the event loop.
+
+    Args:
+        `backups_path` (`str`): The backups folder.
+    """
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, backups_path: str) -> None:
+        self.backups_path = backups_path
+        self.manifest_path = os.path.join(backups_path, self.MANIFEST_NAME)
+
+        self._entries: List[BackupEntry] = []
+        self._timestamps: List[float] = []
+
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def entries(self) -> List[BackupEntry]:
+        """The backups, oldest first."""
+        return list(self._entries)
+
+    def path_of(self, entry: BackupEntry) -> str:
+        """`Method`\n
+        Gets the path of a backup file.
+
+        Args:
+            `entry` (`BackupEntry`): The backup.
+
+        Returns:
+            `str`: The path.
+        """
+        return os.path.join(self.backups_path, entry.file_name)
+
+    def load(self) -> None:
+        """`Method`\n
+        Reads the manifest. If it doesn't exist yet, it is built from the backup files already in the folder.
+        """
+        if not os.path.isfile(self.manifest_path):
+            self._rebuild()
+            return
+
+        with open(self.manifest_path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        entries: Dict[str, BackupEntry] = {}
+        for item in data["backups"]:
+            entry = BackupEntry.from_dict(item)
+
+            # Left by older versions, whose backups of the same second overwrote each other: the file is the last one
+            if entry.key in entries:
+                LOGGER.warning(f"Duplicate backup {entry.key!r} in the manifest, keeping the last one.")
+
+            entries[entry.key] = entry
+
+        self._set_entries(list(entries.values()))
+
+    def save(self) -> None:
+        """`Method`\n
+        Writes the manifest atomically.
+        """
+        temp_path = f"{self.manifest_path}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"backups": [entry.to_dict() for entry in self._entries]}, f, indent=4)
+
+        os.replace(temp_path, self.manifest_path)
+
+    def new_file_name(self, database_name: str, created_at: datetime.datetime) -> str:
+        """`Method`\n
+        Gets the file name of a new backup, unique even for backups made within the same second.
+
+        Args:
+            `database_name` (`str`): The file name of the database.
+
+            `created_at` (`datetime.datetime`): The time of the backup.
+
+        Returns:
+            `str`: The file name, relative to the backups folder.
+        """
+        right_now = created_at.strftime(r"[%d-%m-%Y]_-_[%H-%M-%S-%f]")
+        taken = {entry.key for entry in self._entries}
+
+        file_name = f"{right_now}_-_{database_name}.bak"
+        sequence = 1
+
+        while file_name in taken or any(
+            os.path.exists(os.path.join(self.backups_path, name))
+            for name in (file_name, f"{file_name}.gz")
+        ):
+            sequence += 1
+            file_name = f"{right_now}_{sequence}_-_{database_name}.bak"
+
+        return file_name
+
+    def add(self, entry: BackupEntry) -> None:
+        """`Method`\n
+        Records a new backup. The manifest must be saved afterwards.
+
+        Args:
+            `entry` (`BackupEntry`): The backup.
+
+        Raises:
+            `ValueError`: Raised if a backup with the same file name is already recorded.
+        """
+        if any(item.key == entry.key for item in self._entries):
+            raise ValueError(f"The backup {entry.key!r} is already recorded.")
+
+        index = bisect.bisect_right(self._timestamps, entry.created_at)
+        self._entries.insert(index, entry)
+        self._timestamps.insert(index, entry.created_at)
+
+    def latest(self) -> Optional[BackupEntry]:
+        """`Method`\n
+        Gets the most recent backup.
+
+        Returns:
+            `Optional[BackupEntry]`: The backup, or `NoneType` if there are none.
+        """
+        return self._entries[-1] if self._entries else None
+
+    def at(self, when: datetime.datetime) -> Optional[BackupEntry]:
+        """`Method`\n
+        Gets the most recent backup made at or before a point in time.
+
+        Args:
+            `when` (`datetime.datetime`): The point in time.
+
+        Returns:
+            `Optional[BackupEntry]`: The backup, or `NoneType` if there are none that old.
+        """
+        index = bisect.bisect_right(self._timestamps, when.timestamp())
+        return self._entries[index - 1] if index else None
+
+    async def record(self, file_name: str, created_at: float) -> BackupEntry:
+        """`Coro`\n
+        Computes the size and checksum of a new backup file in a worker thread, then records it and saves the manifest.
+
+        Args:
+            `file_name` (`str`): The name of the file, relative to the backups folder.
+
+            `created_at` (`float`): The POSIX timestamp of the backup.
+
+        Returns:
+            `BackupEntry`: The recorded backup.
+        """
+        path = os.path.join(self.backups_path, file_name)
+        size, checksum = await asyncio.to_thread(file_digest, path)
+
+        entry = BackupEntry(file_name, created_at, size, checksum)
+        self.add(entry)
+        await asyncio.to_thread(self.save)
+
+        return entry
+
+    async def prune(self, policy: RetentionPolicy) -> List[BackupEntry]:
+        """`Coro`\n
+        Deletes the backups not selected by a retention policy, and compresses old ones, in a worker thread.
+
+        Args:
+            `policy` (`RetentionPolicy`): The retention policy.
+
+        Returns:
+            `List[BackupEntry]`: The deleted backups.
+        """
+        keep = policy.select(self._entries)
+        removed = [entry for entry in self._entries if entry.file_name not in keep]
+        kept = [entry for entry in self._entries if entry.file_name in keep]
+
+        to_compress: List[BackupEntry] = []
+        if policy.compress_after is not None:
+            old = kept[: max(len(kept) - policy.compress_after, 0)]
+            to_compress = [entry for entry in old if not entry.compressed]
+
+        def work() -> None:
+            for entry in removed:
+                try:
+                    os.remove(self.path_of(entry))
+                except FileNotFoundError:
+                    pass
+
+            for entry in to_compress:
+                source = self.path_of(entry)
+
+                with open(source, "rb") as src, gzip.open(f"{source}.gz", "wb") as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+                os.remove(source)
+                entry.file_name = f"{entry.file_name}.gz"
+                entry.compressed = True
+
+        self._set_entries(kept)
+        await asyncio.to_thread(work)
+        await asyncio.to_thread(self.save)
+
+        return removed
+
+    async def restore(self, entry: BackupEntry, destination: str) -> None:
+        """`Coro`\n
+        Copies a backup to a destination in a worker thread, decompressing it if needed, and verifies its checksum.
+
+        Args:
+            `entry` (`BackupEntry`): The backup.
+
+            `destination` (`str`): The path to write.
+
+        Raises:
+            `CorruptedBackupError`: Raised if the checksum doesn't match. The destination is left untouched.
+        """
+
+        def work() -> None:
+            source = self.path_of(entry)
+            temp_path = f"{destination}.restore"
+            opener = gzip.open if entry.compressed else open
+
+            with opener(source, "rb") as src, open(temp_path, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+            if file_digest(temp_path)[1] != entry.checksum:
+                os.remove(temp_path)
+                raise CorruptedBackupError(entry.file_name)
+
+            os.replace(temp_path, destination)
+
+        await asyncio.to_thread(work)
+
+    def _set_entries(self, entries: List[BackupEntry]) -> None:
+        self._entries = sorted(entries, key=lambda entry: entry.created_at)
+        self._timestamps = [entry.created_at for entry in self._entries]
+
+    def _rebuild(self) -> None:
+        entries = []
+
+        for pattern in ("*.bak", "*.bak.gz"):
+            for path in glob.glob(os.path.join(self.backups_path, pattern)):
+                compressed = path.endswith(".gz")
+                opener = gzip.open if compressed else open
+
+                with opener(path, "rb") as f:
+                    size, checksum = stream_digest(f)
+
+                entries.append(
+                    BackupEntry(
+                        os.path.basename(path),
+                        os.path.getctime(path),
+                        size,
+                        checksum,
+                        compressed,
+                    )
+                )
+
+        self._set_entries(entries)
+
+        if entries:
+            self.save()
+
+
+def file_digest(path: str) -> tuple[int, str]:
+    """`Function`\n
+    Computes the size and SHA-256 hex digest of a file.
+
+    Args:
+        `path` (`str`): The path of the file.
+
+    Returns:
+        `tuple[int, str]`: The size in bytes and the digest.
+    """
+    with open(path, "rb") as f:
+        return stream_digest(f)
+
+
+def stream_digest(stream: Any) -> tuple[int, str]:
+    """`Function`\n
+    Computes the size and SHA-256 hex digest of a binary stream.
+
+    Args:
+        `stream` (`Any`): The stream, read until its end.
+
+    Returns:
+        `tuple[int, str]`: The size in bytes and the digest.
+    """
+    digest = hashlib.sha256()
+    size = 0
+
+    while chunk := stream.read(CHUNK_SIZE):
+        digest.update(chunk)
+        size += len(chunk)
+
+    return size, digest.hexdigest()
+
+
+class CorruptedBackupError(Exception):
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+
+    def __str__(self) -> str:
+        return f"Backup '{self.file_name}' doesn't match its recorded checksum."
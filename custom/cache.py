@@ -0,0 +1,264 @@
+"""
+Custom module for in-process caching of database rows.
+
+No third-party dependency is required.
+"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+PLAYER_COLUMNS: Tuple[str, ...] = (
+    "user_id",
+    "level",
+    "experience",
+    "health",
+    "gold",
+    "class",
+)
+
+
+class PlayerRecord:
+    """Compact representation of a row of the `players` table.
+
+    The `class` column is exposed as `player_class` since `class` is a reserved keyword.
+    """
+
+    __slots__ = ("user_id", "level", "experience", "health", "gold", "player_class")
+
+    def __init__(
+        self,
+        user_id: int,
+        level: int = 1,
+        experience: int = 0,
+        health: int = 100,
+        gold: int = 0,
+        player_class: str = "",
+    ) -> None:
+        self.user_id = user_id
+        self.level = level
+        self.experience = experience
+        self.health = health
+        self.gold = gold
+        self.player_class = player_class
+
+    @classmethod
+    def from_row(cls, row: Tuple[Any, ...]) -> PlayerRecord:
+        """`Classmethod`\n
+        Builds a record from a row selected in `PLAYER_COLUMNS` order.
+
+        Args:
+            `row` (`Tuple[Any, ...]`): The row.
+
+        Returns:
+            `PlayerRecord`: The record.
+        """
+        return cls(*row)
+
+    def to_row(self) -> Tuple[Any, ...]:
+        """`Method`\n
+        Converts the record to a row in `PLAYER_COLUMNS` order.
+
+        Returns:
+            `Tuple[Any, ...]`: The row.
+        """
+        return (
+            self.user_id,
+            self.level,
+            self.experience,
+            self.health,
+            self.gold,
+            self.player_class,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"<PlayerRecord user_id={self.user_id} level={self.level} experience={self.experience} "
+            f"health={self.health} gold={self.gold} class={self.player_class!r}>"
+        )
+
+
+class PlayerCache:
+    """LRU-bounded cache of `PlayerRecord` objects with dirty tracking.
+
+    Args:
+        `max_size` (`int`, optional): The maximum number of records kept in memory. Defaults to `1024`.
+
+    Dirty records are never lost on eviction: they are moved to a pending area that is
+    still returned by `get()` and `dirty_records()` until the next flush.
+    """
+
+    def __init__(self, max_size: int = 1024) -> None:
+        if max_size < 1:
+            raise ValueError(f"max_size must be at least 1, got {max_size}")
+
+        self.max_size = max_size
+        self._records: OrderedDict[int, PlayerRecord] = OrderedDict()
+        self._evicted: Dict[int, PlayerRecord] = {}
+        self._dirty: set[int] = set()
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self._records or user_id in self._evicted
+
+    def __iter__(self) -> Iterator[PlayerRecord]:
+        return iter(list(self._records.values()))
+
+    @property
+    def dirty_count(self) -> int:
+        """The number of records waiting to be written to the database."""
+        return len(self._dirty)
+
+    def get(self, user_id: int) -> Optional[PlayerRecord]:
+        """`Method`\n
+        Gets a cached record and marks it as the most recently used.
+
+        Args:
+            `user_id` (`int`): The ID of the player.
+
+        Returns:
+            `Optional[PlayerRecord]`: The record, or `NoneType` if not cached.
+        """
+        record = self._records.get(user_id)
+
+        if record is None:
+            record = self._evicted.pop(user_id, None)
+            if record is None:
+                self.misses += 1
+                return None
+
+            self._records[user_id] = record
+            self._evict()
+
+        else:
+            self._records.move_to_end(user_id)
+
+        self.hits += 1
+        return record
+
+    def put(self, record: PlayerRecord, *, dirty: bool = False) -> None:
+        """`Method`\n
+        Adds or replaces a record in the cache.
+
+        Args:
+            `record` (`PlayerRecord`): The record.
+
+            `dirty` (`bool`, optional): Whether the record has changes not yet written to the database. Defaults to `False`.
+        """
+        self._evicted.pop(record.user_id, None)
+        self._records[record.user_id] = record
+        self._records.move_to_end(record.user_id)
+
+        if dirty:
+            self._dirty.add(record.user_id)
+
+        self._evict()
+
+    def mark_dirty(self, user_id: int) -> None:
+        """`Method`\n
+        Flags a cached record as changed.
+
+        Args:
+            `user_id` (`int`): The ID of the player.
+
+        Raises:
+            `KeyError`: Raised if the record is not cached.
+        """
+        if user_id not in self:
+            raise KeyError(user_id)
+
+        self._dirty.add(user_id)
+
+    def is_dirty(self, user_id: int) -> bool:
+        """`Method`\n
+        Checks whether a record has changes not yet written to the database.
+
+        Args:
+            `user_id` (`int`): The ID of the player.
+
+        Returns:
+            `bool`: Whether the record is dirty.
+        """
+        return user_id in self._dirty
+
+    def mark_clean(self, records: List[PlayerRecord]) -> None:
+        """`Method`\n
+        Clears the dirty flag of the given records, before they are written. Evicted ones stay readable until `release_evicted`.
+
+        Args:
+            `records` (`List[PlayerRecord]`): The records being written.
+        """
+        for record in records:
+            self._dirty.discard(record.user_id)
+
+    def release_evicted(self, records: List[PlayerRecord]) -> None:
+        """`Method`\n
+        Drops the evicted records among the given ones, once their write is committed. Records changed again since are kept.
+
+        Args:
+            `records` (`List[PlayerRecord]`): The records that have been written.
+        """
+        for record in records:
+            if record.user_id not in self._dirty:
+                self._evicted.pop(record.user_id, None)
+
+    def dirty_records(self) -> List[PlayerRecord]:
+        """`Method`\n
+        Gets all records waiting to be written to the database.
+
+        Returns:
+            `List[PlayerRecord]`: The dirty records.
+        """
+        return [
+            self._records.get(user_id) or self._evicted[user_id]
+            for user_id in self._dirty
+        ]
+
+    def apply(self, user_id: int, fields: Dict[str, Any]) -> None:
+        """`Method`\n
+        Updates a cached record in place, if present, without changing its dirty flag.
+
+        Args:
+            `user_id` (`int`): The ID of the player.
+
+            `fields` (`Dict[str, Any]`): Attribute names and their new values.
+        """
+        record = self._records.get(user_id) or self._evicted.get(user_id)
+        if record is None:
+            return
+
+        for name, value in fields.items():
+            setattr(record, name, value)
+
+    def discard(self, user_id: int) -> None:
+        """`Method`\n
+        Removes a record from the cache, including any pending changes.
+
+        Args:
+            `user_id` (`int`): The ID of the player.
+        """
+        self._records.pop(user_id, None)
+        self._evicted.pop(user_id, None)
+        self._dirty.discard(user_id)
+
+    def clear(self) -> None:
+        """`Method`\n
+        Removes every record from the cache, including any pending changes.
+        """
+        self._records.clear()
+        self._evicted.clear()
+        self._dirty.clear()
+
+    def _evict(self) -> None:
+        while len(self._records) > self.max_size:
+            user_id, record = self._records.popitem(last=False)
+
+            if user_id in self._dirty:
+                self._evicted[user_id] = record
@@ -0,0 +1,445 @@
+"""
+Custom module for rendered player profile cards.
+
+`Pillow` is required.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+from .cache import PlayerRecord
+from .levels import LEVEL_CURVE, LevelCurve
+
+# Pillow is only imported by the renders, so that importing this module at startup stays cheap
+if TYPE_CHECKING:
+    from PIL import Image, ImageDraw
+
+LOGGER = logging.getLogger(__name__)
+
+# Changes the cache keys of every card, bump it whenever the drawing code changes
+RENDER_VERSION = 1
+
+CARD_SIZE = (600, 200)
+ART_SIZE = (160, 160)
+MAX_HEALTH = 100
+
+BACKGROUND_COLOR = (0x2F, 0x31, 0x36, 255)
+TEXT_COLOR = (0xFF, 0xFF, 0xFF, 255)
+MUTED_COLOR = (0xB9, 0xBB, 0xBE, 255)
+BAR_COLOR = (0x20, 0x22, 0x25, 255)
+EXPERIENCE_COLOR = (0x58, 0x65, 0xF2, 255)
+HEALTH_COLOR = (0xED, 0x42, 0x45, 255)
+GOLD_COLOR = (0xFE, 0xE7, 0x5C, 255)
+
+# Drawn when the assets folder has no art for a class
+CLASS_COLORS: Dict[str, Tuple[int, int, int, int]] = {
+    "Warrior": (0xC0, 0x39, 0x2B, 255),
+    "Elf": (0x27, 0xAE, 0x60, 255),
+}
+DEFAULT_CLASS_COLOR = (0x7F, 0x8C, 0x8D, 255)
+
+
+class CardStats(NamedTuple):
+    """Everything visible on a card, so that two cards with the same stats are the same image."""
+
+    name: str
+    player_class: str
+    level: int
+    experience: int
+    level_experience: int
+    next_level_experience: int
+    gold: int
+    health: int
+
+    @classmethod
+    def of(
+        cls, player: PlayerRecord, name: str, level_curve: LevelCurve = LEVEL_CURVE
+    ) -> CardStats:
+        """`Classmethod`\n
+        Gets the stats shown on the card of a player.
+
+        Args:
+            `player` (`PlayerRecord`): The player.
+
+            `name` (`str`): The name shown.
+
+            `level_curve` (`LevelCurve`, optional): Gives the progress of the experience bar. Defaults to `LEVEL_CURVE`.
+
+        Returns:
+            `CardStats`: The stats.
+        """
+        _, gained, needed = level_curve.progress(player.experience)
+
+        return cls(
+            name=name,
+            player_class=player.player_class,
+            level=player.level,
+            experience=player.experience,
+            level_experience=gained,
+            next_level_experience=needed,
+            gold=player.gold,
+            health=player.health,
+        )
+
+
+class CardLayers:
+    """The images and fonts a card is drawn with, loaded once per process and shared by every render.
+
+    Files of `assets_path` are used when they exist: `background.png`, `classes/<class>.png` and `font.ttf`.
+    Missing ones are replaced by plain drawings.
+
+    Args:
+        `assets_path` (`str`): The folder of the card assets.
+    """
+
+    def __init__(self, assets_path: str) -> None:
+        from PIL import Image, ImageFont
+
+        self.assets_path = assets_path
+        self.background = self._load(
+            "background.png", CARD_SIZE
+        ) or Image.new("RGBA", CARD_SIZE, BACKGROUND_COLOR)
+        self._class_art: Dict[str, Image.Image] = {}
+
+        font_path = os.path.join(assets_path, "font.ttf")
+        if os.path.isfile(font_path):
+            self.title_font = ImageFont.truetype(font_path, 32)
+            self.font = ImageFont.truetype(font_path, 18)
+        else:
+            self.title_font = self.font = ImageFont.load_default()
+
+    def class_art(self, player_class: str) -> Image.Image:
+        """`Method`\n
+        Gets the art of a class, loaded or drawn on first use.
+
+        Args:
+            `player_class` (`str`): The class.
+
+        Returns:
+            `Image.Image`: The art, of `ART_SIZE`.
+        """
+        art = self._class_art.get(player_class)
+
+        if art is None:
+            from PIL import Image, ImageDraw
+
+            art = self._load(os.path.join("classes", f"{player_class}.png"), ART_SIZE)
+
+            if art is None:
+                art = Image.new("RGBA", ART_SIZE, (0, 0, 0, 0))
+                ImageDraw.Draw(art).ellipse(
+                    (8, 8, ART_SIZE[0] - 8, ART_SIZE[1] - 8),
+                    fill=CLASS_COLORS.get(player_class, DEFAULT_CLASS_COLOR),
+                )
+
+            # Renders of different threads may both load it, either copy is fine
+            self._class_art[player_class] = art
+
+        return art
+
+    def _load(self, name: str, size: Tuple[int, int]) -> Optional[Image.Image]:
+        from PIL import Image
+
+        path = os.path.join(self.assets_path, name)
+        if not os.path.isfile(path):
+            return None
+
+        with Image.open(path) as image:
+            # Pixel art, so it's scaled without smoothing
+            return image.convert("RGBA").resize(size, Image.Resampling.NEAREST)
+
+
+@lru_cache(maxsize=None)
+def card_layers(assets_path: str) -> CardLayers:
+    """`Function`\n
+    Gets the shared layers of an assets folder, loading them on the first call of the process.
+
+    Args:
+        `assets_path` (`str`): The folder of the card assets.
+
+    Returns:
+        `CardLayers`: The layers.
+    """
+    return CardLayers(assets_path)
+
+
+def assets_version(assets_path: str) -> str:
+    """`Function`\n
+    Gets a short fingerprint of the card assets, which changes whenever a file is added, removed or modified.
+
+    Args:
+        `assets_path` (`str`): The folder of the card assets.
+
+    Returns:
+        `str`: The fingerprint.
+    """
+    entries = [f"render:{RENDER_VERSION}"]
+
+    for folder, _, files in os.walk(assets_path):
+        for name in files:
+            path = os.path.join(folder, name)
+            info = os.stat(path)
+            entries.append(
+                f"{os.path.relpath(path, assets_path)}:{info.st_size}:{info.st_mtime_ns}"
+            )
+
+    return hashlib.sha256("\n".join(sorted(entries)).encode("utf-8")).hexdigest()[:16]
+
+
+def _bar(
+    draw: ImageDraw.ImageDraw,
+    box: Tuple[int, int, int, int],
+    fraction: float,
+    color: Tuple[int, int, int, int],
+) -> None:
+    left, top, right, bottom = box
+    draw.rounded_rectangle(box, radius=(bottom - top) // 2, fill=BAR_COLOR)
+
+    width = round((right - left) * min(max(fraction, 0.0), 1.0))
+    if width > bottom - top:
+        draw.rounded_rectangle(
+            (left, top, left + width, bottom), radius=(bottom - top) // 2, fill=color
+        )
+
+
+def render_card(stats: CardStats, assets_path: str) -> bytes:
+    """`Function`\n
+    Draws the card of a player. Runs in a thread or a process, the layers are shared by the renders of the same process.
+
+    Args:
+        `stats` (`CardStats`): The stats shown.
+
+        `assets_path` (`str`): The folder of the card assets.
+
+    Returns:
+        `bytes`: The card, encoded as PNG.
+    """
+    from PIL import ImageDraw
+
+    layers = card_layers(assets_path)
+    card = layers.background.copy()
+    card.alpha_composite(layers.class_art(stats.player_class), (20, 20))
+
+    draw = ImageDraw.Draw(card)
+    draw.text((200, 20), stats.name[:24], font=layers.title_font, fill=TEXT_COLOR)
+    draw.text(
+        (200, 62), f"Level {stats.level} {stats.player_class}", font=layers.font, fill=MUTED_COLOR
+    )
+
+    if stats.next_level_experience:
+        fraction = stats.level_experience / stats.next_level_experience
+        experience = f"{stats.level_experience:,} / {stats.next_level_experience:,} XP"
+    else:
+        fraction = 1.0
+        experience = f"{stats.experience:,} XP (max level)"
+
+    _bar(draw, (200, 92, 580, 110), fraction, EXPERIENCE_COLOR)
+    draw.text((200, 114), experience, font=layers.font, fill=MUTED_COLOR)
+
+    _bar(draw, (200, 146, 390, 164), stats.health / MAX_HEALTH, HEALTH_COLOR)
+    draw.text((200, 168), f"{stats.health} HP", font=layers.font, fill=MUTED_COLOR)
+    draw.text((410, 146), f"{stats.gold:,} gold", font=layers.font, fill=GOLD_COLOR)
+
+    # Encoding is most of the render time: cards are opaque, and a faster compression only costs a few kilobytes
+    output = io.BytesIO()
+    card.convert("RGB").save(output, format="PNG", compress_level=1)
+    return output.getvalue()
+
+
+class CardRenderer:
+    """Renders player cards off the event loop, and keeps the encoded PNGs in a memory LRU and on disk.
+
+    Cards are keyed by a hash of their visible stats and of the assets version, so an unchanged profile is served
+    without being drawn again, and any change of the stats or the assets gives a new key. Concurrent requests for
+    the same card share one render.
+
+    Args:
+        `assets_path` (`str`, optional): The folder of the card assets. Defaults to `"./assets/cards"`.
+
+        `cache_path` (`Optional[str]`, optional): The folder where the cards are saved as `<key>.png`. Defaults to `None` (memory only).
+
+        `cache_bytes` (`int`, optional): The maximum size of the cards kept in memory. Defaults to 32 MiB.
+
+        `executor` (`Optional[Executor]`, optional): Where the renders run. Defaults to a thread pool of `max_workers`, created on first use, whose threads share the layers.
+
+        `max_workers` (`int`, optional): The size of the default thread pool. Defaults to `2`.
+
+        `level_curve` (`LevelCurve`, optional): Gives the progress of the experience bars. Defaults to `LEVEL_CURVE`.
+
+    Example:
+    ```python
+    png = await renderer.render(player, member.display_name)
+    await interaction.followup.send(file=discord.File(io.BytesIO(png), "profile.png"))
+    ```
+    """
+
+    def __init__(
+        self,
+        *,
+        assets_path: str = "./assets/cards",
+        cache_path: Optional[str] = None,
+        cache_bytes: int = 32 * 1024 * 1024,
+        executor: Optional[Executor] = None,
+        max_workers: int = 2,
+        level_curve: LevelCurve = LEVEL_CURVE,
+    ) -> None:
+        self.assets_path = os.path.abspath(assets_path)
+        self.cache_path = cache_path
+        self.cache_bytes = cache_bytes
+        self.max_workers = max_workers
+        self.level_curve = level_curve
+        self.assets_version = assets_version(self.assets_path)
+
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._cards: OrderedDict[str, bytes] = OrderedDict()
+        self._cached_bytes: int = 0
+        self._pending: Dict[str, asyncio.Future] = {}
+
+        self.hits: int = 0
+        self.disk_hits: int = 0
+        self.renders: int = 0
+
+    def key_of(self, stats: CardStats) -> str:
+        """`Method`\n
+        Gets the cache key of a card.
+
+        Args:
+            `stats` (`CardStats`): The stats shown.
+
+        Returns:
+            `str`: The key, a hex digest.
+        """
+        return hashlib.sha256(
+            repr((self.assets_version, tuple(stats))).encode("utf-8")
+        ).hexdigest()[:32]
+
+    async def render(self, player: PlayerRecord, name: str) -> bytes:
+        """`Coro`\n
+        Gets the card of a player, rendered only if no card with the same stats is cached.
+
+        Args:
+            `player` (`PlayerRecord`): The player.
+
+            `name` (`str`): The name shown, like the display name of the member.
+
+        Returns:
+            `bytes`: The card, encoded as PNG.
+        """
+        stats = CardStats.of(player, name, self.level_curve)
+        key = self.key_of(stats)
+
+        card = self._cards.get(key)
+        if card is not None:
+            self._cards.move_to_end(key)
+            self.hits += 1
+            return card
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+
+        try:
+            card = await self._render(key, stats)
+            self._store(key, card)
+            future.set_result(card)
+
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Marks it retrieved when nobody else awaits it
+            raise
+
+        finally:
+            del self._pending[key]
+
+        return card
+
+    async def _render(self, key: str, stats: CardStats) -> bytes:
+        if self.cache_path is not None:
+            card = await asyncio.to_thread(self._read_disk_cache, key)
+            if card is not None:
+                self.disk_hits += 1
+                return card
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix="cards"
+            )
+
+        card = await asyncio.get_running_loop().run_in_executor(
+            self._executor, render_card, stats, self.assets_path
+        )
+        self.renders += 1
+
+        if self.cache_path is not None:
+            try:
+                await asyncio.to_thread(self._write_disk_cache, key, card)
+
+            except OSError as e:
+                LOGGER.warning("Could not save a rendered card.", exc_info=e)
+
+        return card
+
+    def _store(self, key: str, card: bytes) -> None:
+        self._cards[key] = card
+        self._cards.move_to_end(key)
+        self._cached_bytes += len(card)
+
+        while self._cached_bytes > self.cache_bytes and len(self._cards) > 1:
+            _, evicted = self._cards.popitem(last=False)
+            self._cached_bytes -= len(evicted)
+
+    def _read_disk_cache(self, key: str) -> Optional[bytes]:
+        try:
+            with open(os.path.join(self.cache_path, f"{key}.png"), "rb") as f:
+                return f.read()
+
+        except FileNotFoundError:
+            return None
+
+    def _write_disk_cache(self, key: str, card: bytes) -> None:
+        os.makedirs(self.cache_path, exist_ok=True)
+        path = os.path.join(self.cache_path, f"{key}.png")
+        temp_path = f"{path}.tmp"
+
+        with open(temp_path, "wb") as f:
+            f.write(card)
+
+        os.replace(temp_path, path)
+
+    async def close(self) -> None:
+        """`Coro`\n
+        Shuts down the default thread pool.
+        """
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, int]:
+        """`Method`\n
+        Gets the cache counters.
+
+        Returns:
+            `Dict[str, int]`: The cached cards and their size, memory and disk hits, renders, and renders in progress.
+        """
+        return {
+            "cached": len(self._cards),
+            "cached_bytes": self._cached_bytes,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "renders": self.renders,
+            "pending": len(self._pending),
+        }
@@ -7,21 +7,57 @@ Custom module for a Discord client.
 from __future__ import annotations
 
 import discord
-from discord import Intents
+from discord import Intents, Interaction, InteractionType, app_commands
 from discord.ext.commands import Bot
-from typing import Any, List, Type, Union, Optional
+from typing import Any, Dict, List, Type, Union, Optional, TYPE_CHECKING
 import os
 import logging
 import colorama
 from colorama import Fore, Back, Style
+import asyncio
 import glob
+import hashlib
+import json
+import time
 
 from .database import DatabaseManager
+from .exceptions import RateLimited
+from .logs import LoggingPipeline
+from .metrics import MetricsRegistry, write_textfile
+from .ratelimit import RateLimiter
+from .scheduler import Scheduler
+from .startup import STARTUP_REPORT, StartupReport
+
+if TYPE_CHECKING:
+    from .cards import CardRenderer
+    from .colors import ColorService
 
 LOGGER = logging.getLogger(__name__)
 colorama.init()
 
 
+class MyCommandTree(app_commands.CommandTree):
+    """Subclass of `discord.app_commands.CommandTree` that stores when each interaction started being handled, for the commands latency,
+    and applies the rate limits of `MyClient.rate_limiter`. Autocompletes aren't limited.
+    """
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        interaction.extras["started_at"] = time.perf_counter()
+
+        command = interaction.command
+        if interaction.type is InteractionType.application_command and command is not None:
+            retry_after = self.client.rate_limiter.hit(
+                interaction.user.id,
+                command.qualified_name,
+                interaction.guild_id,
+                command.extras.get("rate_limit"),
+            )
+            if retry_after:
+                raise RateLimited(retry_after)
+
+        return True
+
+
 class MyClient(Bot):
     """Subclass of `discord.ext.commands.Bot`
 
@@ -38,6 +74,32 @@ class MyClient(Bot):
             `is_testing` (`bool`): (Optional) Default is `False`. Whether the client should copy its commands to a testing guild.
 
             `TEST_GUILD` (`Type[discord.Object]`): (Optional) Default is `None`. If `is_testing` is `True`, then it's required. The guild where the client will copy its commands.
+
+            `command_hashes_path` (`Optional[str]`): (Optional) Default is `"./.command_hashes.json"`. The file where the hash of the last synced command tree is stored for each target. If `None`, the commands are synced on every startup.
+
+            `force_sync` (`bool`): (Optional) Default is `False`. Whether to sync the commands even if they didn't change.
+
+            `sync_on_startup` (`bool`): (Optional) Default is `True`. Whether to sync the commands in `setup_hook`. Only one process of a cluster needs to.
+
+            `concurrent_extensions` (`bool`): (Optional) Default is `True`. Whether to load the extensions concurrently. They must not depend on each other's load order.
+
+            `startup_report` (`StartupReport`): (Optional) Default is `STARTUP_REPORT`. Where the extensions load times are recorded before the report is logged.
+
+            `log_pipeline` (`Optional[LoggingPipeline]`): (Optional) Default is `None`. The logging pipeline whose counters are reported.
+
+            `metrics` (`Optional[MetricsRegistry]`): (Optional) Default is a new registry. Where the commands latency is recorded. It's shared with the database manager if it has none.
+
+            `metrics_export_path` (`Optional[str]`): (Optional) Default is `None`. The Prometheus text file where the metrics are periodically written. If `None`, they aren't exported.
+
+            `metrics_export_interval` (`float`): (Optional) Default is `15.0`. The seconds between two exports.
+
+            `color_service` (`Optional[ColorService]`): (Optional) Default is a new service without disk cache. Where embed colours are taken from avatars.
+
+            `card_renderer` (`Optional[CardRenderer]`): (Optional) Default is a new renderer without disk cache. Where the profile cards are drawn.
+
+            `rate_limiter` (`Optional[RateLimiter]`): (Optional) Default is a limiter of 5 commands per 10 seconds per user. Its idle buckets are swept every `rate_limit_sweep_interval` seconds.
+
+            `rate_limit_sweep_interval` (`float`): (Optional) Default is `60.0`. The seconds between two sweeps of the rate limiter.
     """
 
     def __init__(
@@ -48,6 +110,19 @@ class MyClient(Bot):
         extensions_folders: List[str],
         is_testing: bool = False,
         test_guild: Optional[discord.Object] = None,
+        command_hashes_path: Optional[str] = "./.command_hashes.json",
+        force_sync: bool = False,
+        sync_on_startup: bool = True,
+        concurrent_extensions: bool = True,
+        startup_report: StartupReport = STARTUP_REPORT,
+        log_pipeline: Optional[LoggingPipeline] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        metrics_export_path: Optional[str] = None,
+        metrics_export_interval: float = 15.0,
+        color_service: Optional[ColorService] = None,
+        card_renderer: Optional[CardRenderer] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        rate_limit_sweep_interval: float = 60.0,
         **options: Any,
     ) -> None:
         # Constructor-required
@@ -57,25 +132,170 @@ class MyClient(Bot):
         # Optional
         self.is_testing = is_testing
         self.TEST_GUILD = test_guild
+        self.command_hashes_path = command_hashes_path
+        self.force_sync = force_sync
+        self.sync_on_startup = sync_on_startup
+        self.concurrent_extensions = concurrent_extensions
+        self.startup_report = startup_report
+        self.log_pipeline = log_pipeline
+        self.metrics = metrics or MetricsRegistry()
+        self.metrics_export_path = metrics_export_path
+        self.metrics_export_interval = metrics_export_interval
+        self._colors = color_service
+        self._cards = card_renderer
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.rate_limit_sweep_interval = rate_limit_sweep_interval
+        self.scheduler = Scheduler()
+
+        if database_manager.metrics is None:
+            database_manager.metrics = self.metrics
+
+        database_manager.attach_scheduler(self.scheduler)
+
+        options.setdefault("tree_cls", MyCommandTree)
 
         return super().__init__(intents=intents, **options)
 
-    async def setup_hook(self) -> None:
+    @property
+    def colors(self) -> ColorService:
+        """Where embed colours are taken from avatars. Created on first use, since it needs `Pillow` and `numpy`."""
+        if self._colors is None:
+            from .colors import ColorService
+
+            self._colors = ColorService()
+
+        return self._colors
+
+    @property
+    def cards(self) -> CardRenderer:
+        """Where the profile cards are drawn. Created on first use, since it needs `Pillow`."""
+        if self._cards is None:
+            from .cards import CardRenderer
 
-        for folder in self.extensions_folders:
-            for file_path in glob.glob(os.path.join(folder, "*.py")):
+            self._cards = CardRenderer()
 
-                extension = os.path.basename(file_path).replace(".py", "")
-                await self.load_extension(f"{folder}.{extension}")
+        return self._cards
 
-                LOGGER.log(logging.INFO, f"Loaded {folder}.{extension}")
+    async def setup_hook(self) -> None:
+        self.scheduler.start()
+        self.scheduler.add_job(
+            self.sweep_rate_limits,
+            name="ratelimit.sweep",
+            interval=self.rate_limit_sweep_interval,
+            owner=self,
+        )
+
+        await self.load_extensions()
 
         self.check_testing()
 
-        await self.tree.sync(guild=self.TEST_GUILD if self.is_testing else None)
+        if self.sync_on_startup:
+            with self.startup_report.timed("step", "commands sync"):
+                await self.sync_commands(force=self.force_sync)
+
+        self.startup_report.log()
+        self.log_pipeline_stats()
+
+        if self.metrics_export_path is not None:
+            self.scheduler.add_job(
+                self.export_metrics,
+                name="metrics.export",
+                interval=self.metrics_export_interval,
+                owner=self,
+            )
+
+    async def load_extensions(self) -> None:
+        """Loads every extension of `extensions_folders`, timing each of them."""
+        extensions = [
+            f"{folder}.{os.path.basename(file_path)[:-3]}"
+            for folder in self.extensions_folders
+            for file_path in sorted(glob.glob(os.path.join(folder, "*.py")))
+        ]
+
+        with self.startup_report.timed("step", "extensions"):
+            if self.concurrent_extensions:
+                await asyncio.gather(*map(self._load_extension_timed, extensions))
+            else:
+                for extension in extensions:
+                    await self._load_extension_timed(extension)
+
+    async def _load_extension_timed(self, extension: str) -> None:
+        with self.startup_report.timed("extension", extension):
+            await self.load_extension(extension)
+
+        LOGGER.log(logging.INFO, f"Loaded {extension}")
+
+    async def sync_commands(self, *, force: bool = False) -> bool:
+        """Syncs the command tree to the current target, unless it didn't change since the last sync.
+
+        Args:
+            `force` (`bool`, optional): Whether to sync even if the commands didn't change. Defaults to `False`.
+
+        Returns:
+            `bool`: Whether the commands were synced.
+        """
+        guild = self.TEST_GUILD if self.is_testing else None
+        target = f"{self.application_id}:{guild.id if guild is not None else 'global'}"
+
+        commands_hash = self.commands_hash(guild)
+        stored_hashes = self._read_command_hashes()
+
+        if not force and stored_hashes.get(target) == commands_hash:
+            LOGGER.log(logging.INFO, f"Commands unchanged for {target}, skipped sync.")
+            print(f"{Fore.GREEN}Commands unchanged, skipped sync{Style.RESET_ALL}")
+            return False
+
+        started = time.perf_counter()
+        await self.tree.sync(guild=guild)
+        elapsed = time.perf_counter() - started
+
+        stored_hashes[target] = commands_hash
+        self._write_command_hashes(stored_hashes)
+
+        LOGGER.log(logging.INFO, f"Synced commands for {target} in {elapsed:.2f}s.")
+        print(f"{Fore.GREEN}Synced commands in {elapsed:.2f}s{Style.RESET_ALL}")
+        return True
 
-        LOGGER.log(logging.INFO, "Synced commands.")
-        print(f"{Fore.GREEN}Synced commands{Style.RESET_ALL}")
+    def commands_hash(self, guild: Optional[discord.Object] = None) -> str:
+        """Computes a stable hash of the serialized commands of a target.
+
+        Args:
+            `guild` (`Optional[discord.Object]`, optional): The guild, or `None` for the global commands. Defaults to `None`.
+
+        Returns:
+            `str`: The SHA-256 hex digest.
+        """
+        payload = sorted(
+            (command.to_dict() for command in self.tree.get_commands(guild=guild)),
+            key=lambda command: (command.get("type", 1), command["name"]),
+        )
+        serialized = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def _read_command_hashes(self) -> Dict[str, str]:
+        if self.command_hashes_path is None or not os.path.isfile(
+            self.command_hashes_path
+        ):
+            return {}
+
+        try:
+            with open(self.command_hashes_path, encoding="utf-8") as f:
+                return json.load(f)
+
+        except (OSError, ValueError):
+            LOGGER.log(logging.WARN, "Unreadable command hashes file, syncing anyway.")
+            return {}
+
+    def _write_command_hashes(self, hashes: Dict[str, str]) -> None:
+        if self.command_hashes_path is None:
+            return
+
+        temp_path = f"{self.command_hashes_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(hashes, f, indent=4)
+
+        os.replace(temp_path, self.command_hashes_path)
 
     def check_testing(self) -> None:
         """Checks whether the bot should be in testing mode or not.
@@ -96,7 +316,97 @@ class MyClient(Bot):
         elif not self.is_testing and self.TEST_GUILD is not None:
             raise IncompleteTestingError(2)
 
+    def record_command(self, interaction: Interaction, *, failed: bool = False) -> None:
+        """Records the latency of the command of an interaction, since it reached the command tree.
+
+        Args:
+            `interaction` (`Interaction`): The interaction.
+
+            `failed` (`bool`, optional): Whether the command raised an error. Defaults to `False`.
+        """
+        started_at = interaction.extras.pop("started_at", None)
+        if started_at is None or interaction.command is None:
+            return
+
+        self.metrics.observe_command(
+            interaction.command.qualified_name,
+            time.perf_counter() - started_at,
+            failed=failed,
+        )
+
+    async def on_app_command_completion(
+        self, interaction: Interaction, command: Any
+    ) -> None:
+        self.record_command(interaction)
+
+    async def sweep_rate_limits(self) -> None:
+        """Frees the rate limit buckets of the users idle long enough to be refilled."""
+        started = time.perf_counter()
+        freed = self.rate_limiter.sweep()
+
+        if freed:
+            LOGGER.log(
+                logging.DEBUG,
+                f"Swept {freed} rate limit buckets in {time.perf_counter() - started:.3f}s, {len(self.rate_limiter)} left.",
+            )
+
+    def metrics_gauges(self) -> Dict[str, float]:
+        """Collects the gauges exported along the metrics: gateway latency, cached players, rate limits, read pool and logging pipeline counters.
+
+        Returns:
+            `Dict[str, float]`: The values, by Prometheus metric name.
+        """
+        gauges: Dict[str, float] = {
+            "rpg_gateway_latency_seconds": self.latency,
+            "rpg_cached_players": len(self.database_manager.player_cache),
+            "rpg_dirty_players": self.database_manager.player_cache.dirty_count,
+        }
+
+        for name, value in self.rate_limiter.stats().items():
+            gauges[f"rpg_rate_limit_{name}"] = value
+
+        if self.database_manager.read_pool is not None:
+            for name, value in self.database_manager.pool_stats().items():
+                gauges[f"rpg_read_pool_{name}"] = value
+
+        if self.log_pipeline is not None:
+            for name, value in self.log_pipeline.stats().items():
+                gauges[f"rpg_log_{name}"] = value
+
+        return gauges
+
+    async def export_metrics(self) -> None:
+        """Writes the metrics to `metrics_export_path`. They are rendered on the event loop, which records them, and written off it."""
+        if self.metrics_export_path is None:
+            return
+
+        text = self.metrics.to_prometheus(self.metrics_gauges())
+
+        try:
+            await asyncio.to_thread(write_textfile, self.metrics_export_path, text)
+
+        except OSError as e:
+            LOGGER.log(logging.ERROR, f"Could not export the metrics: {e}")
+
+    def log_pipeline_stats(self) -> None:
+        """Logs the queue depth and dropped records counters of the logging pipeline, if any."""
+        if self.log_pipeline is None:
+            return
+
+        stats = self.log_pipeline.stats()
+        message = ", ".join(f"{name}={value}" for name, value in stats.items())
+
+        LOGGER.log(logging.WARN if stats["dropped"] else logging.INFO, f"Logging pipeline: {message}")
+
     async def close(self) -> None:
+        await self.scheduler.close()
+        await self.export_metrics()
+
+        if self._colors is not None:
+            await self._colors.close()
+        if self._cards is not None:
+            await self._cards.close()
+        self.log_pipeline_stats()
         LOGGER.log(logging.WARN, "The bot has been turned off.")
         print(f"{Fore.WHITE}{Back.RED}The bot has been turned off.{Style.RESET_ALL}")
         return await super().close()
@@ -0,0 +1,553 @@
+"""
+Custom module for running the bot as a cluster of processes.
+
+`discord.py >= 2.0.0` is required. The database writer listens on a Unix socket, so clusters only run on Unix systems.
+
+Run `python -m custom.cluster --processes 3 --shards 6` to try a cluster against a fake gateway, on a temporary database.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import discord
+from discord.ext.commands import AutoShardedBot
+
+from .client import MyClient
+from .database import DatabaseManager
+from .exceptions import InsufficientFunds
+from .writer import WriterServer
+
+LOGGER = logging.getLogger(__name__)
+
+# Discord allows one IDENTIFY every 5 seconds per bucket
+IDENTIFY_INTERVAL = 5.0
+
+FAKE_PLAYERS_BASE_ID = 10**17
+FAKE_STARTING_GOLD = 1000
+
+
+def shard_of(guild_id: int, shard_count: int) -> int:
+    """`Function`\n
+    Gets the shard receiving the events of a guild, like Discord does.
+
+    Args:
+        `guild_id` (`int`): The ID of the guild.
+
+        `shard_count` (`int`): The total number of shards.
+
+    Returns:
+        `int`: The shard ID.
+    """
+    return (guild_id >> 22) % shard_count
+
+
+def shard_ranges(shard_count: int, processes: int) -> List[List[int]]:
+    """`Function`\n
+    Splits the shards into contiguous ranges, one per process.
+
+    Args:
+        `shard_count` (`int`): The total number of shards.
+
+        `processes` (`int`): The number of processes.
+
+    Returns:
+        `List[List[int]]`: The shard IDs of each process.
+    """
+    if not 0 < processes <= shard_count:
+        raise ValueError(
+            f"processes must be between 1 and shard_count ({shard_count}), got {processes}"
+        )
+
+    size, extra = divmod(shard_count, processes)
+    ranges: List[List[int]] = []
+    start = 0
+
+    for index in range(processes):
+        end = start + size + (index < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+
+    return ranges
+
+
+class ClusterWorker:
+    """What a worker process of a `ClusterLauncher` is responsible for. Passed to the client factory."""
+
+    __slots__ = (
+        "worker_id",
+        "shard_ids",
+        "shard_count",
+        "writer_address",
+        "identify_lock",
+        "fake_gateway",
+    )
+
+    def __init__(
+        self,
+        worker_id: int,
+        shard_ids: List[int],
+        shard_count: int,
+        writer_address: str,
+        identify_lock: Any,
+        fake_gateway: bool,
+    ) -> None:
+        self.worker_id = worker_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.writer_address = writer_address
+        self.identify_lock = identify_lock
+        self.fake_gateway = fake_gateway
+
+    def client_options(self) -> Dict[str, Any]:
+        """`Method`\n
+        Gets the `MyShardedClient` arguments of this worker.
+
+        Returns:
+            `Dict[str, Any]`: The shards, the identify lock, and whether the commands are synced (only by the first worker).
+        """
+        return {
+            "shard_ids": self.shard_ids,
+            "shard_count": self.shard_count,
+            "identify_lock": self.identify_lock,
+            "sync_on_startup": self.worker_id == 0,
+        }
+
+
+class MyShardedClient(MyClient, AutoShardedBot):
+    """`MyClient` running several shards in one process.
+
+    Args added:
+
+        `identify_lock` (`Optional[multiprocessing.Lock]`): (Optional) Default is `None`. A lock shared by the processes of a cluster, so only one shard of the whole cluster identifies every 5 seconds.
+    """
+
+    def __init__(self, *, identify_lock: Any = None, **options: Any) -> None:
+        self.identify_lock = identify_lock
+        super().__init__(**options)
+
+    async def before_identify_hook(self, shard_id: Optional[int], *, initial: bool = False) -> None:
+        if self.identify_lock is None:
+            return await super().before_identify_hook(shard_id, initial=initial)
+
+        await asyncio.to_thread(self.identify_lock.acquire)
+        self.loop.call_later(IDENTIFY_INTERVAL, self.identify_lock.release)
+
+
+class FakeGateway:
+    """Drives a worker without connecting to Discord: generates events of guilds belonging to its shards, which change players through the remote writer.
+
+    Args:
+        `client` (`MyClient`): The client of the worker.
+
+        `worker` (`ClusterWorker`): The worker.
+
+        `player_ids` (`Sequence[int]`): The players the events are about, shared by every worker so that they conflict.
+    """
+
+    def __init__(
+        self, client: MyClient, worker: ClusterWorker, player_ids: Sequence[int]
+    ) -> None:
+        self.client = client
+        self.worker = worker
+        self.player_ids = player_ids
+        self.random = random.Random(worker.worker_id)
+
+        self.gold_paid: int = 0
+        self.rejected: int = 0
+        self.guilds: Counter[int] = Counter()
+
+    def guild_id(self) -> int:
+        """`Method`\n
+        Makes up the ID of a guild served by one of the worker shards.
+
+        Returns:
+            `int`: The guild ID.
+        """
+        shard_id = self.random.choice(self.worker.shard_ids)
+        timestamp = self.random.randrange(1000) * self.worker.shard_count + shard_id
+        return timestamp << 22
+
+    async def event(self) -> None:
+        """`Coro`\n
+        Handles one made-up event: a payout, a trade or a health change.
+        """
+        manager = self.client.database_manager
+        guild_id = self.guild_id()
+
+        shard_id = shard_of(guild_id, self.worker.shard_count)
+        if shard_id not in self.worker.shard_ids:
+            raise RuntimeError(f"Guild {guild_id} belongs to shard {shard_id}.")
+
+        self.guilds[shard_id] += 1
+        roll = self.random.random()
+
+        if roll < 0.5:
+            players = self.random.sample(self.player_ids, self.random.randint(1, 5))
+            gold = self.random.randint(1, 10)
+
+            await manager.transactions.payout(players, gold=gold, experience=gold)
+            self.gold_paid += gold * len(players)
+
+        elif roll < 0.9:
+            sender_id, receiver_id = self.random.sample(self.player_ids, 2)
+
+            try:
+                await manager.transactions.transfer(
+                    sender_id, receiver_id, self.random.randint(1, 200)
+                )
+            except InsufficientFunds:
+                self.rejected += 1
+
+        else:
+            await manager.update_player(
+                self.random.choice(self.player_ids), health=self.random.randint(1, 100)
+            )
+
+    async def run(self, events: int, *, concurrency: int = 32) -> Dict[str, Any]:
+        """`Coro`\n
+        Handles made-up events, `concurrency` at a time.
+
+        Args:
+            `events` (`int`): The number of events.
+
+            `concurrency` (`int`, optional): The number of events handled at the same time. Defaults to `32`.
+
+        Returns:
+            `Dict[str, Any]`: The report of the worker.
+        """
+        started = time.perf_counter()
+
+        for offset in range(0, events, concurrency):
+            await asyncio.gather(
+                *(self.event() for _ in range(min(concurrency, events - offset)))
+            )
+
+        await self.client.database_manager.flush_players()
+        elapsed = time.perf_counter() - started
+        writer = self.client.database_manager.writer
+
+        return {
+            "role": "worker",
+            "worker_id": self.worker.worker_id,
+            "shard_ids": self.worker.shard_ids,
+            "events": events,
+            "events_per_second": events / elapsed if elapsed else 0.0,
+            "gold_paid": self.gold_paid,
+            "rejected": self.rejected,
+            "events_per_shard": dict(self.guilds),
+            "batches_sent": writer.batches_sent,
+            "operations_sent": writer.operations_sent,
+            "transactions": self.client.database_manager.transactions.stats(),
+        }
+
+
+class ClusterLauncher:
+    """Runs the bot as one database writer process and several worker processes, each owning a range of shards.
+
+    The factories are called in the child processes, so they must be picklable (module-level functions or `functools.partial` of them).
+
+    Args:
+        `create_database_manager` (`Callable[[Optional[str]], DatabaseManager]`): Called with the writer socket in workers, and with `None` in the writer process.
+
+        `create_client` (`Callable[[ClusterWorker, DatabaseManager], MyClient]`): Creates the client of a worker, usually a `MyShardedClient` with `worker.client_options()`.
+
+        `processes` (`int`): The number of worker processes.
+
+        `shard_count` (`int`): The total number of shards.
+
+        `token` (`Optional[str]`, optional): The bot token. Required unless `fake_gateway` is set. Defaults to `None`.
+
+        `writer_address` (`str`, optional): The path of the writer Unix socket. Defaults to `"./.writer.sock"`.
+
+        `fake_gateway` (`bool`, optional): Whether workers run `FakeGateway` events instead of connecting to Discord. Defaults to `False`.
+
+        `fake_events` (`int`, optional): The number of events of each fake worker. Defaults to `1000`.
+
+        `fake_players` (`int`, optional): The number of players created by the writer for the fake workers. Defaults to `100`.
+
+    Example:
+    ```python
+    ClusterLauncher(create_database_manager, create_client, processes=2, shard_count=4, token=TOKEN).run()
+    ```
+    """
+
+    def __init__(
+        self,
+        create_database_manager: Callable[[Optional[str]], DatabaseManager],
+        create_client: Callable[[ClusterWorker, DatabaseManager], MyClient],
+        *,
+        processes: int,
+        shard_count: int,
+        token: Optional[str] = None,
+        writer_address: str = "./.writer.sock",
+        fake_gateway: bool = False,
+        fake_events: int = 1000,
+        fake_players: int = 100,
+    ) -> None:
+        if token is None and not fake_gateway:
+            raise ValueError("A token is required unless fake_gateway is set.")
+
+        self.create_database_manager = create_database_manager
+        self.create_client = create_client
+        self.processes = processes
+        self.shard_count = shard_count
+        self.token = token
+        self.writer_address = os.path.abspath(writer_address)
+        self.fake_gateway = fake_gateway
+        self.fake_events = fake_events
+        self.fake_players = fake_players
+
+    def run(self, *, writer_timeout: float = 60.0) -> List[Dict[str, Any]]:
+        """`Method`\n
+        Starts the writer, then the workers, and waits for the workers to exit before stopping the writer.
+
+        Args:
+            `writer_timeout` (`float`, optional): The seconds to wait for the writer to be ready. Defaults to `60.0`.
+
+        Raises:
+            `RuntimeError`: Raised if the writer doesn't start.
+
+        Returns:
+            `List[Dict[str, Any]]`: The reports of the processes that sent one, the writer's last.
+        """
+        # Spawned children don't inherit the event loop, threads or sockets of this process
+        context = multiprocessing.get_context("spawn")
+        ready = context.Event()
+        stop = context.Event()
+        results = context.Queue()
+
+        writer = context.Process(
+            target=_writer_main,
+            args=(self, ready, stop, results),
+            name="rpg-writer",
+        )
+        writer.start()
+
+        if not ready.wait(writer_timeout):
+            writer.terminate()
+            raise RuntimeError("The database writer didn't start.")
+
+        identify_lock = context.Lock()
+        workers = [
+            context.Process(
+                target=_worker_main,
+                args=(
+                    self,
+                    ClusterWorker(
+                        worker_id,
+                        shard_ids,
+                        self.shard_count,
+                        self.writer_address,
+                        identify_lock,
+                        self.fake_gateway,
+                    ),
+                    results,
+                ),
+                name=f"rpg-worker-{worker_id}",
+            )
+            for worker_id, shard_ids in enumerate(
+                shard_ranges(self.shard_count, self.processes)
+            )
+        ]
+
+        reports: List[Dict[str, Any]] = []
+
+        try:
+            for worker in workers:
+                worker.start()
+
+            for worker in workers:
+                worker.join()
+
+        finally:
+            stop.set()
+            writer.join()
+
+            while not results.empty():
+                reports.append(results.get())
+
+        reports.sort(key=lambda report: report["role"] == "writer")
+        return reports
+
+
+def summarize(reports: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """`Function`\n
+    Checks the reports of a fake gateway run: the gold of the fake players must have grown by exactly what was paid out.
+
+    Args:
+        `reports` (`List[Dict[str, Any]]`): The reports returned by `ClusterLauncher.run`.
+
+    Returns:
+        `Dict[str, Any]`: The expected and actual total gold, whether they match, and the total events per second.
+    """
+    workers = [report for report in reports if report["role"] == "worker"]
+    writer = next(report for report in reports if report["role"] == "writer")
+    expected = writer["gold_before"] + sum(report["gold_paid"] for report in workers)
+
+    return {
+        "expected_gold": expected,
+        "actual_gold": writer["gold_after"],
+        "consistent": expected == writer["gold_after"],
+        "events_per_second": sum(report["events_per_second"] for report in workers),
+        "writer": {
+            key: value for key, value in writer.items() if key not in ("role",)
+        },
+    }
+
+
+def _writer_main(launcher: ClusterLauncher, ready: Any, stop: Any, results: Any) -> None:
+    asyncio.run(_run_writer(launcher, ready, stop, results))
+
+
+async def _run_writer(
+    launcher: ClusterLauncher, ready: Any, stop: Any, results: Any
+) -> None:
+    manager = launcher.create_database_manager(None)
+
+    async with manager:
+        # Workers read through their own connections while the writer commits
+        await manager.connection.execute("PRAGMA journal_mode = WAL")
+
+        if launcher.fake_gateway:
+            await _seed_fake_players(manager, launcher.fake_players)
+
+        gold_before = await _fake_players_gold(manager, launcher.fake_players)
+
+        server = WriterServer(manager, launcher.writer_address)
+        await server.start()
+        ready.set()
+
+        try:
+            await asyncio.to_thread(stop.wait)
+        finally:
+            await server.close()
+
+        report = {"role": "writer", **server.stats()}
+        if launcher.fake_gateway:
+            report["gold_before"] = gold_before
+            report["gold_after"] = await _fake_players_gold(
+                manager, launcher.fake_players
+            )
+
+    results.put(report)
+
+
+def _worker_main(launcher: ClusterLauncher, worker: ClusterWorker, results: Any) -> None:
+    asyncio.run(_run_worker(launcher, worker, results))
+
+
+async def _run_worker(
+    launcher: ClusterLauncher, worker: ClusterWorker, results: Any
+) -> None:
+    manager = launcher.create_database_manager(worker.writer_address)
+    client = launcher.create_client(worker, manager)
+
+    try:
+        if not worker.fake_gateway:
+            async with client, manager:
+                await client.start(launcher.token)
+            return
+
+        async with client, manager:
+            client.scheduler.start()
+            await client.load_extensions()
+
+            gateway = FakeGateway(
+                client,
+                worker,
+                [FAKE_PLAYERS_BASE_ID + index for index in range(launcher.fake_players)],
+            )
+            results.put(await gateway.run(launcher.fake_events))
+
+    finally:
+        if client.log_pipeline is not None:
+            client.log_pipeline.stop()
+
+
+async def _seed_fake_players(manager: DatabaseManager, count: int) -> None:
+    async with manager.transaction() as connection:
+        await connection.executemany(
+            "INSERT OR IGNORE INTO players (user_id, class, gold) VALUES (?, 'Warrior', ?)",
+            [(FAKE_PLAYERS_BASE_ID + index, FAKE_STARTING_GOLD) for index in range(count)],
+        )
+
+
+async def _fake_players_gold(manager: DatabaseManager, count: int) -> int:
+    async with manager.create_cursor() as cursor:
+        await cursor.execute(
+            "SELECT COALESCE(SUM(gold), 0) FROM players WHERE user_id BETWEEN ? AND ?",
+            (FAKE_PLAYERS_BASE_ID, FAKE_PLAYERS_BASE_ID + count - 1),
+        )
+        (gold,) = await cursor.fetchone()
+
+    return gold
+
+
+def _fake_database_manager(
+    database_file_path: str, migrations_path: str, writer_address: Optional[str]
+) -> DatabaseManager:
+    return DatabaseManager(
+        database_file_path,
+        database_migrations_path=migrations_path,
+        writer_address=writer_address,
+        player_flush_threshold=32,
+    )
+
+
+def _fake_client(worker: ClusterWorker, database_manager: DatabaseManager) -> MyClient:
+    return MyShardedClient(
+        command_prefix="!",
+        intents=discord.Intents.default(),
+        database_manager=database_manager,
+        extensions_folders=[],
+        command_hashes_path=None,
+        **worker.client_options(),
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Runs a cluster against a fake gateway, on a temporary database."
+    )
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=100)
+    arguments = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as folder:
+        launcher = ClusterLauncher(
+            functools.partial(
+                _fake_database_manager,
+                os.path.join(folder, "cluster.db"),
+                os.path.join(
+                    os.path.dirname(__file__), "..", "databases", "schemas", "migrations"
+                ),
+            ),
+            _fake_client,
+            processes=arguments.processes,
+            shard_count=arguments.shards,
+            writer_address=os.path.join(folder, "writer.sock"),
+            fake_gateway=True,
+            fake_events=arguments.events,
+            fake_players=arguments.players,
+        )
+        reports = launcher.run()
+
+    for report in reports:
+        print(report)
+
+    print(summarize(reports))
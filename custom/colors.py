@@ -0,0 +1,308 @@
+"""
+Custom module for dominant colour extraction.
+
+`Pillow` and `numpy` are required.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Awaitable, Callable, Dict, Optional
+
+import discord
+
+LOGGER = logging.getLogger(__name__)
+
+DEFAULT_COLOR = 0x2F3136
+
+
+def dominant_color(data: bytes, *, size: int = 64, bits: int = 5) -> int:
+    """`Function`\n
+    Finds the most common colour of an image.
+
+    The image is downsampled, its pixels are quantized to `bits` bits per channel and counted
+    with a single `numpy.bincount`, then the pixels of the most populated bin are averaged.
+    Transparent pixels are ignored.
+
+    Args:
+        `data` (`bytes`): The encoded image.
+
+        `size` (`int`, optional): The maximum width and height the image is downsampled to. Defaults to `64`.
+
+        `bits` (`int`, optional): The precision of the quantization per channel. Defaults to `5`.
+
+    Returns:
+        `int`: The colour as `0xRRGGBB`, or `DEFAULT_COLOR` if every pixel is transparent.
+    """
+    # Imported here, so that only the processes extracting colours load them
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (size, size))  # Decodes JPEGs at a lower resolution directly
+        image = image.convert("RGBA")
+        image.thumbnail((size, size), Image.Resampling.NEAREST)
+        pixels = np.asarray(image).reshape(-1, 4)
+
+    pixels = pixels[pixels[:, 3] >= 128, :3].astype(np.int64)
+    if not len(pixels):
+        return DEFAULT_COLOR
+
+    shift = 8 - bits
+    quantized = pixels >> shift
+    bins = (quantized[:, 0] << (2 * bits)) | (quantized[:, 1] << bits) | quantized[:, 2]
+
+    counts = np.bincount(bins, minlength=1 << (3 * bits))
+    red, green, blue = pixels[bins == counts.argmax()].mean(axis=0).round().astype(int)
+
+    return (int(red) << 16) | (int(green) << 8) | int(blue)
+
+
+class ColorService:
+    """Extracts the dominant colour of images off the event loop, with an LRU cache and an optional disk cache.
+
+    Colours are cached by a key identifying the image content (like an avatar hash), so the same image is never processed twice,
+    and concurrent requests for the same key share one extraction.
+
+    Args:
+        `cache_size` (`int`, optional): The maximum number of colours kept in memory. Defaults to `4096`.
+
+        `cache_path` (`Optional[str]`, optional): The JSON file where the colours are persisted across restarts. Defaults to `None` (memory only).
+
+        `executor` (`Optional[Executor]`, optional): Where the extractions run. Defaults to a process pool of `max_workers`, created on first use.
+
+        `max_workers` (`int`, optional): The size of the default process pool. Defaults to `2`.
+
+        `save_every` (`int`, optional): The number of new colours after which the disk cache is written. Defaults to `64`.
+    """
+
+    def __init__(
+        self,
+        *,
+        cache_size: int = 4096,
+        cache_path: Optional[str] = None,
+        executor: Optional[Executor] = None,
+        max_workers: int = 2,
+        save_every: int = 64,
+    ) -> None:
+        self.cache_size = cache_size
+        self.cache_path = cache_path
+        self.max_workers = max_workers
+        self.save_every = save_every
+
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._colors: OrderedDict[str, int] = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._unsaved: int = 0
+        self._disk_loaded = cache_path is None
+
+        self.hits: int = 0
+        self.misses: int = 0
+
+    async def get_color(
+        self, key: str, fetch: Callable[[], Awaitable[bytes]]
+    ) -> int:
+        """`Coro`\n
+        Gets the dominant colour of an image.
+
+        Args:
+            `key` (`str`): A key that changes whenever the image does.
+
+            `fetch` (`Callable[[], Awaitable[bytes]]`): Called to download the image if its colour isn't cached.
+
+        Returns:
+            `int`: The colour as `0xRRGGBB`, or `DEFAULT_COLOR` if the image can't be read.
+
+        Example:
+        ```python
+        await get_color(asset.key, asset.read)
+        ```
+        """
+        if not self._disk_loaded:
+            await self._load_disk_cache()
+
+        color = self._colors.get(key)
+        if color is not None:
+            self._colors.move_to_end(key)
+            self.hits += 1
+            return color
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.hits += 1
+
+            try:
+                return await asyncio.shield(pending)
+
+            except asyncio.CancelledError:
+                # The request that was extracting the colour got cancelled, not this one
+                if not pending.cancelled():
+                    raise
+
+                return await self.get_color(key, fetch)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+
+        try:
+            color = await self._extract(fetch)
+            self._store(key, color)
+            future.set_result(color)
+
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Marks it retrieved when nobody else awaits it
+            raise
+
+        finally:
+            del self._pending[key]
+
+        if self.cache_path is not None and self._unsaved >= self.save_every:
+            await self.save()
+
+        return color
+
+    async def avatar_color(self, user: discord.abc.User) -> int:
+        """`Coro`\n
+        Gets the dominant colour of the avatar of a user. The avatar is downloaded at 64px.
+
+        Args:
+            `user` (`discord.abc.User`): The user or member.
+
+        Returns:
+            `int`: The colour as `0xRRGGBB`.
+
+        Example:
+        ```python
+        embed = discord.Embed(color=await avatar_color(interaction.user))
+        ```
+        """
+        asset = user.display_avatar
+        return await self.get_color(
+            asset.key, asset.replace(size=64, static_format="png").read
+        )
+
+    async def _extract(self, fetch: Callable[[], Awaitable[bytes]]) -> int:
+        try:
+            data = await fetch()
+
+        except discord.HTTPException as e:
+            LOGGER.warning("Could not download an image for its colour.", exc_info=e)
+            return DEFAULT_COLOR
+
+        from PIL import Image  # For its error types, the extraction itself runs in the executor
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.max_workers)
+
+        executor = self._executor
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                executor, dominant_color, data
+            )
+
+        except (OSError, ValueError, Image.DecompressionBombError) as e:  # Pillow errors on unreadable images
+            LOGGER.warning("Could not read an image for its colour.", exc_info=e)
+            return DEFAULT_COLOR
+
+        except BrokenProcessPool as e:
+            LOGGER.warning("The colours process pool broke, it is replaced.", exc_info=e)
+
+            # A broken pool fails every later extraction, so the next one starts a new pool
+            if self._owns_executor and self._executor is executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+            return DEFAULT_COLOR
+
+    def _store(self, key: str, color: int) -> None:
+        self._colors[key] = color
+        self._colors.move_to_end(key)
+        self._unsaved += 1
+
+        while len(self._colors) > self.cache_size:
+            self._colors.popitem(last=False)
+
+    async def _load_disk_cache(self) -> None:
+        self._disk_loaded = True
+
+        try:
+            colors = await asyncio.to_thread(self._read_disk_cache)
+
+        except (OSError, ValueError) as e:
+            LOGGER.warning("Unreadable colours cache, starting empty.", exc_info=e)
+            return
+
+        for key, color in colors.items():
+            self._colors.setdefault(key, color)
+
+        while len(self._colors) > self.cache_size:
+            self._colors.popitem(last=False)
+
+    def _read_disk_cache(self) -> Dict[str, int]:
+        if not os.path.isfile(self.cache_path):
+            return {}
+
+        with open(self.cache_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_disk_cache(self, colors: Dict[str, int]) -> None:
+        temp_path = f"{self.cache_path}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(colors, f)
+
+        os.replace(temp_path, self.cache_path)
+
+    async def save(self) -> None:
+        """`Coro`\n
+        Writes the cached colours to `cache_path`, if set.
+        """
+        if self.cache_path is None or not self._disk_loaded:
+            return
+
+        self._unsaved = 0
+
+        try:
+            await asyncio.to_thread(self._write_disk_cache, dict(self._colors))
+
+        except OSError as e:
+            LOGGER.warning("Could not save the colours cache.", exc_info=e)
+
+    async def close(self) -> None:
+        """`Coro`\n
+        Saves the disk cache and shuts down the default process pool.
+        """
+        await self.save()
+
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, int]:
+        """`Method`\n
+        Gets the cache counters.
+
+        Returns:
+            `Dict[str, int]`: The cached colours, hits, misses and extractions in progress.
+        """
+        return {
+            "cached": len(self._colors),
+            "hits": self.hits,
+            "misses": self.misses,
+            "pending": len(self._pending),
+        }
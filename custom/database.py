@@ -2,39 +2,114 @@
 Custom module for database management.
 
 `aiosqlite >= 0.18.0` is required.
+
+SQLite >= 3.24.0 is required for the players cache upserts.
 """
 
 from __future__ import annotations
 
+import asyncio
 import aiosqlite
 import colorama
 from colorama import Fore, Back, Style
 import os
-import shutil
-import glob
-from typing import Any, Optional, List, Dict, Union
+import sqlite3
+import time
+from typing import Any, Callable, Optional, List, Dict, Iterable, Union, TYPE_CHECKING
 import logging
 import datetime
-from contextlib import asynccontextmanager, _AsyncGeneratorContextManager
+from contextlib import asynccontextmanager, nullcontext, _AsyncGeneratorContextManager
+
+from .cache import PLAYER_COLUMNS, PlayerCache, PlayerRecord
+from .exceptions import UserNotFoundError
+from .backups import BackupCatalog, RetentionPolicy
+from .items import ItemCatalog
+from .leaderboard import Leaderboard
+from .logs import handled_by_ancestors
+from .metrics import MetricsRegistry
+from .migrations import MigrationResult, MigrationRunner
+from .pool import ReadConnectionPool
+from .repository import InventoryRepository, PlayerRepository
+from .scheduler import Job, Scheduler
+from .transactions import KEPT_COLUMNS, UPSERT_PLAYER_KEEP_BALANCES, TransactionEngine
+from .writer import WriterClient
+
+if TYPE_CHECKING:
+    from .combat import CombatEngine
 
 
 colorama.init()
 # See https://stackoverflow.com/questions/12179271/meaning-of-classmethod-and-staticmethod-for-beginner
 
+SELECT_PLAYER = f"SELECT {', '.join(PLAYER_COLUMNS)} FROM players WHERE user_id = ?"
+
 
 class DatabaseManager:
+    """Manages the connection to the users database.
+
+    Args:
+        `database_file_path` (`str`): The path of the database file.
+
+        `database_schema_path` (`Optional[str]`, optional): The path of the schema to load on the first run. Ignored if `database_migrations_path` is given. Defaults to `None`.
+
+        `database_migrations_path` (`Optional[str]`, optional): The folder of the migrations applied on connect. See `custom.migrations`. Defaults to `None`.
+
+        `database_backups_path` (`Optional[str]`, optional): The folder where backup files are created. Defaults to `None`.
+
+        `logger` (`Optional[Union[logging.Logger, str]]`, optional): See `get_logger_instance`. Defaults to `None`.
+
+        `player_cache_size` (`int`, optional): The maximum number of `players` rows kept in memory. Defaults to `1024`.
+
+        `player_flush_threshold` (`int`, optional): The number of changed rows that triggers an immediate flush. Defaults to `256`.
+
+        `player_flush_interval` (`Optional[float]`, optional): Seconds between periodic flushes of changed rows. `NoneType` disables the periodic flush. Defaults to `30.0`.
+
+        `read_pool_size` (`int`, optional): The number of read-only connections. If greater than `0`, the database is switched to WAL mode and `create_cursor(readonly=True)` uses the pool. Defaults to `0`.
+
+        `pool_acquire_timeout` (`Optional[float]`, optional): Seconds to wait for a free read-only connection. Defaults to `5.0`.
+
+        `backup_pages_per_step` (`int`, optional): The number of pages copied by each step of an online backup. Defaults to `256`.
+
+        `backup_step_sleep` (`float`, optional): Seconds to pause between two steps of an online backup. Defaults to `0.005`.
+
+        `backup_retention` (`Optional[RetentionPolicy]`, optional): The policy used to prune old backups after each backup. `NoneType` keeps every backup. Defaults to `None`.
+
+        `metrics` (`Optional[MetricsRegistry]`, optional): Where labelled queries and lock waits are recorded. Can be assigned later. Defaults to `None`.
+
+        `lock_stripes` (`int`, optional): The number of player locks of `transactions`. Defaults to `64`.
+
+        `writer_address` (`Optional[str]`, optional): The Unix socket of a `WriterServer` owning the database, in another process. If given, the database is opened read-only, migrations are left to the writer, and every write is sent to it. Defaults to `None`.
+    """
+
     def __init__(
         self,
         database_file_path: str,
         *,
         database_schema_path: Optional[str] = None,
+        database_migrations_path: Optional[str] = None,
         database_backups_path: Optional[str] = None,
         logger: Optional[Union[logging.Logger, str]] = None,
+        player_cache_size: int = 1024,
+        player_flush_threshold: int = 256,
+        player_flush_interval: Optional[float] = 30.0,
+        read_pool_size: int = 0,
+        pool_acquire_timeout: Optional[float] = 5.0,
+        backup_pages_per_step: int = 256,
+        backup_step_sleep: float = 0.005,
+        backup_retention: Optional[RetentionPolicy] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        lock_stripes: int = 64,
+        writer_address: Optional[str] = None,
     ):
         self.database_file_path = os.path.normpath(database_file_path)
         self.database_schema_path = (
             os.path.normpath(database_schema_path) if database_schema_path else None
         )
+        self.database_migrations_path = (
+            os.path.normpath(database_migrations_path)
+            if database_migrations_path
+            else None
+        )
         self.database_backups_path = (
             os.path.normpath(database_backups_path) if database_backups_path else None
         )
@@ -44,6 +119,34 @@ class DatabaseManager:
 
         self.is_connected: bool = False
         self.connection = None
+        self.metrics = metrics
+
+        self.players = PlayerRepository(self)
+        self.inventories = InventoryRepository(self)
+        self.transactions = TransactionEngine(self, stripes=lock_stripes)
+        self._combat: Optional[CombatEngine] = None
+
+        self.writer_address = writer_address
+        self.writer: Optional[WriterClient] = None
+
+        self.player_cache = PlayerCache(player_cache_size)
+        self.leaderboard = Leaderboard()
+        self.items = ItemCatalog()
+        self.player_flush_threshold = player_flush_threshold
+        self.player_flush_interval = player_flush_interval
+        self.write_lock = asyncio.Lock()
+        self._flush_task: Optional[Union[asyncio.Task, Job]] = None
+        self.scheduler: Optional[Scheduler] = None
+
+        self.read_pool_size = read_pool_size
+        self.pool_acquire_timeout = pool_acquire_timeout
+        self.read_pool: Optional[ReadConnectionPool] = None
+
+        self.backup_pages_per_step = backup_pages_per_step
+        self.backup_step_sleep = backup_step_sleep
+        self.backup_retention = backup_retention
+        self._backup_catalog: Optional[BackupCatalog] = None
+        self._backup_catalog_lock = asyncio.Lock()
 
     async def __aenter__(self):
         if not self.is_connected:
@@ -98,16 +201,16 @@ class DatabaseManager:
         Args:
             `level` (`Optional[int]`, optional): The level of the logger. Defaults to `logging.INFO`.
 
-            `handler` (`Optional[logging.Handler]`, optional): The handler of the logger. Defaults to `logging.StreamHandler`.
+            `handler` (`Optional[logging.Handler]`, optional): The handler of the logger. Defaults to `logging.StreamHandler`. If an ancestor logger already has it, like the `QueueHandler` of a `LoggingPipeline` attached to the root logger, the records reach it by propagation and it isn't added again.
 
-            `formatter` (`Optional[logging.Formatter]`, optional): The formatter of the logger.
+            `formatter` (`Optional[logging.Formatter]`, optional): The formatter of the logger. Ignored if the handler is already attached to an ancestor.
 
         Example:
         ```python
         logging_setup(level=logging.DEBUG, handler=logging.FileHandler(**params))
         ```
         """
-        for _logger in self.logger.handlers:
+        for _logger in list(self.logger.handlers):
             self.logger.removeHandler(_logger)
 
         if level is None:
@@ -116,6 +219,11 @@ class DatabaseManager:
         if handler is None:
             handler = logging.StreamHandler()
 
+        self.logger.setLevel(level)
+
+        if handled_by_ancestors(self.logger, handler):
+            return
+
         if formatter is None:
             dt_fmt: str = r"%Y-%m-%d %H:%M:%S"
             formatter = logging.Formatter(
@@ -123,7 +231,6 @@ class DatabaseManager:
             )
 
         handler.setFormatter(formatter)
-        self.logger.setLevel(level)
         self.logger.addHandler(handler)
 
     def log(
@@ -177,19 +284,47 @@ class DatabaseManager:
         """
         self.log("Attempting connection to the database...", level=logging.INFO)
 
+        conn: Optional[aiosqlite.Connection] = None
+
         try:
             db_already_exists: bool = self.check_database_exists()
-            conn: aiosqlite.Connection = await aiosqlite.connect(
-                self.database_file_path
-            )
-            await self.load_schema(conn, db_already_exists)
+
+            if self.writer_address is not None:
+                conn = await aiosqlite.connect(
+                    f"file:{self.database_file_path}?mode=ro", uri=True
+                )
+                self.writer = WriterClient(self.writer_address)
+                await self.writer.connect()
+
+            else:
+                conn = await aiosqlite.connect(
+                    self.database_file_path
+                )
+                if self.database_migrations_path is not None:
+                    await self.migrate(conn)
+                else:
+                    await self.load_schema(conn, db_already_exists)
+
+            if self.read_pool_size > 0:
+                await self.open_read_pool(conn)
+
+            await self.load_leaderboard(conn)
+            await self.load_items(conn)
 
             self.is_connected = True
+            self._start_flush_loop()
             return conn
 
         except aiosqlite.Error as e:
             self.is_connected = False
 
+            if conn is not None:
+                await conn.close()
+
+            if self.writer is not None:
+                await self.writer.close()
+                self.writer = None
+
             self.log("Error connecting to the database.", level=logging.ERROR, error=e)
 
             raise e
@@ -215,8 +350,20 @@ class DatabaseManager:
         """
         self.log("Attempting to disconnect from the database...", level=logging.INFO)
 
+        self._stop_flush_loop()
+
         try:
+            await self.flush_players()
             await self.connection.commit()
+
+            if self.read_pool is not None:
+                await self.read_pool.close()
+                self.read_pool = None
+
+            if self.writer is not None:
+                await self.writer.close()
+                self.writer = None
+
             await self.connection.close()
 
         except aiosqlite.Error as e:
@@ -233,6 +380,93 @@ class DatabaseManager:
                     "Successfully disconnected from the database.", level=logging.INFO
                 )
 
+    async def load_leaderboard(self, connection: aiosqlite.Connection) -> None:
+        """`Coro`\n
+        Loads the rankings of every player in `leaderboard`. Later changes made through this manager keep it up to date.
+
+        Args:
+            `connection` (`aiosqlite.Connection`): The connection to read from.
+
+        Example:
+        ```python
+        await load_leaderboard(connection)
+        ```
+        """
+        started = time.perf_counter()
+
+        rows = await connection.execute_fetchall(self.leaderboard.select_query)
+        self.leaderboard.load(rows)
+
+        self.log(
+            f"Loaded the leaderboard of {len(self.leaderboard)} players in {time.perf_counter() - started:.3f}s.",
+            level=logging.INFO,
+        )
+
+    async def load_items(self, connection: aiosqlite.Connection) -> None:
+        """`Coro`\n
+        Loads the item catalog in `items`.
+
+        Args:
+            `connection` (`aiosqlite.Connection`): The connection to read from.
+
+        Example:
+        ```python
+        await load_items(connection)
+        ```
+        """
+        self.items.load(await connection.execute_fetchall(self.items.select_query))
+
+        self.log(f"Loaded {len(self.items)} items.", level=logging.INFO)
+
+    async def open_read_pool(self, connection: aiosqlite.Connection) -> None:
+        """`Coro`\n
+        Switches the database to WAL mode and opens the read-only connections pool.
+
+        Args:
+            `connection` (`aiosqlite.Connection`): The writer connection since it will most likely not be assigned yet.
+
+        Raises:
+            `aiosqlite.Error`: Raised if a connection fails.
+
+        Example:
+        ```python
+        await open_read_pool(some_connection)
+        ```
+        """
+        async with connection.execute("PRAGMA journal_mode = WAL") as cursor:
+            (journal_mode,) = await cursor.fetchone()
+
+        if journal_mode.lower() != "wal":
+            self.log(
+                f"Could not enable WAL mode (got '{journal_mode}'), reads may block writes.",
+                level=logging.WARNING,
+            )
+
+        self.read_pool = ReadConnectionPool(
+            self.database_file_path,
+            self.read_pool_size,
+            acquire_timeout=self.pool_acquire_timeout,
+        )
+        await self.read_pool.open()
+
+        self.log(
+            f"Opened {self.read_pool_size} read-only connections.", level=logging.INFO
+        )
+
+    def pool_stats(self) -> Optional[Dict[str, Union[int, float]]]:
+        """`Method`\n
+        Gets the read-only connections pool statistics.
+
+        Returns:
+            `Optional[Dict[str, Union[int, float]]]`: See `ReadConnectionPool.stats`, or `NoneType` if the pool is disabled.
+
+        Example:
+        ```python
+        pool_stats()
+        ```
+        """
+        return self.read_pool.stats() if self.read_pool is not None else None
+
     def check_database_exists(self) -> bool:
         """`Method`\n
         Checks if the database file already exists.
@@ -297,65 +531,244 @@ class DatabaseManager:
             level=logging.INFO,
         )
 
-    async def backup(self) -> None:
+    async def migrate(
+        self,
+        connection: Optional[aiosqlite.Connection] = None,
+        *,
+        dry_run: bool = False,
+        target: Optional[int] = None,
+    ) -> List[MigrationResult]:
+        """`Coro`\n
+        Applies the pending migrations of `database_migrations_path`, each in its own transaction.
+
+        Args:
+            `connection` (`Optional[aiosqlite.Connection]`, optional): The connection, since it will most likely not be assigned yet on connect. Defaults to `None` (the current connection).
+
+            `dry_run` (`bool`, optional): Runs the next migration and rolls it back, to check it and time it. Defaults to `False`.
+
+            `target` (`Optional[int]`, optional): The last version to apply. Defaults to `None` (all of them).
+
+        Raises:
+            `aiosqlite.Error`: Raised if a migration fails. It is rolled back and the following ones are not applied.
+
+        Returns:
+            `List[MigrationResult]`: The result of each pending migration.
+
+        Example:
+        ```python
+        await migrate(dry_run=True)
+        ```
+        """
+        if self.database_migrations_path is None:
+            self.log("No migrations folder was provided. Skipping this step.")
+            return []
+
+        runner = MigrationRunner(
+            self.database_migrations_path,
+            log=lambda message: self.log(message, level=logging.INFO),
+        )
+        connection = connection or self.connection
+
+        try:
+            results = await runner.run(connection, dry_run=dry_run, target=target)
+
+        except aiosqlite.Error as e:
+            self.log("Error applying a migration.", level=logging.ERROR, error=e)
+            raise e
+
+        if not results:
+            self.log("The database schema is up to date.", level=logging.INFO)
+
+        return results
+
+    async def backup(
+        self,
+        *,
+        pages_per_step: Optional[int] = None,
+        step_sleep: Optional[float] = None,
+        progress: Optional[Callable[[int, int], Any]] = None,
+    ) -> str:
         """`Coro`\n
-        Creates a backup file of the database.
+        Creates a backup file of the database while it stays online.\n
+        The pages are copied in steps by SQLite's backup API on a worker thread, so the event loop and the main connection are never blocked.
+        Note that writes committed by the main connection during the backup restart the copy, which is why the players cache is flushed first.
+
+        Args:
+            `pages_per_step` (`Optional[int]`, optional): The number of pages copied by each step. Defaults to `backup_pages_per_step`.
+
+            `step_sleep` (`Optional[float]`, optional): Seconds to pause between two steps. Defaults to `backup_step_sleep`.
+
+            `progress` (`Optional[Callable[[int, int], Any]]`, optional): Called on the event loop after each step with the copied and total page counts. Defaults to `None`.
+
+        Raises:
+            `sqlite3.Error`: Raised if the backup fails.
+
+        Returns:
+            `str`: The path of the backup file.
 
         Example:
         ```python
-        await backup()
+        await backup(pages_per_step=64, progress=lambda copied, total: print(copied, total))
         ```
         """
         self.log("Creating a database backup...", level=logging.INFO)
 
-        right_now = datetime.datetime.now()
-        right_now = right_now.strftime(r"[%d-%m-%Y]_-_[%H-%M-%S]")
+        if pages_per_step is None:
+            pages_per_step = self.backup_pages_per_step
+        if step_sleep is None:
+            step_sleep = self.backup_step_sleep
 
-        file_name = os.path.basename(self.database_file_path)
+        created_at = datetime.datetime.now()
+        catalog = await self.get_backup_catalog()  # Loaded before the new file exists
 
+        backup_name = catalog.new_file_name(
+            os.path.basename(self.database_file_path), created_at
+        )
         backup_path = os.path.normpath(
-            os.path.join(self.database_backups_path, f"{right_now}_-_{file_name}.bak")
+            os.path.join(self.database_backups_path, backup_name)
         )
 
-        await self.disconnect()
+        if self.is_connected:
+            await self.flush_players()
+
+            async with self.write_lock:
+                await self.connection.commit()
+
+        loop = asyncio.get_running_loop()
+        last_logged: List[int] = [-1]
+
+        def report(remaining: int, total: int) -> None:
+            copied = total - remaining
+            percent = copied * 100 // total if total else 100
+
+            if percent // 25 > last_logged[0]:
+                last_logged[0] = percent // 25
+                self.log(f"Database backup {percent}% complete.", level=logging.INFO)
+
+            if progress is not None:
+                progress(copied, total)
+
+        def step(status: int, remaining: int, total: int) -> None:
+            loop.call_soon_threadsafe(report, remaining, total)
+
+            # The `sleep` of the backup API only applies when a step is busy or locked, so the pause between steps is taken here
+            if remaining and step_sleep > 0:
+                time.sleep(step_sleep)
+
+        def copy() -> None:
+            source = sqlite3.connect(self.database_file_path)
+            target = sqlite3.connect(backup_path)
+            try:
+                source.backup(
+                    target, pages=pages_per_step, progress=step, sleep=step_sleep
+                )
+            finally:
+                target.close()
+                source.close()
+
+        started = time.perf_counter()
 
-        shutil.copy2(self.database_file_path, backup_path)
-        self.log("Database backup complete.", level=logging.INFO)
+        try:
+            await asyncio.to_thread(copy)
+
+        except sqlite3.Error as e:
+            self.log("Error creating the database backup.", level=logging.ERROR, error=e)
+            raise e
+
+        self.log(
+            f"Database backup complete in {time.perf_counter() - started:.3f}s: {backup_path}",
+            level=logging.INFO,
+        )
+
+        await catalog.record(backup_name, created_at.timestamp())
+
+        if self.backup_retention is not None:
+            removed = await catalog.prune(self.backup_retention)
+            if removed:
+                self.log(f"Pruned {len(removed)} old backups.", level=logging.INFO)
+
+        return backup_path
+
+    @property
+    def combat(self) -> CombatEngine:
+        """The engine of the fights between players and bosses, created on first use since it needs `numpy`."""
+        if self._combat is None:
+            from .combat import CombatEngine
+
+            self._combat = CombatEngine(self)
+
+        return self._combat
+
+    async def get_backup_catalog(self) -> BackupCatalog:
+        """`Coro`\n
+        Gets the catalog of the backup files. It is loaded on first use in a worker thread, since building it hashes every backup file.
+
+        Returns:
+            `BackupCatalog`: The catalog.
+        """
+        async with self._backup_catalog_lock:
+            if self._backup_catalog is None:
+                self._backup_catalog = await asyncio.to_thread(
+                    BackupCatalog, self.database_backups_path
+                )
 
-        self.connection = await self.connect()
+        return self._backup_catalog
 
-    async def recover(self) -> None:
+    async def recover(self, at: Optional[datetime.datetime] = None) -> None:
         """`Coro`\n
-        Restores the database using the last backup file.\n
+        Restores the database using the last backup file, or the last one made at or before a point in time.\n
         Note that this method will overwrite the current database file, so use it with caution.
 
+        Args:
+            `at` (`Optional[datetime.datetime]`, optional): The point in time to restore. Defaults to `None` (latest backup).
+
+        Raises:
+            `CorruptedBackupError`: Raised if the backup doesn't match its checksum. The database is reconnected untouched.
+
         Example:
         ```python
-        await recover()
+        await recover(datetime.datetime(2023, 3, 1, 12))
         ```
         """
         self.log("Recovering the latest database backup...", level=logging.INFO)
 
-        backup_files = glob.glob(os.path.join(self.database_backups_path, "*.bak"))
-        if not backup_files:
+        catalog = await self.get_backup_catalog()
+        entry = catalog.latest() if at is None else catalog.at(at)
+        if entry is None:
             self.log("No backup files found!", level=logging.WARNING)
             return
 
-        backup_file = max(backup_files, key=os.path.getctime)
-
         await self.disconnect()
 
-        # DEBUG: self.database_file_path -> "./databases/recovery.db"
-        shutil.copy2(backup_file, self.database_file_path)
-        self.log("Database recovery complete.", level=logging.INFO)
+        try:
+            # DEBUG: self.database_file_path -> "./databases/recovery.db"
+            await catalog.restore(entry, self.database_file_path)
+
+            for suffix in ("-wal", "-shm"):
+                if os.path.isfile(self.database_file_path + suffix):
+                    os.remove(self.database_file_path + suffix)
+
+            self.player_cache.clear()
+            self.log(f"Database recovery complete: {entry.file_name}", level=logging.INFO)
 
-        self.connection = await self.connect()
+        finally:
+            self.connection = await self.connect()
 
     @asynccontextmanager
-    async def create_cursor(self) -> _AsyncGeneratorContextManager[aiosqlite.Cursor]:
+    async def create_cursor(
+        self, *, readonly: bool = False, label: Optional[str] = None
+    ) -> _AsyncGeneratorContextManager[aiosqlite.Cursor]:
         """`Coro`\n
         Create a new cursor that can be used to query the database.
 
+        Args:
+            `readonly` (`bool`, optional): Whether to use a connection of the read-only pool, if enabled. Note that such a cursor doesn't see uncommitted writes, including the players cache. Defaults to `False`.
+
+            `label` (`Optional[str]`, optional): The name under which the time spent using the cursor is recorded in `metrics`. Defaults to `None` (not recorded).
+
+        Raises:
+            `PoolTimeoutError`: Raised if `readonly` is `True` and no read-only connection is freed in time.
+
         Yields:
             `aiosqlite.Cursor`: A cursor object.
 
@@ -365,12 +778,295 @@ class DatabaseManager:
             # Do something with the cursor
         ```
         """
-        cur: aiosqlite.Cursor = await self.connection.cursor()
-        try:
+        if readonly and self.read_pool is not None:
+            started = time.perf_counter()
+
+            async with self.read_pool.acquire() as conn:
+                if self.metrics is not None:
+                    self.metrics.observe_lock_wait(
+                        "read_pool", time.perf_counter() - started
+                    )
+
+                async with self._timed_cursor(conn, label) as cur:
+                    yield cur
+            return
+
+        async with self._timed_cursor(self.connection, label) as cur:
             yield cur
+
+    @asynccontextmanager
+    async def _timed_cursor(
+        self, connection: aiosqlite.Connection, label: Optional[str]
+    ) -> _AsyncGeneratorContextManager[aiosqlite.Cursor]:
+        cur: aiosqlite.Cursor = await connection.cursor()
+
+        if self.metrics is None or label is None:
+            try:
+                yield cur
+            finally:
+                await cur.close()
+            return
+
+        try:
+            with self.metrics.time_query(label):
+                yield cur
         finally:
             await cur.close()
 
+    @asynccontextmanager
+    async def transaction(
+        self, *, label: Optional[str] = None
+    ) -> _AsyncGeneratorContextManager[aiosqlite.Connection]:
+        """`Coro`\n
+        Runs writes as a single transaction, committed when the block exits and rolled back if it raises.
+
+        Transactions and players flushes hold `write_lock`, so their statements are never committed by each other.
+
+        Args:
+            `label` (`Optional[str]`, optional): The name under which the transaction time is recorded in `metrics`. Defaults to `None` (not recorded).
+
+        Example:
+        ```python
+        async with transaction(label="players.payout") as connection:
+            await connection.executemany(sql, rows)
+        ```
+        """
+        started = time.perf_counter()
+
+        async with self.write_lock:
+            if self.metrics is not None:
+                self.metrics.observe_lock_wait("write", time.perf_counter() - started)
+
+            try:
+                with (
+                    self.metrics.time_query(label)
+                    if self.metrics is not None and label is not None
+                    else nullcontext()
+                ):
+                    yield self.connection
+                    await self.connection.commit()
+
+            except BaseException:
+                await self.connection.rollback()
+                raise
+
+    async def get_player(self, user_id: int) -> Optional[PlayerRecord]:
+        """`Coro`\n
+        Gets a player, from the cache if possible.
+
+        Args:
+            `user_id` (`int`): The ID of the player.
+
+        Returns:
+            `Optional[PlayerRecord]`: The player, or `NoneType` if it doesn't exist.
+
+        Example:
+        ```python
+        player = await get_player(1)
+        ```
+        """
+        record = self.player_cache.get(user_id)
+        if record is not None:
+            return record
+
+        async with self.create_cursor(label="players.get") as cursor:
+            await cursor.execute(SELECT_PLAYER, (user_id,))
+            row = await cursor.fetchone()
+
+        if row is None:
+            return None
+
+        # Another coroutine may have cached it while we were waiting for the row
+        record = self.player_cache.get(user_id)
+        if record is None:
+            record = PlayerRecord.from_row(row)
+            self.player_cache.put(record)
+
+        return record
+
+    async def update_player(self, user_id: int, **fields: Any) -> PlayerRecord:
+        """`Coro`\n
+        Changes a player in memory. The change is written to the database by the next flush.
+
+        Args:
+            `user_id` (`int`): The ID of the player.
+
+            `**fields` (`Any`): The `PlayerRecord` attributes to change.
+
+        Raises:
+            `UserNotFoundError`: Raised if the player doesn't exist.
+
+            `AttributeError`: Raised if a field isn't a `PlayerRecord` attribute, or is a balance or the level. They only change through `transactions`.
+
+        Returns:
+            `PlayerRecord`: The updated player.
+
+        Example:
+        ```python
+        await update_player(1, health=80)
+        ```
+        """
+        record = await self.get_player(user_id)
+        if record is None:
+            raise UserNotFoundError(user_id)
+
+        for name in fields:
+            if name not in PlayerRecord.__slots__ or name == "user_id":
+                raise AttributeError(f"'{name}' is not an editable player field.")
+
+            if name in KEPT_COLUMNS:
+                raise AttributeError(f"'{name}' can only be changed through transactions.")
+
+        for name, value in fields.items():
+            setattr(record, name, value)
+
+        self.player_cache.mark_dirty(user_id)
+        self.leaderboard.update(user_id, fields)
+        await self._maybe_flush()
+
+        return record
+
+    async def save_player(self, record: PlayerRecord) -> None:
+        """`Coro`\n
+        Adds a new player, or replaces an existing one, in memory. It is written to the database by the next flush.
+        The balances and level of an existing player are copied into the record, they only change through `transactions`.
+
+        Args:
+            `record` (`PlayerRecord`): The player.
+
+        Example:
+        ```python
+        await save_player(PlayerRecord(3, player_class="Warrior"))
+        ```
+        """
+        # Under the lock of the player, so a transaction can't commit between the copy and the caching
+        async with self.transactions.locked([record.user_id]):
+            current = await self.get_player(record.user_id)
+            if current is not None:
+                for name in KEPT_COLUMNS:
+                    setattr(record, name, getattr(current, name))
+
+            self.player_cache.put(record, dirty=True)
+            self.leaderboard.update_record(record)
+
+        await self._maybe_flush()
+
+    async def flush_players(self) -> int:
+        """`Coro`\n
+        Writes every changed player to the database in a single transaction.
+
+        Raises:
+            `aiosqlite.Error`: Raised if the write fails. The changes are kept in memory for the next attempt.
+
+        Returns:
+            `int`: The number of written players.
+
+        Example:
+        ```python
+        await flush_players()
+        ```
+        """
+        started = time.perf_counter()
+
+        async with self.write_lock:
+            if self.metrics is not None:
+                self.metrics.observe_lock_wait("write", time.perf_counter() - started)
+
+            records = self.player_cache.dirty_records()
+            if not records or self.connection is None:
+                return 0
+
+            # Snapshot the rows first, so changes made while writing are kept dirty.
+            # Evicted records stay readable until the commit, so a read meanwhile doesn't cache the old row
+            rows = [record.to_row() for record in records]
+            self.player_cache.mark_clean(records)
+
+            try:
+                started = time.perf_counter()
+
+                if self.writer is not None:
+                    await self.writer.execute([(UPSERT_PLAYER_KEEP_BALANCES, rows)])
+                else:
+                    await self.connection.executemany(UPSERT_PLAYER_KEEP_BALANCES, rows)
+                    await self.connection.commit()
+
+                self.player_cache.release_evicted(records)
+
+                if self.metrics is not None:
+                    self.metrics.observe_query(
+                        "players.flush", time.perf_counter() - started
+                    )
+
+            except BaseException as e:
+                await self.connection.rollback()
+
+                for record in records:
+                    self.player_cache.put(record, dirty=True)
+
+                if isinstance(e, aiosqlite.Error):
+                    self.log(
+                        "Error flushing the players cache.", level=logging.ERROR, error=e
+                    )
+                raise e
+
+        self.log(f"Flushed {len(rows)} players to the database.", level=logging.DEBUG)
+        return len(rows)
+
+    async def _maybe_flush(self) -> None:
+        if self.player_cache.dirty_count >= self.player_flush_threshold:
+            await self.flush_players()
+
+    def attach_scheduler(self, scheduler: Scheduler) -> None:
+        """`Method`\n
+        Runs the periodic players flush as a job of a scheduler, instead of its own task.
+
+        Args:
+            `scheduler` (`Scheduler`): The scheduler.
+        """
+        was_running = self._flush_task is not None
+        self._stop_flush_loop()
+        self.scheduler = scheduler
+
+        if was_running:
+            self._start_flush_loop()
+
+    async def _flush_once(self) -> None:
+        try:
+            await self.flush_players()
+
+        except aiosqlite.Error:
+            pass  # Already logged, the rows are retried on the next iteration
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.player_flush_interval)
+            await self._flush_once()
+
+    def _start_flush_loop(self) -> None:
+        if self.player_flush_interval is None or self._flush_task is not None:
+            return
+
+        if self.scheduler is not None:
+            self._flush_task = self.scheduler.add_job(
+                self._flush_once,
+                name="database.flush",
+                interval=self.player_flush_interval,
+                owner=self,
+            )
+        else:
+            self._flush_task = asyncio.get_running_loop().create_task(
+                self._flush_loop()
+            )
+
+    def _stop_flush_loop(self) -> None:
+        if isinstance(self._flush_task, Job):
+            # A flush in progress is left to finish, disconnect() flushes right after
+            self.scheduler.remove_job(self._flush_task, cancel_running=False)
+        elif self._flush_task is not None:
+            self._flush_task.cancel()
+
+        self._flush_task = None
+
 
 class TableNotFoundError(Exception):
     def __init__(self, table: str):
@@ -37,3 +37,39 @@ class UserNotFoundError(AppCommandError):
 
     def __str__(self) -> str:
         return f"User with ID '{self.user_id}' not found in the database."
+
+
+class InsufficientFunds(AppCommandError):
+    """Raised when a transaction would make a player's balance negative."""
+
+    def __init__(self, user_id: int, column: str, balance: int, delta: int) -> None:
+        self.user_id = user_id
+        self.column = column
+        self.balance = balance
+        self.delta = delta
+
+    def __str__(self) -> str:
+        return f"Not enough {self.column}: {-self.delta} needed, {self.balance} available."
+
+
+class InsufficientItems(AppCommandError):
+    """Raised when an inventory doesn't hold enough of an item."""
+
+    def __init__(self, inventory_id: int, item: Any, quantity: int, needed: int) -> None:
+        self.inventory_id = inventory_id
+        self.item = item
+        self.quantity = quantity
+        self.needed = needed
+
+    def __str__(self) -> str:
+        return f"Not enough {self.item}: {self.needed} needed, {self.quantity} available."
+
+
+class RateLimited(AppCommandError):
+    """Raised when a user uses commands faster than their rate limit allows."""
+
+    def __init__(self, retry_after: float) -> None:
+        self.retry_after = retry_after
+
+    def __str__(self) -> str:
+        return f"You're going too fast, try again in {self.retry_after:.1f}s."
@@ -0,0 +1,185 @@
+"""
+Custom module for the in-memory catalog of the `items` table.
+"""
+
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from .autocomplete import AutocompleteIndex
+from .exceptions import InvalidItem
+
+
+class Item:
+    """Compact representation of a row of the `items` table."""
+
+    __slots__ = ("item_id", "name", "description", "price")
+
+    def __init__(self, item_id: int, name: str, description: str, price: int) -> None:
+        self.item_id = item_id
+        self.name = name
+        self.description = description
+        self.price = price
+
+    def __repr__(self) -> str:
+        return f"<Item item_id={self.item_id} name={self.name!r}>"
+
+
+class ItemCatalog:
+    """Every item, loaded once when connecting. Item IDs are small and dense, so items are stored in a list indexed by ID.
+
+    Looking an item up by ID is a list access, and by name a single dict access, so showing an inventory only queries the quantities.
+    Item names are autocompleted by `search_index`, kept up to date by `load`, `put` and `remove`.
+    """
+
+    def __init__(self) -> None:
+        self._items: List[Optional[Item]] = []
+        self._prices = array("q")
+        self._by_name: Dict[str, int] = {}
+        self.search_index = AutocompleteIndex()
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def __contains__(self, item_id: int) -> bool:
+        return 0 <= item_id < len(self._items) and self._items[item_id] is not None
+
+    def __iter__(self) -> Iterator[Item]:
+        return (item for item in self._items if item is not None)
+
+    @property
+    def select_query(self) -> str:
+        """The query selecting the rows expected by `load`."""
+        return "SELECT item_id, name, description, price FROM items ORDER BY item_id"
+
+    def load(self, rows: Iterable[Sequence[Any]]) -> None:
+        """`Method`\n
+        Replaces the content of the catalog.
+
+        Args:
+            `rows` (`Iterable[Sequence[Any]]`): The rows selected by `select_query`.
+        """
+        rows = list(rows)
+        size = max((row[0] for row in rows), default=-1) + 1
+
+        self._items = [None] * size
+        self._prices = array("q", bytes(8 * size))
+        self._by_name = {}
+
+        for row in rows:
+            item = Item(*row)
+            self._items[item.item_id] = item
+            self._prices[item.item_id] = item.price
+            self._by_name[item.name.casefold()] = item.item_id
+
+        self.search_index.build((item.item_id, item.name) for item in self)
+
+    def put(self, item: Item) -> None:
+        """`Method`\n
+        Adds an item, or replaces the one with the same ID.
+
+        Args:
+            `item` (`Item`): The item.
+        """
+        self.remove(item.item_id)
+
+        if item.item_id >= len(self._items):
+            grow = item.item_id + 1 - len(self._items)
+            self._items.extend([None] * grow)
+            self._prices.extend([0] * grow)
+
+        self._items[item.item_id] = item
+        self._prices[item.item_id] = item.price
+        self._by_name[item.name.casefold()] = item.item_id
+        self.search_index.add(item.item_id, item.name)
+
+    def remove(self, item_id: int) -> None:
+        """`Method`\n
+        Removes an item. Does nothing if it doesn't exist.
+
+        Args:
+            `item_id` (`int`): The ID of the item.
+        """
+        item = self.get(item_id)
+        if item is None:
+            return
+
+        self._items[item_id] = None
+        self._prices[item_id] = 0
+        if self._by_name.get(item.name.casefold()) == item_id:
+            del self._by_name[item.name.casefold()]
+        self.search_index.remove(item_id)
+
+    def get(self, item_id: int) -> Optional[Item]:
+        """`Method`\n
+        Gets an item by ID.
+
+        Args:
+            `item_id` (`int`): The ID of the item.
+
+        Returns:
+            `Optional[Item]`: The item, or `NoneType` if it doesn't exist.
+        """
+        return self._items[item_id] if item_id in self else None
+
+    def find(self, item: Union[int, str]) -> Item:
+        """`Method`\n
+        Gets an item by ID or by name, ignoring the case.
+
+        Args:
+            `item` (`Union[int, str]`): The ID or the name of the item.
+
+        Raises:
+            `InvalidItem`: Raised if the item doesn't exist.
+
+        Returns:
+            `Item`: The item.
+
+        Example:
+        ```python
+        find("health potion")
+        ```
+        """
+        item_id = item if isinstance(item, int) else self._by_name.get(item.casefold())
+        found = self.get(item_id) if item_id is not None else None
+
+        if found is None:
+            raise InvalidItem(item)
+
+        return found
+
+    def value_of(self, quantities: Dict[int, int]) -> int:
+        """`Method`\n
+        Gets the total price of some items.
+
+        Args:
+            `quantities` (`Dict[int, int]`): The quantities by item ID, like an inventory.
+
+        Returns:
+            `int`: The total price. Unknown items are worth nothing.
+        """
+        prices = self._prices
+        return sum(
+            prices[item_id] * quantity
+            for item_id, quantity in quantities.items()
+            if item_id in self
+        )
+
+    def memory_usage(self) -> int:
+        """`Method`\n
+        Estimates the memory used by the catalog.
+
+        Returns:
+            `int`: The size in bytes.
+        """
+        return (
+            sys.getsizeof(self._items)
+            + sys.getsizeof(self._prices)
+            + sys.getsizeof(self._by_name)
+            + sum(
+                sys.getsizeof(item) + sys.getsizeof(item.name) + sys.getsizeof(item.description)
+                for item in self
+            )
+        )
@@ -0,0 +1,197 @@
+"""
+Custom module for the experience needed by each level.
+
+`numpy` is required by the bulk lookups only (`LevelCurve.levels_for` and `level_ups`).
+"""
+
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from typing import Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class LevelUp:
+    """A player who reached a higher level.
+
+    Args:
+        `user_id` (`int`): The ID of the player.
+
+        `old_level` (`int`): The level before the experience was granted.
+
+        `new_level` (`int`): The level after.
+    """
+
+    __slots__ = ("user_id", "old_level", "new_level")
+
+    def __init__(self, user_id: int, old_level: int, new_level: int) -> None:
+        self.user_id = user_id
+        self.old_level = old_level
+        self.new_level = new_level
+
+    def __repr__(self) -> str:
+        return f"<LevelUp user_id={self.user_id} {self.old_level} -> {self.new_level}>"
+
+
+class LevelCurve:
+    """The cumulative experience thresholds of every level, computed once.
+
+    Going from level `n` to `n + 1` takes `base * n ** exponent` experience, rounded. The level of an amount of experience
+    is found with `bisect` for one player, and with `numpy.searchsorted` for many at once.
+
+    Args:
+        `max_level` (`int`, optional): The highest level. Defaults to `100`.
+
+        `base` (`int`, optional): The experience from level 1 to 2. Defaults to `100`.
+
+        `exponent` (`float`, optional): How fast the experience per level grows. Defaults to `1.5`.
+
+    Example:
+    ```python
+    LEVEL_CURVE.level_for(player.experience)
+    ```
+    """
+
+    def __init__(self, max_level: int = 100, base: int = 100, exponent: float = 1.5) -> None:
+        if max_level < 1 or base < 1:
+            raise ValueError("The level curve needs a positive max level and base.")
+
+        self.max_level = max_level
+        self.base = base
+        self.exponent = exponent
+
+        steps = (round(base * level**exponent) for level in range(1, max_level))
+        # _thresholds[n - 1] is the experience needed to reach level n
+        self._thresholds = array("q", accumulate(steps, initial=0))
+        self._array: Optional[np.ndarray] = None
+
+    def __repr__(self) -> str:
+        return f"<LevelCurve max_level={self.max_level} base={self.base} exponent={self.exponent}>"
+
+    @property
+    def thresholds(self) -> np.ndarray:
+        """The experience needed to reach each level, as a `numpy` array built on first use."""
+        if self._array is None:
+            import numpy as np
+
+            self._array = np.frombuffer(self._thresholds, dtype=np.int64)
+
+        return self._array
+
+    def experience_for(self, level: int) -> int:
+        """`Method`\n
+        Gets the total experience needed to reach a level.
+
+        Args:
+            `level` (`int`): The level, from 1 to `max_level`.
+
+        Returns:
+            `int`: The experience.
+        """
+        return self._thresholds[min(max(level, 1), self.max_level) - 1]
+
+    def level_for(self, experience: int) -> int:
+        """`Method`\n
+        Gets the level of an amount of experience.
+
+        Args:
+            `experience` (`int`): The total experience.
+
+        Returns:
+            `int`: The level, from 1 to `max_level`.
+        """
+        return max(1, bisect_right(self._thresholds, experience))
+
+    def levels_for(self, experience: np.ndarray) -> np.ndarray:
+        """`Method`\n
+        Gets the levels of many amounts of experience in one pass.
+
+        Args:
+            `experience` (`np.ndarray`): The total experience of each player.
+
+        Returns:
+            `np.ndarray`: The level of each player.
+        """
+        import numpy as np
+
+        return np.maximum(1, np.searchsorted(self.thresholds, experience, side="right"))
+
+    def progress(self, experience: int) -> Tuple[int, int, int]:
+        """`Method`\n
+        Gets the progress towards the next level, like for an experience bar.
+
+        Args:
+            `experience` (`int`): The total experience.
+
+        Returns:
+            `Tuple[int, int, int]`: The level, the experience gained since reaching it, and the experience it takes to reach the next one (`0` at the highest level).
+        """
+        level = self.level_for(experience)
+        start = self._thresholds[level - 1]
+
+        if level == self.max_level:
+            return level, experience - start, 0
+
+        return level, experience - start, self._thresholds[level] - start
+
+
+def level_ups(
+    user_ids: Iterable[int], old_levels: np.ndarray, new_levels: np.ndarray
+) -> List[LevelUp]:
+    """`Function`\n
+    Gets the players whose level increased.
+
+    Args:
+        `user_ids` (`Iterable[int]`): The IDs of the players.
+
+        `old_levels` (`np.ndarray`): Their levels before.
+
+        `new_levels` (`np.ndarray`): Their levels after.
+
+    Returns:
+        `List[LevelUp]`: The level ups, in the order of `user_ids`.
+    """
+    import numpy as np
+
+    user_ids = np.fromiter(user_ids, dtype=np.int64, count=len(old_levels))
+    increased = np.flatnonzero(new_levels > old_levels)
+
+    return [
+        LevelUp(user_id, old_level, new_level)
+        for user_id, old_level, new_level in zip(
+            user_ids[increased].tolist(),
+            old_levels[increased].tolist(),
+            new_levels[increased].tolist(),
+        )
+    ]
+
+
+def announcement(level_ups: List[LevelUp], limit: int = 20) -> str:
+    """`Function`\n
+    Announces many level ups in one message.
+
+    Args:
+        `level_ups` (`List[LevelUp]`): The level ups.
+
+        `limit` (`int`, optional): The number of players named, the others are counted. Defaults to `20`.
+
+    Returns:
+        `str`: The message, empty without level ups.
+    """
+    ranked = sorted(level_ups, key=lambda level_up: -level_up.new_level)
+    lines = [
+        f"<@{level_up.user_id}> reached level {level_up.new_level}!" for level_up in ranked[:limit]
+    ]
+
+    if len(ranked) > limit:
+        lines.append(f"...and {len(ranked) - limit} more players levelled up.")
+
+    return "\n".join(lines)
+
+
+LEVEL_CURVE = LevelCurve()
+"""The level curve shared by every module."""
@@ -0,0 +1,172 @@
+"""
+Custom module for non-blocking logging.
+
+No third-party dependency is required.
+"""
+
+from __future__ import annotations
+
+import copy
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+OVERFLOW_POLICIES = ("drop_new", "drop_oldest", "block")
+
+
+class BoundedQueueHandler(QueueHandler):
+    """`QueueHandler` for a bounded queue, with an overflow policy.
+
+    Args:
+        `log_queue` (`queue.Queue`): The queue, with a `maxsize`.
+
+        `overflow` (`str`, optional): What to do when the queue is full: `"drop_new"` discards the new record, `"drop_oldest"` discards the oldest queued one, `"block"` waits for room (and blocks the event loop). Defaults to `"drop_oldest"`.
+    """
+
+    def __init__(self, log_queue: queue.Queue, overflow: str = "drop_oldest") -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow should be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+
+        super().__init__(log_queue)
+        self.overflow = overflow
+        self.dropped: int = 0
+        self.enqueued: int = 0
+        self.max_depth: int = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in this process, so only the message is resolved here.
+        # Formatting (including tracebacks) is left to the handlers on the listener thread.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.overflow == "block":
+            self.queue.put(record)
+            self._count()
+            return
+
+        try:
+            self.queue.put_nowait(record)
+
+        except queue.Full:
+            self.dropped += 1
+
+            if self.overflow == "drop_new":
+                return
+
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                pass
+
+            try:
+                self.queue.put_nowait(record)
+            except queue.Full:
+                return
+
+        self._count()
+
+    def _count(self) -> None:
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+
+class BoundedQueueListener(QueueListener):
+    """`QueueListener` that waits for room in a bounded queue to enqueue its stop sentinel."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+class LoggingPipeline:
+    """Runs logging handlers on a background thread, fed by a bounded queue.
+
+    Args:
+        `*handlers` (`logging.Handler`): The handlers doing the actual output, with their own formatter.
+
+        `max_queue_size` (`int`, optional): The maximum number of queued records. Defaults to `10000`.
+
+        `overflow` (`str`, optional): See `BoundedQueueHandler`. Defaults to `"drop_oldest"`.
+
+    Example:
+    ```python
+    pipeline = LoggingPipeline(logging.FileHandler("bot.log"))
+    pipeline.start()
+    logging.getLogger().addHandler(pipeline.queue_handler)
+    ```
+    """
+
+    def __init__(
+        self,
+        *handlers: logging.Handler,
+        max_queue_size: int = 10000,
+        overflow: str = "drop_oldest",
+    ) -> None:
+        self.queue: queue.Queue = queue.Queue(max_queue_size)
+        self.queue_handler = BoundedQueueHandler(self.queue, overflow)
+        self.listener = BoundedQueueListener(
+            self.queue, *handlers, respect_handler_level=True
+        )
+        self.is_running: bool = False
+
+    def start(self) -> None:
+        """`Method`\n
+        Starts the background thread.
+        """
+        if not self.is_running:
+            self.listener.start()
+            self.is_running = True
+
+    def stop(self) -> None:
+        """`Method`\n
+        Writes the queued records and stops the background thread.
+        """
+        if self.is_running:
+            self.listener.stop()
+            self.is_running = False
+
+    def stats(self) -> Dict[str, int]:
+        """`Method`\n
+        Gets the pipeline counters.
+
+        Returns:
+            `Dict[str, int]`: The current and maximum observed queue depth, and the enqueued and dropped record counts.
+
+        Example:
+        ```python
+        stats()
+        ```
+        """
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.queue_handler.max_depth,
+            "enqueued": self.queue_handler.enqueued,
+            "dropped": self.queue_handler.dropped,
+        }
+
+
+def handled_by_ancestors(logger: logging.Logger, handler: logging.Handler) -> bool:
+    """`Function`\n
+    Checks whether the records of a logger already reach a handler through propagation.
+
+    Args:
+        `logger` (`logging.Logger`): The logger.
+
+        `handler` (`logging.Handler`): The handler.
+
+    Returns:
+        `bool`: `True` if an ancestor reached by propagation has the handler.
+    """
+    current: Optional[logging.Logger] = logger
+
+    while current.propagate and current.parent is not None:
+        current = current.parent
+        if handler in current.handlers:
+            return True
+
+    return False
@@ -0,0 +1,275 @@
+"""
+Custom module for latency and error metrics.
+
+No third-party dependency is required.
+"""
+
+from __future__ import annotations
+
+import bisect
+import os
+import time
+from array import array
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds, roughly logarithmic from 0.1ms to 30s
+BUCKET_BOUNDS: Tuple[float, ...] = tuple(
+    round(base * 10**exponent, 6)
+    for exponent in range(-4, 1)
+    for base in (1, 2, 5)
+) + (10.0, 30.0)
+
+
+class LatencyHistogram:
+    """Fixed-size latency histogram.
+
+    Memory and recording cost don't depend on the number of observations. Quantiles are
+    interpolated inside the bucket they fall in.
+    """
+
+    __slots__ = ("counts", "count", "total", "maximum")
+
+    def __init__(self) -> None:
+        self.counts = array("Q", bytes(8 * (len(BUCKET_BOUNDS) + 1)))
+        self.count: int = 0
+        self.total: float = 0.0
+        self.maximum: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """`Method`\n
+        Records an observation.
+
+        Args:
+            `seconds` (`float`): The latency.
+        """
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def quantile(self, q: float) -> float:
+        """`Method`\n
+        Estimates a quantile.
+
+        Args:
+            `q` (`float`): The quantile, between 0 and 1.
+
+        Returns:
+            `float`: The estimated latency in seconds, or `0.0` without observations.
+        """
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKET_BOUNDS[index - 1] if index else 0.0
+                upper = (
+                    BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else self.maximum
+                )
+                upper = min(upper, self.maximum)
+
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+
+            seen += bucket_count
+
+        return self.maximum
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class MetricsRegistry:
+    """Latency histograms and error counters of the bot.
+
+    Commands are keyed by their qualified name, database queries by a label given to `DatabaseManager.create_cursor`.
+    """
+
+    def __init__(self) -> None:
+        self.commands: Dict[str, LatencyHistogram] = {}
+        self.command_errors: Dict[str, int] = {}
+        self.queries: Dict[str, LatencyHistogram] = {}
+        self.query_errors: Dict[str, int] = {}
+        self.lock_waits: Dict[str, LatencyHistogram] = {}
+
+    def observe_command(self, name: str, seconds: float, *, failed: bool = False) -> None:
+        """`Method`\n
+        Records the latency of an app command.
+
+        Args:
+            `name` (`str`): The qualified name of the command.
+
+            `seconds` (`float`): The latency.
+
+            `failed` (`bool`, optional): Whether the command raised an error. Defaults to `False`.
+        """
+        _histogram(self.commands, name).observe(seconds)
+        if failed:
+            self.command_errors[name] = self.command_errors.get(name, 0) + 1
+
+    def observe_query(self, label: str, seconds: float, *, failed: bool = False) -> None:
+        """`Method`\n
+        Records the latency of a database query.
+
+        Args:
+            `label` (`str`): The label of the query.
+
+            `seconds` (`float`): The latency.
+
+            `failed` (`bool`, optional): Whether the query raised an error. Defaults to `False`.
+        """
+        _histogram(self.queries, label).observe(seconds)
+        if failed:
+            self.query_errors[label] = self.query_errors.get(label, 0) + 1
+
+    def observe_lock_wait(self, lock: str, seconds: float) -> None:
+        """`Method`\n
+        Records how long a coroutine waited for a database lock or connection.
+
+        Args:
+            `lock` (`str`): The name of the lock.
+
+            `seconds` (`float`): The wait.
+        """
+        _histogram(self.lock_waits, lock).observe(seconds)
+
+    @contextmanager
+    def time_query(self, label: str) -> Iterator[None]:
+        """`Method`\n
+        Times a block as a database query.
+
+        Args:
+            `label` (`str`): The label of the query.
+        """
+        started = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.observe_query(label, time.perf_counter() - started, failed=failed)
+
+    def summary(self, histograms: Dict[str, LatencyHistogram]) -> List[Tuple[str, int, float, float, float]]:
+        """`Method`\n
+        Summarizes histograms, busiest first.
+
+        Args:
+            `histograms` (`Dict[str, LatencyHistogram]`): `commands`, `queries` or `lock_waits`.
+
+        Returns:
+            `List[Tuple[str, int, float, float, float]]`: The name, count, p50, p95 and p99 in seconds.
+        """
+        return [
+            (
+                name,
+                histogram.count,
+                histogram.quantile(0.5),
+                histogram.quantile(0.95),
+                histogram.quantile(0.99),
+            )
+            for name, histogram in sorted(
+                histograms.items(), key=lambda item: -item[1].count
+            )
+        ]
+
+    def to_prometheus(self, extra_gauges: Optional[Dict[str, float]] = None) -> str:
+        """`Method`\n
+        Renders every metric in the Prometheus text exposition format.
+
+        Args:
+            `extra_gauges` (`Optional[Dict[str, float]]`, optional): More gauges to export, by metric name. Defaults to `None`.
+
+        Returns:
+            `str`: The exposition text.
+        """
+        lines: List[str] = []
+
+        for metric, label, histograms in (
+            ("rpg_command_duration_seconds", "command", self.commands),
+            ("rpg_query_duration_seconds", "query", self.queries),
+            ("rpg_lock_wait_seconds", "lock", self.lock_waits),
+        ):
+            lines.append(f"# TYPE {metric} histogram")
+
+            for name, histogram in histograms.items():
+                labels = f'{label}="{_escape(name)}"'
+                cumulative = 0
+
+                for bound, bucket_count in zip(BUCKET_BOUNDS, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+
+                lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{metric}_sum{{{labels}}} {histogram.total}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+
+        for metric, label, counters in (
+            ("rpg_command_errors_total", "command", self.command_errors),
+            ("rpg_query_errors_total", "query", self.query_errors),
+        ):
+            lines.append(f"# TYPE {metric} counter")
+            lines.extend(
+                f'{metric}{{{label}="{_escape(name)}"}} {count}'
+                for name, count in counters.items()
+            )
+
+        for metric, value in (extra_gauges or {}).items():
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(
+        self, path: str, extra_gauges: Optional[Dict[str, float]] = None
+    ) -> None:
+        """`Method`\n
+        Writes `to_prometheus` atomically to a file, for a node exporter textfile collector.
+
+        The registry is read while rendering, so call it from the thread recording the metrics. To write the file from
+        another thread, render the text first and pass it to `write_textfile`.
+
+        Args:
+            `path` (`str`): The path of the `.prom` file.
+
+            `extra_gauges` (`Optional[Dict[str, float]]`, optional): See `to_prometheus`. Defaults to `None`.
+        """
+        write_textfile(path, self.to_prometheus(extra_gauges))
+
+
+def write_textfile(path: str, text: str) -> None:
+    """`Function`\n
+    Replaces a file atomically, through a temporary file next to it.
+
+    Args:
+        `path` (`str`): The path of the file.
+
+        `text` (`str`): The new content.
+
+    Example:
+    ```python
+    await asyncio.to_thread(write_textfile, "metrics.prom", registry.to_prometheus())
+    ```
+    """
+    temp_path = f"{path}.tmp"
+
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    os.replace(temp_path, path)
+
+
+def _histogram(histograms: Dict[str, LatencyHistogram], name: str) -> LatencyHistogram:
+    histogram = histograms.get(name)
+    if histogram is None:
+        histogram = histograms[name] = LatencyHistogram()
+
+    return histogram
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,362 @@
+"""
+Custom module for versioned database schema migrations.
+
+`aiosqlite >= 0.18.0` is required.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import os
+import re
+import sqlite3
+import time
+from types import ModuleType
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+import aiosqlite
+
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.(sql|py)$")
+
+
+class Migration:
+    """A migration file.
+
+    Args:
+        `version` (`int`): The `user_version` of the database once applied.
+
+        `name` (`str`): The description part of the file name.
+
+        `path` (`str`): The path of the file.
+    """
+
+    __slots__ = ("version", "name", "path")
+
+    def __init__(self, version: int, name: str, path: str) -> None:
+        self.version = version
+        self.name = name
+        self.path = path
+
+    @property
+    def is_python(self) -> bool:
+        return self.path.endswith(".py")
+
+    def __repr__(self) -> str:
+        return f"<Migration version={self.version} name={self.name!r}>"
+
+
+class MigrationResult:
+    """The outcome of a migration.
+
+    Args:
+        `migration` (`Migration`): The migration.
+
+        `duration` (`float`): Seconds taken.
+
+        `dry_run` (`bool`): Whether the changes were rolled back.
+
+        `skipped` (`bool`, optional): Whether the migration wasn't run at all. Defaults to `False`.
+    """
+
+    __slots__ = ("migration", "duration", "dry_run", "skipped")
+
+    def __init__(
+        self, migration: Migration, duration: float, dry_run: bool, skipped: bool = False
+    ) -> None:
+        self.migration = migration
+        self.duration = duration
+        self.dry_run = dry_run
+        self.skipped = skipped
+
+    def __repr__(self) -> str:
+        return f"<MigrationResult version={self.migration.version} duration={self.duration:.3f}s dry_run={self.dry_run} skipped={self.skipped}>"
+
+
+class MigrationContext:
+    """What a Python migration receives.
+
+    Args:
+        `connection` (`aiosqlite.Connection`): The connection.
+
+        `chunk_size` (`int`): The default number of rows handled by each chunk of `run_chunked`.
+
+        `dry_run` (`bool`): Whether the migration runs in a transaction that will be rolled back.
+    """
+
+    def __init__(
+        self, connection: aiosqlite.Connection, chunk_size: int, dry_run: bool
+    ) -> None:
+        self.connection = connection
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+
+    async def execute(self, sql: str, parameters: Sequence[Any] = ()) -> None:
+        """`Coro`\n
+        Executes a statement.
+
+        Args:
+            `sql` (`str`): The statement.
+
+            `parameters` (`Sequence[Any]`, optional): The parameters. Defaults to `()`.
+        """
+        await self.connection.execute(sql, parameters)
+
+    async def run_chunked(
+        self, sql: str, *, table: str, chunk_size: Optional[int] = None
+    ) -> int:
+        """`Coro`\n
+        Executes a statement over a table one `rowid` range at a time, committing and yielding to the event loop after each range.\n
+        Only available in migrations with `CHUNKED = True`, which must be safe to run again if interrupted.
+
+        Args:
+            `sql` (`str`): The statement, with two `?` placeholders for the first and last `rowid` of the range.
+
+            `table` (`str`): The table to walk.
+
+            `chunk_size` (`Optional[int]`, optional): The number of rowids per range. Defaults to the runner's chunk size.
+
+        Returns:
+            `int`: The number of ranges executed.
+
+        Example:
+        ```python
+        await context.run_chunked(
+            "UPDATE players SET gold = gold * 100 WHERE rowid BETWEEN ? AND ?", table="players"
+        )
+        ```
+        """
+        chunk_size = chunk_size or self.chunk_size
+
+        async with self.connection.execute(
+            f"SELECT MIN(rowid), MAX(rowid) FROM {table}"
+        ) as cursor:
+            first, last = await cursor.fetchone()
+
+        if first is None:
+            return 0
+
+        chunks = 0
+        for start in range(first, last + 1, chunk_size):
+            await self.connection.execute("BEGIN")
+            try:
+                await self.connection.execute(sql, (start, start + chunk_size - 1))
+                await self.connection.execute("COMMIT")
+            except BaseException:
+                await self.connection.execute("ROLLBACK")
+                raise
+
+            chunks += 1
+            await asyncio.sleep(0)
+
+        return chunks
+
+
+class MigrationRunner:
+    """Applies the migrations of a folder, tracked with `PRAGMA user_version`.
+
+    Args:
+        `migrations_path` (`str`): The folder of the migration files.
+
+        `chunk_size` (`int`, optional): See `MigrationContext`. Defaults to `5000`.
+
+        `log` (`Optional[Callable[[str], Any]]`, optional): Called with a message for each step. Defaults to `None`.
+    """
+
+    def __init__(
+        self,
+        migrations_path: str,
+        *,
+        chunk_size: int = 5000,
+        log: Optional[Callable[[str], Any]] = None,
+    ) -> None:
+        self.migrations_path = migrations_path
+        self.chunk_size = chunk_size
+        self._log = log or (lambda message: None)
+
+    def discover(self) -> List[Migration]:
+        """`Method`\n
+        Lists the migration files, in version order.
+
+        Raises:
+            `ValueError`: Raised if two files have the same version.
+
+        Returns:
+            `List[Migration]`: The migrations.
+        """
+        migrations = {}
+
+        for file_name in os.listdir(self.migrations_path):
+            match = MIGRATION_FILE.match(file_name)
+            if match is None:
+                continue
+
+            version = int(match.group(1))
+            if version in migrations:
+                raise ValueError(f"Duplicate migration version {version}: {file_name}")
+
+            migrations[version] = Migration(
+                version, match.group(2), os.path.join(self.migrations_path, file_name)
+            )
+
+        return [migrations[version] for version in sorted(migrations)]
+
+    async def current_version(self, connection: aiosqlite.Connection) -> int:
+        """`Coro`\n
+        Gets the schema version of a database.
+
+        Args:
+            `connection` (`aiosqlite.Connection`): The connection.
+
+        Returns:
+            `int`: The `user_version`.
+        """
+        async with connection.execute("PRAGMA user_version") as cursor:
+            (version,) = await cursor.fetchone()
+
+        return version
+
+    async def pending(self, connection: aiosqlite.Connection) -> List[Migration]:
+        """`Coro`\n
+        Lists the migrations not applied yet.
+
+        Args:
+            `connection` (`aiosqlite.Connection`): The connection.
+
+        Returns:
+            `List[Migration]`: The migrations.
+        """
+        version = await self.current_version(connection)
+        return [migration for migration in self.discover() if migration.version > version]
+
+    async def run(
+        self,
+        connection: aiosqlite.Connection,
+        *,
+        dry_run: bool = False,
+        target: Optional[int] = None,
+    ) -> List[MigrationResult]:
+        """`Coro`\n
+        Applies the pending migrations, each in its own transaction.
+
+        Args:
+            `connection` (`aiosqlite.Connection`): The connection.
+
+            `dry_run` (`bool`, optional): Runs each migration, then rolls it back. Chunked migrations are skipped since they commit as they go, and so are the migrations after the first one. Defaults to `False`.
+
+            `target` (`Optional[int]`, optional): The last version to apply. Defaults to `None` (all of them).
+
+        Raises:
+            `aiosqlite.Error`: Raised if a migration fails. It is rolled back and the following ones are not applied.
+
+        Returns:
+            `List[MigrationResult]`: The result of each pending migration.
+        """
+        migrations = [
+            migration
+            for migration in await self.pending(connection)
+            if target is None or migration.version <= target
+        ]
+        results: List[MigrationResult] = []
+
+        # Transactions are handled explicitly, so anything pending is committed first
+        await connection.commit()
+
+        for index, migration in enumerate(migrations):
+            # In a dry run only the first one sees the schema it expects
+            if dry_run and index > 0:
+                results.append(MigrationResult(migration, 0.0, True, skipped=True))
+                continue
+
+            results.append(await self._apply(connection, migration, dry_run))
+
+        return results
+
+    async def _apply(
+        self, connection: aiosqlite.Connection, migration: Migration, dry_run: bool
+    ) -> MigrationResult:
+        module = load_module(migration) if migration.is_python else None
+        chunked = getattr(module, "CHUNKED", False)
+
+        if chunked and dry_run:
+            self._log(f"Skipping chunked migration {migration.version} ({migration.name}) in dry run.")
+            return MigrationResult(migration, 0.0, True, skipped=True)
+
+        self._log(
+            f"{'Dry running' if dry_run else 'Applying'} migration {migration.version} ({migration.name})..."
+        )
+        context = MigrationContext(connection, self.chunk_size, dry_run)
+        started = time.perf_counter()
+
+        if chunked:
+            await module.upgrade(context)
+            await connection.execute(f"PRAGMA user_version = {migration.version}")
+
+        else:
+            await connection.execute("BEGIN")
+            try:
+                if module is not None:
+                    await module.upgrade(context)
+                else:
+                    for statement in read_statements(migration.path):
+                        await connection.execute(statement)
+
+                await connection.execute(f"PRAGMA user_version = {migration.version}")
+                await connection.execute("ROLLBACK" if dry_run else "COMMIT")
+
+            except BaseException:
+                await connection.execute("ROLLBACK")
+                raise
+
+        duration = time.perf_counter() - started
+        self._log(f"Migration {migration.version} ({migration.name}) done in {duration:.3f}s.")
+
+        return MigrationResult(migration, duration, dry_run)
+
+
+def read_statements(path: str) -> Iterable[str]:
+    """`Function`\n
+    Splits an SQL file into complete statements.
+
+    Args:
+        `path` (`str`): The path of the file.
+
+    Raises:
+        `sqlite3.ProgrammingError`: Raised if the file ends with an incomplete statement.
+
+    Returns:
+        `Iterable[str]`: The statements.
+    """
+    statements = []
+    buffer = ""
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            buffer += line
+            if sqlite3.complete_statement(buffer):
+                statements.append(buffer.strip())
+                buffer = ""
+
+    if buffer.strip():
+        raise sqlite3.ProgrammingError(f"Incomplete statement at the end of {path}")
+
+    return statements
+
+
+def load_module(migration: Migration) -> ModuleType:
+    """`Function`\n
+    Imports a Python migration.
+
+    Args:
+        `migration` (`Migration`): The migration.
+
+    Returns:
+        `ModuleType`: The module.
+    """
+    spec = importlib.util.spec_from_file_location(
+        f"migration_{migration.version}", migration.path
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
@@ -6,35 +6,325 @@ Custom module for `discord.Embed` message pagination.
 
 from __future__ import annotations
 
+import asyncio
+import inspect
+from abc import ABC, abstractmethod
 import discord
 from discord.ext import commands
 from discord.ui import Button, button, View
 from discord import ButtonStyle, Emoji, PartialEmoji, Interaction
 import logging
-from typing import Optional, Union, Any, List
+from collections import OrderedDict
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Optional,
+    Sequence,
+    Union,
+    Any,
+    List,
+    TYPE_CHECKING,
+)
+
+if TYPE_CHECKING:
+    from .database import DatabaseManager
+
+LOGGER = logging.getLogger(__name__)
+
+PageFormatter = Callable[
+    [Sequence[Any], int], Union[discord.Embed, Awaitable[discord.Embed]]
+]
+
+
+class PageSource(ABC):
+    """Base class of the page sources of `EmbedPaginator`.
+
+    Subclasses implement `page_count` and `get_page`.
+    """
+
+    @property
+    @abstractmethod
+    def page_count(self) -> int:
+        """The number of pages."""
+
+    @abstractmethod
+    async def get_page(self, index: int) -> discord.Embed:
+        """`Coro`\n
+        Gets a page.
+
+        Args:
+            `index` (`int`): The index of the page, starting from 0.
+
+        Returns:
+            `discord.Embed`: The page.
+        """
+
+    def close(self) -> None:
+        """`Method`\n
+        Stops any work still running for the pages, once they aren't needed anymore.
+        """
+
+
+class ListPageSource(PageSource):
+    """Page source over already built embeds.
+
+    Args:
+        `pages` (`List[discord.Embed]`): The pages.
+    """
+
+    def __init__(self, pages: List[discord.Embed]) -> None:
+        self.pages = pages
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    async def get_page(self, index: int) -> discord.Embed:
+        return self.pages[index]
+
+
+class AsyncPageSource(PageSource):
+    """Page source building pages on demand.
+
+    The last rendered pages are kept in a small LRU, and the neighbours of each requested page are prefetched in the background.
+
+    Args:
+        `fetch` (`Callable[[int, int], Awaitable[Sequence[Any]]]`): Called with the page index and page size, returns the entries of the page.
+
+        `format_page` (`PageFormatter`): Called with the entries and the page index, returns the embed (or an awaitable of it).
+
+        `total_count` (`int`): The total number of entries.
+
+        `page_size` (`int`, optional): The number of entries per page. Defaults to `10`.
+
+        `cache_size` (`int`, optional): The number of rendered pages kept. Defaults to `8`.
+
+        `prefetch` (`int`, optional): The number of pages prefetched on each side of a requested page. Defaults to `1`.
+
+    Example:
+    ```python
+    async def fetch(index: int, size: int) -> List[str]:
+        return items[index * size : (index + 1) * size]
+
+    source = AsyncPageSource(
+        fetch=fetch,
+        format_page=lambda entries, index: discord.Embed(description="\\n".join(entries)),
+        total_count=len(items),
+    )
+    ```
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[int, int], Awaitable[Sequence[Any]]],
+        format_page: PageFormatter,
+        *,
+        total_count: int,
+        page_size: int = 10,
+        cache_size: int = 8,
+        prefetch: int = 1,
+    ) -> None:
+        self.fetch = fetch
+        self.format_page = format_page
+        self.total_count = total_count
+        self.page_size = page_size
+        self.cache_size = cache_size
+        self.prefetch = prefetch
+
+        self._pages: OrderedDict[int, discord.Embed] = OrderedDict()
+        self._pending: Dict[int, asyncio.Task] = {}
+
+    @property
+    def page_count(self) -> int:
+        return max(-(-self.total_count // self.page_size), 1)
+
+    async def get_page(self, index: int) -> discord.Embed:
+        page = await self._get_or_render(index)
+
+        for neighbour in range(index - self.prefetch, index + self.prefetch + 1):
+            if (
+                0 <= neighbour < self.page_count
+                and neighbour not in self._pages
+                and neighbour not in self._pending
+            ):
+                self._schedule(neighbour, prefetch=True)
+
+        return page
+
+    async def _get_or_render(self, index: int) -> discord.Embed:
+        if index in self._pages:
+            self._pages.move_to_end(index)
+            return self._pages[index]
+
+        task = self._pending.get(index)
+        if task is None:
+            task = self._schedule(index)
+        else:
+            # The page is awaited now, so its errors are raised to the caller instead of being logged
+            task.remove_done_callback(self._log_prefetch_error)
+
+        return await asyncio.shield(task)
+
+    def close(self) -> None:
+        for task in list(self._pending.values()):
+            task.cancel()
+
+    def _schedule(self, index: int, *, prefetch: bool = False) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(self._render(index))
+        self._pending[index] = task
+
+        if prefetch:
+            task.add_done_callback(self._log_prefetch_error)
+
+        return task
+
+    async def _render(self, index: int) -> discord.Embed:
+        try:
+            entries = await self.fetch(index, self.page_size)
+
+            page = self.format_page(entries, index)
+            if inspect.isawaitable(page):
+                page = await page
+
+            self._pages[index] = page
+            while len(self._pages) > self.cache_size:
+                self._pages.popitem(last=False)
+
+            return page
+
+        finally:
+            self._pending.pop(index, None)
+
+    @staticmethod
+    def _log_prefetch_error(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            LOGGER.warning("Failed to build a page.", exc_info=task.exception())
+
+
+class QueryPageSource(AsyncPageSource):
+    """Page source over the rows of a query, fetched with `LIMIT`/`OFFSET` from the read-only pool.
+
+    Use `QueryPageSource.create` to build it, since the total count has to be queried first.
+    """
+
+    @classmethod
+    async def create(
+        cls,
+        database_manager: DatabaseManager,
+        query: str,
+        count_query: str,
+        format_page: PageFormatter,
+        *,
+        parameters: Sequence[Any] = (),
+        page_size: int = 10,
+        cache_size: int = 8,
+        prefetch: int = 1,
+    ) -> QueryPageSource:
+        """`Coro`\n
+        Counts the rows and builds the page source.
+
+        Args:
+            `database_manager` (`DatabaseManager`): The database.
+
+            `query` (`str`): The query, with an `ORDER BY` and without `LIMIT`/`OFFSET`.
+
+            `count_query` (`str`): The query returning the total number of rows.
+
+            `format_page` (`PageFormatter`): See `AsyncPageSource`.
+
+            `parameters` (`Sequence[Any]`, optional): The parameters shared by both queries. Defaults to `()`.
+
+            `page_size`, `cache_size`, `prefetch`: See `AsyncPageSource`.
+
+        Returns:
+            `QueryPageSource`: The page source.
+
+        Example:
+        ```python
+        source = await QueryPageSource.create(
+            manager,
+            "SELECT user_id, gold FROM players ORDER BY gold DESC",
+            "SELECT COUNT(*) FROM players",
+            format_leaderboard,
+        )
+        ```
+        """
+        async with database_manager.create_cursor(
+            readonly=True, label="paginator.count"
+        ) as cursor:
+            await cursor.execute(count_query, parameters)
+            (total_count,) = await cursor.fetchone()
+
+        async def fetch(index: int, size: int) -> Sequence[Any]:
+            async with database_manager.create_cursor(
+                readonly=True, label="paginator.page"
+            ) as cursor:
+                await cursor.execute(
+                    f"{query} LIMIT ? OFFSET ?", (*parameters, size, index * size)
+                )
+                return await cursor.fetchall()
+
+        return cls(
+            fetch,
+            format_page,
+            total_count=total_count,
+            page_size=page_size,
+            cache_size=cache_size,
+            prefetch=prefetch,
+        )
 
 
 class EmbedPaginator(View):
+    """Paginated embeds navigated with buttons.
+
+    Args:
+        `interaction` (`Interaction`): The interaction whose response is paginated.
+
+        `pages` (`Optional[List[discord.Embed]]`, optional): The pages, if already built.
+
+        `source` (`Optional[PageSource]`, optional): Where to get the pages from, if `pages` isn't given.
+
+        `coalesce_delay` (`float`, optional): Seconds to wait after a button press before editing the message, so that a burst of presses results in a single edit. Defaults to `0.35`.
+    """
+
+    # Totals over every paginator, see `edits_saved`
+    total_edits_requested: int = 0
+    total_edits_sent: int = 0
+
     def __init__(
         self,
         *,
         interaction: Interaction,
-        pages: List[discord.Embed],
+        pages: Optional[List[discord.Embed]] = None,
+        source: Optional[PageSource] = None,
         timeout: int = 60,
         current_page: int = 0,
         external_input: bool = False,
         ephemeral: bool = False,
+        coalesce_delay: float = 0.35,
     ) -> None:
+        if (pages is None) == (source is None):
+            raise TypeError("Exactly one of 'pages' and 'source' must be given.")
 
         self.external_input = external_input
         self.ephemeral = ephemeral
         self.pages = pages
+        self.source = source if source is not None else ListPageSource(pages)
         self.interaction = interaction
         self.current_page = current_page
+        # The page shown in the message, restored when an edit fails
+        self.displayed_page = current_page
 
-        self.total_page_count = len(pages)
+        self.coalesce_delay = coalesce_delay
+        self.edits_requested: int = 0
+        self.edits_sent: int = 0
+        self._edit_task: Optional[asyncio.Task] = None
+        self._edit_pending: bool = False
+
+        self.total_page_count = self.source.page_count
         self.page_counter = PageCounter(
-            current_page=current_page, total_pages=len(pages)
+            current_page=current_page, total_pages=self.total_page_count
         )
 
         super().__init__(timeout=timeout)
@@ -59,47 +349,101 @@ class EmbedPaginator(View):
         self.next_button.disabled = self.current_page == self.total_page_count - 1
         self.last_button.disabled = self.current_page == self.total_page_count - 1
 
-    @button(label="<<", style=ButtonStyle.success)
-    async def first_button(self, interaction: Interaction, button: Button):
-        self.current_page = 0
+    def stop(self) -> None:
+        self.source.close()
+        super().stop()
+
+    async def on_timeout(self) -> None:
+        self.source.close()
+
+    @property
+    def edits_saved(self) -> int:
+        """The number of message edits avoided by coalescing button presses."""
+        return self.edits_requested - self.edits_sent
+
+    async def _go_to(self, interaction: Interaction, page: int) -> None:
+        """`Coro`\n
+        Moves to a page and acknowledges the button press right away. The message is edited once the presses settle.
+
+        Args:
+            `interaction` (`Interaction`): The button press.
+
+            `page` (`int`): The page index, clamped to the existing pages.
+        """
+        self.current_page = min(max(page, 0), self.total_page_count - 1)
         self._update_buttons()
 
         await interaction.response.defer()
-        await self.interaction.edit_original_response(
-            embed=self.pages[self.current_page], view=self
-        )
+
+        self.edits_requested += 1
+        EmbedPaginator.total_edits_requested += 1
+        self._edit_pending = True
+
+        if self._edit_task is None or self._edit_task.done():
+            self._edit_task = asyncio.get_running_loop().create_task(
+                self._edit_when_settled()
+            )
+
+    async def _edit_when_settled(self) -> None:
+        # Presses during the wait or the edit are picked up by the next iteration
+        while self._edit_pending:
+            await asyncio.sleep(self.coalesce_delay)
+            self._edit_pending = False
+
+            page = self.current_page
+
+            try:
+                await self.interaction.edit_original_response(
+                    embed=await self.source.get_page(page), view=self
+                )
+
+            except Exception as e:
+                # Whatever failed (building the page or editing the message), the buttons go back to the page still shown
+                LOGGER.warning("Failed to edit the paginated message.", exc_info=e)
+                self._edit_pending = False
+                self.current_page = self.displayed_page
+                self._update_buttons()
+                return
+
+            self.displayed_page = page
+            self.edits_sent += 1
+            EmbedPaginator.total_edits_sent += 1
+
+    async def send(self) -> None:
+        """`Coro`\n
+        Sends the current page as the response of the interaction.
+
+        Example:
+        ```
+        await EmbedPaginator(interaction=interaction, source=source).send()
+        ```
+        """
+        embed = await self.source.get_page(self.current_page)
+
+        if self.interaction.response.is_done():
+            await self.interaction.followup.send(
+                embed=embed, view=self, ephemeral=self.ephemeral
+            )
+        else:
+            await self.interaction.response.send_message(
+                embed=embed, view=self, ephemeral=self.ephemeral
+            )
+
+    @button(label="<<", style=ButtonStyle.success)
+    async def first_button(self, interaction: Interaction, button: Button):
+        await self._go_to(interaction, 0)
 
     @button(label="<", style=ButtonStyle.primary)
     async def previous_button(self, interaction: Interaction, button: Button):
-        if self.current_page > 0:
-            self.current_page -= 1
-        self._update_buttons()
-
-        await interaction.response.defer()
-        await self.interaction.edit_original_response(
-            embed=self.pages[self.current_page], view=self
-        )
+        await self._go_to(interaction, self.current_page - 1)
 
     @button(label=">", style=ButtonStyle.primary)
     async def next_button(self, interaction: Interaction, button: Button):
-        if self.current_page < self.total_page_count - 1:
-            self.current_page += 1
-        self._update_buttons()
-
-        await interaction.response.defer()
-        await self.interaction.edit_original_response(
-            embed=self.pages[self.current_page], view=self
-        )
+        await self._go_to(interaction, self.current_page + 1)
 
     @button(label=">>", style=ButtonStyle.success)
     async def last_button(self, interaction: Interaction, button: Button):
-        self.current_page = self.total_page_count - 1
-        self._update_buttons()
-
-        await interaction.response.defer()
-        await self.interaction.edit_original_response(
-            embed=self.pages[self.current_page], view=self
-        )
+        await self._go_to(interaction, self.total_page_count - 1)
 
 
 class PageCounter(Button):
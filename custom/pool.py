@@ -0,0 +1,164 @@
+"""
+Custom module for pooling read-only database connections.
+
+`aiosqlite >= 0.18.0` is required.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager, _AsyncGeneratorContextManager
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import aiosqlite
+
+
+class ReadConnectionPool:
+    """Pool of read-only connections to a database in WAL mode.
+
+    Args:
+        `database_file_path` (`str`): The path of the database file. It must already exist.
+
+        `size` (`int`): The number of connections.
+
+        `acquire_timeout` (`Optional[float]`, optional): Seconds to wait for a free connection. `NoneType` waits forever. Defaults to `5.0`.
+    """
+
+    def __init__(
+        self,
+        database_file_path: str,
+        size: int,
+        *,
+        acquire_timeout: Optional[float] = 5.0,
+    ) -> None:
+        if size < 1:
+            raise ValueError(f"size must be at least 1, got {size}")
+
+        self.database_file_path = database_file_path
+        self.size = size
+        self.acquire_timeout = acquire_timeout
+
+        self._connections: List[aiosqlite.Connection] = []
+        self._idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+
+        self.acquisitions: int = 0
+        self.timeouts: int = 0
+        self.waiters: int = 0
+        self.total_wait_time: float = 0.0
+        self.max_wait_time: float = 0.0
+
+    @property
+    def in_use(self) -> int:
+        """The number of connections currently lent out."""
+        return len(self._connections) - self._idle.qsize()
+
+    async def open(self) -> None:
+        """`Coro`\n
+        Opens every connection of the pool.
+
+        Raises:
+            `aiosqlite.Error`: Raised if a connection fails.
+
+        Example:
+        ```python
+        await open()
+        ```
+        """
+        uri = f"{Path(os.path.abspath(self.database_file_path)).as_uri()}?mode=ro"
+
+        for _ in range(self.size - len(self._connections)):
+            conn = await aiosqlite.connect(uri, uri=True)
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def close(self) -> None:
+        """`Coro`\n
+        Closes every connection of the pool, including the ones lent out.
+
+        Example:
+        ```python
+        await close()
+        ```
+        """
+        connections, self._connections = self._connections, []
+        self._idle = asyncio.Queue()
+
+        for conn in connections:
+            await conn.close()
+
+    @asynccontextmanager
+    async def acquire(self) -> _AsyncGeneratorContextManager[aiosqlite.Connection]:
+        """`Coro`\n
+        Lends a connection of the pool.
+
+        Raises:
+            `PoolTimeoutError`: Raised if no connection is freed within `acquire_timeout` seconds.
+
+        Yields:
+            `aiosqlite.Connection`: A read-only connection.
+
+        Example:
+        ```python
+        async with acquire() as connection:
+            # Do something with the connection
+        ```
+        """
+        started = time.perf_counter()
+        self.waiters += 1
+
+        try:
+            conn = await asyncio.wait_for(self._idle.get(), self.acquire_timeout)
+
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise PoolTimeoutError(self.acquire_timeout) from None
+
+        finally:
+            self.waiters -= 1
+
+        waited = time.perf_counter() - started
+        self.acquisitions += 1
+        self.total_wait_time += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+
+        try:
+            yield conn
+        finally:
+            if conn in self._connections:
+                self._idle.put_nowait(conn)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """`Method`\n
+        Gets the pool statistics.
+
+        Returns:
+            `Dict[str, Union[int, float]]`: The size, connections in use, waiting coroutines, acquisitions, timeouts, total, average and maximum wait time in seconds.
+
+        Example:
+        ```python
+        stats()
+        ```
+        """
+        return {
+            "size": self.size,
+            "in_use": self.in_use,
+            "waiters": self.waiters,
+            "acquisitions": self.acquisitions,
+            "timeouts": self.timeouts,
+            "total_wait_time": self.total_wait_time,
+            "average_wait_time": self.total_wait_time / self.acquisitions
+            if self.acquisitions
+            else 0.0,
+            "max_wait_time": self.max_wait_time,
+        }
+
+
+class PoolTimeoutError(Exception):
+    def __init__(self, timeout: Optional[float]):
+        self.timeout = timeout
+
+    def __str__(self) -> str:
+        return f"No read connection was freed within {self.timeout} seconds."
@@ -0,0 +1,291 @@
+"""
+Custom module for per-user rate limits of app commands.
+
+`discord.py >= 2.0.0` is required by `rate_limit`.
+"""
+
+from __future__ import annotations
+
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+from discord import app_commands
+
+CommandT = TypeVar("CommandT", bound=Union[app_commands.Command, app_commands.Group])
+
+# Buckets are keyed by user ID and scope packed in one integer, snowflakes fit in the high bits
+_SCOPE_BITS = 16
+_SCOPE_MASK = (1 << _SCOPE_BITS) - 1
+
+
+class RateLimit:
+    """A token bucket: `count` uses, refilled over `per` seconds.
+
+    Args:
+        `count` (`int`): The uses allowed in a burst.
+
+        `per` (`float`): The seconds to refill all the uses.
+    """
+
+    __slots__ = ("count", "per", "rate")
+
+    def __init__(self, count: int, per: float) -> None:
+        if count <= 0 or per <= 0:
+            raise ValueError("Rate limits need a positive count and period.")
+
+        self.count = count
+        self.per = per
+        self.rate = count / per
+
+    def __repr__(self) -> str:
+        return f"<RateLimit count={self.count} per={self.per}>"
+
+
+def rate_limit(count: int, per: float) -> Callable[[CommandT], CommandT]:
+    """`Function`\n
+    Decorator setting the rate limit of an app command, used unless `RateLimiter.set_limit` overrides it. Put it above `app_commands.command`.
+
+    Args:
+        `count` (`int`): The uses allowed in a burst.
+
+        `per` (`float`): The seconds to refill all the uses.
+
+    Example:
+    ```python
+    @rate_limit(1, 30.0)
+    @app_commands.command()
+    async def daily(self, interaction: Interaction):
+        ...
+    ```
+    """
+
+    def decorator(command: CommandT) -> CommandT:
+        command.extras["rate_limit"] = RateLimit(count, per)
+        return command
+
+    return decorator
+
+
+class RateLimiter:
+    """Per-user token buckets, refilled lazily from the time of their last use instead of by timers.
+
+    Each limit has its own buckets (its scope): commands without a limit of their own share the default buckets.
+    Buckets are stored in parallel arrays at a slot given to each user and scope, about 100 bytes each,
+    and `sweep` frees the buckets that refilled completely, since they are the same as new ones.
+
+    Args:
+        `default` (`Optional[RateLimit]`, optional): The limit of the commands without one. `None` doesn't limit them. Defaults to 5 uses per 10 seconds.
+
+        `clock` (`Callable[[], float]`, optional): The monotonic time source. Defaults to `time.monotonic`.
+
+    Example:
+    ```python
+    limiter = RateLimiter(RateLimit(5, 10.0))
+    limiter.set_limit(RateLimit(1, 60.0), command="leaderboard", guild_id=guild.id)
+    ```
+    """
+
+    def __init__(
+        self,
+        default: Optional[RateLimit] = RateLimit(5, 10.0),
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.clock = clock
+        self._limits: Dict[Tuple[Optional[str], Optional[int]], Optional[RateLimit]] = {
+            (None, None): default
+        }
+        self._scopes: Dict[int, RateLimit] = {}
+        self._scope_ids: Dict[int, int] = {}
+
+        self._slots: Dict[int, int] = {}
+        self._keys: List[int] = []
+        self._free_slots: List[int] = []
+        self._tokens = array("d")
+        self._updated = array("d")
+
+        self.allowed: int = 0
+        self.throttled: int = 0
+        self.swept: int = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def set_limit(
+        self,
+        limit: Optional[RateLimit],
+        *,
+        command: Optional[str] = None,
+        guild_id: Optional[int] = None,
+    ) -> None:
+        """`Method`\n
+        Sets the limit of a command, of a guild, or of a command in a guild. The most specific one applies.
+
+        Args:
+            `limit` (`Optional[RateLimit]`): The limit. `None` doesn't limit the matching uses.
+
+            `command` (`Optional[str]`, optional): The qualified name of the command. Defaults to every command.
+
+            `guild_id` (`Optional[int]`, optional): The ID of the guild. Defaults to every guild.
+        """
+        self._limits[command, guild_id] = limit
+
+    def limit_for(
+        self,
+        command: Optional[str],
+        guild_id: Optional[int],
+        command_limit: Optional[RateLimit] = None,
+    ) -> Optional[RateLimit]:
+        """`Method`\n
+        Gets the limit of a use.
+
+        Args:
+            `command` (`Optional[str]`): The qualified name of the command.
+
+            `guild_id` (`Optional[int]`): The ID of the guild, `None` in DMs.
+
+            `command_limit` (`Optional[RateLimit]`, optional): The limit set with `rate_limit` on the command. Defaults to `None`.
+
+        Returns:
+            `Optional[RateLimit]`: The limit, `None` if the use isn't limited.
+        """
+        limits = self._limits
+
+        for key in ((command, guild_id), (command, None)):
+            if key in limits:
+                return limits[key]
+
+        if command_limit is not None:
+            return command_limit
+
+        if (None, guild_id) in limits:
+            return limits[None, guild_id]
+
+        return limits[None, None]
+
+    def hit(
+        self,
+        user_id: int,
+        command: Optional[str] = None,
+        guild_id: Optional[int] = None,
+        command_limit: Optional[RateLimit] = None,
+    ) -> float:
+        """`Method`\n
+        Uses a token of the bucket of a user, if there is one left.
+
+        Args:
+            `user_id` (`int`): The ID of the user.
+
+            `command` (`Optional[str]`, optional): The qualified name of the command. Defaults to `None`.
+
+            `guild_id` (`Optional[int]`, optional): The ID of the guild. Defaults to `None`.
+
+            `command_limit` (`Optional[RateLimit]`, optional): The limit set with `rate_limit` on the command. Defaults to `None`.
+
+        Returns:
+            `float`: `0.0` if the use is allowed, otherwise the seconds until it would be.
+        """
+        limit = self.limit_for(command, guild_id, command_limit)
+        if limit is None:
+            self.allowed += 1
+            return 0.0
+
+        now = self.clock()
+        key = (user_id << _SCOPE_BITS) | self._scope_of(limit)
+        slot = self._slots.get(key)
+
+        if slot is None:
+            slot = self._new_slot(key)
+            tokens = float(limit.count)
+        else:
+            tokens = min(
+                float(limit.count),
+                self._tokens[slot] + (now - self._updated[slot]) * limit.rate,
+            )
+
+        if tokens < 1.0:
+            self._tokens[slot] = tokens
+            self._updated[slot] = now
+            self.throttled += 1
+            return (1.0 - tokens) / limit.rate
+
+        self._tokens[slot] = tokens - 1.0
+        self._updated[slot] = now
+        self.allowed += 1
+        return 0.0
+
+    def sweep(self) -> int:
+        """`Method`\n
+        Frees the buckets that refilled completely. Compacts the arrays once most slots are free.
+
+        Returns:
+            `int`: The number of freed buckets.
+        """
+        now = self.clock()
+        freed = 0
+
+        for key, slot in list(self._slots.items()):
+            limit = self._scopes[key & _SCOPE_MASK]
+            refilled = self._tokens[slot] + (now - self._updated[slot]) * limit.rate
+
+            if refilled >= limit.count:
+                del self._slots[key]
+                self._free_slots.append(slot)
+                freed += 1
+
+        if len(self._free_slots) > len(self._slots):
+            self._compact()
+
+        self.swept += freed
+        return freed
+
+    def stats(self) -> Dict[str, int]:
+        """`Method`\n
+        Gets the limiter counters.
+
+        Returns:
+            `Dict[str, int]`: The live buckets, allowed and throttled uses, and swept buckets.
+        """
+        return {
+            "buckets": len(self._slots),
+            "allowed": self.allowed,
+            "throttled": self.throttled,
+            "swept": self.swept,
+        }
+
+    def _scope_of(self, limit: RateLimit) -> int:
+        scope = self._scope_ids.get(id(limit))
+
+        if scope is None:
+            scope = len(self._scopes)
+            if scope > _SCOPE_MASK:
+                raise ValueError("Too many different rate limits.")
+
+            self._scopes[scope] = limit
+            self._scope_ids[id(limit)] = scope
+
+        return scope
+
+    def _new_slot(self, key: int) -> int:
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._keys[slot] = key
+        else:
+            slot = len(self._keys)
+            self._keys.append(key)
+            self._tokens.append(0.0)
+            self._updated.append(0.0)
+
+        self._slots[key] = slot
+        return slot
+
+    def _compact(self) -> None:
+        keys = list(self._slots)
+        slots = [self._slots[key] for key in keys]
+
+        self._keys = keys
+        self._tokens = array("d", (self._tokens[slot] for slot in slots))
+        self._updated = array("d", (self._updated[slot] for slot in slots))
+        self._slots = {key: slot for slot, key in enumerate(keys)}
+        self._free_slots = []
@@ -0,0 +1,132 @@
+"""
+Custom module for deduplicated error reports.
+
+No third-party dependency is required.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import traceback
+from collections import Counter
+from typing import Dict, List, Optional
+
+
+def error_fingerprint(error: BaseException) -> str:
+    """`Function`\n
+    Identifies an error by its type and the frames of its traceback, ignoring the message.
+
+    Args:
+        `error` (`BaseException`): The error. Wrappers with an `original` attribute, like `CommandInvokeError`, are unwrapped.
+
+    Returns:
+        `str`: A short hex digest.
+    """
+    error = getattr(error, "original", error)
+    error_type = type(error)
+
+    parts = [f"{error_type.__module__}.{error_type.__qualname__}"]
+    parts.extend(
+        f"{frame.filename}:{frame.name}:{frame.lineno}"
+        for frame in traceback.extract_tb(error.__traceback__)
+    )
+
+    return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class ErrorReport:
+    """The occurrences of one error fingerprint during a window."""
+
+    __slots__ = (
+        "fingerprint",
+        "title",
+        "count",
+        "commands",
+        "sample",
+        "first_seen",
+        "last_seen",
+    )
+
+    def __init__(self, fingerprint: str, title: str, sample: Optional[str]) -> None:
+        self.fingerprint = fingerprint
+        self.title = title
+        self.count: int = 0
+        self.commands: Counter[str] = Counter()
+        self.sample = sample
+        self.first_seen = datetime.datetime.now()
+        self.last_seen = self.first_seen
+
+
+class ErrorAggregator:
+    """Groups errors by fingerprint until they are drained, once per reporting window.
+
+    Args:
+        `max_reports` (`int`, optional): The maximum number of fingerprints kept per window. Errors with other fingerprints are only counted in `overflow`. Defaults to `25`.
+
+        `max_traceback_length` (`int`, optional): The maximum number of characters kept from a sample traceback. Defaults to `20000`.
+    """
+
+    def __init__(
+        self, *, max_reports: int = 25, max_traceback_length: int = 20000
+    ) -> None:
+        self.max_reports = max_reports
+        self.max_traceback_length = max_traceback_length
+
+        self._reports: Dict[str, ErrorReport] = {}
+        self.overflow: int = 0
+
+    def __len__(self) -> int:
+        return len(self._reports)
+
+    def add(self, error: BaseException, command_name: str) -> bool:
+        """`Method`\n
+        Records an occurrence of an error.
+
+        Args:
+            `error` (`BaseException`): The error.
+
+            `command_name` (`str`): The command that raised it.
+
+        Returns:
+            `bool`: Whether it is the first occurrence of its fingerprint in the current window.
+        """
+        fingerprint = error_fingerprint(error)
+        report = self._reports.get(fingerprint)
+        is_new = report is None
+
+        if is_new:
+            if len(self._reports) >= self.max_reports:
+                self.overflow += 1
+                return False
+
+            original = getattr(error, "original", error)
+            sample = "".join(
+                traceback.format_exception(type(error), error, error.__traceback__)
+            )
+            if len(sample) > self.max_traceback_length:
+                sample = "...\n" + sample[-self.max_traceback_length :]
+
+            report = ErrorReport(
+                fingerprint, f"{type(original).__name__}: {original}"[:250], sample
+            )
+            self._reports[fingerprint] = report
+
+        report.count += 1
+        report.commands[command_name] += 1
+        report.last_seen = datetime.datetime.now()
+
+        return is_new
+
+    def drain(self) -> List[ErrorReport]:
+        """`Method`\n
+        Gets the reports of the current window and starts a new one. Read `overflow` first, since it is reset too.
+
+        Returns:
+            `List[ErrorReport]`: The reports, most frequent first.
+        """
+        reports = sorted(self._reports.values(), key=lambda report: -report.count)
+        self._reports = {}
+        self.overflow = 0
+
+        return reports
@@ -0,0 +1,527 @@
+"""
+Custom module for typed access to the `players`, `inventories` and `inventory_items` tables.
+
+`aiosqlite >= 0.18.0` is required.
+
+Batch lookups pass the keys as a single JSON array to `json_each`, so SQLite >= 3.38.0 (or an older build with JSON1) is required.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+from typing import (
+    Any,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    TYPE_CHECKING,
+)
+
+from .cache import PLAYER_COLUMNS, PlayerRecord
+from .exceptions import InsufficientItems, InvalidItem
+
+if TYPE_CHECKING:
+    from .database import DatabaseManager
+
+Record = TypeVar("Record")
+
+
+class InventoryRecord:
+    """Compact representation of a row of the `inventories` table."""
+
+    __slots__ = ("inventory_id",)
+
+    def __init__(self, inventory_id: int) -> None:
+        self.inventory_id = inventory_id
+
+    @classmethod
+    def from_row(cls, row: Tuple[Any, ...]) -> InventoryRecord:
+        return cls(*row)
+
+    def to_row(self) -> Tuple[Any, ...]:
+        return (self.inventory_id,)
+
+    def __repr__(self) -> str:
+        return f"<InventoryRecord inventory_id={self.inventory_id}>"
+
+
+class Repository(Generic[Record]):
+    """Base class of the table repositories.
+
+    The SQL of every operation only depends on the table and on the updated column names,
+    so the statements are reused from SQLite's prepared statements cache.
+
+    Args:
+        `database_manager` (`DatabaseManager`): The database.
+    """
+
+    table: str
+    key: str
+    columns: Tuple[str, ...]
+    attributes: Tuple[str, ...]
+    record_type: Type[Record]
+
+    def __init__(self, database_manager: DatabaseManager) -> None:
+        self.database_manager = database_manager
+
+        columns = ", ".join(self.columns)
+        self._select = f"SELECT {columns} FROM {self.table} WHERE {self.key} = ?"
+        self._select_many = (
+            f"SELECT {columns} FROM {self.table} "
+            f"WHERE {self.key} IN (SELECT value FROM json_each(?))"
+        )
+        self._upsert = (
+            f"INSERT INTO {self.table} ({columns}) VALUES ({', '.join('?' * len(self.columns))}) "
+            f"ON CONFLICT ({self.key}) DO "
+            + (
+                "UPDATE SET "
+                + ", ".join(f"{column} = excluded.{column}" for column in self.columns[1:])
+                if len(self.columns) > 1
+                else "NOTHING"
+            )
+        )
+        self._delete = f"DELETE FROM {self.table} WHERE {self.key} = ?"
+
+    async def get(self, key: int) -> Optional[Record]:
+        """`Coro`\n
+        Gets a row.
+
+        Args:
+            `key` (`int`): The primary key.
+
+        Returns:
+            `Optional[Record]`: The record, or `NoneType` if it doesn't exist.
+
+        Example:
+        ```python
+        await get(1)
+        ```
+        """
+        async with self.database_manager.create_cursor(
+            readonly=True, label=f"{self.table}.get"
+        ) as cursor:
+            await cursor.execute(self._select, (key,))
+            row = await cursor.fetchone()
+
+        return self.record_type.from_row(row) if row is not None else None
+
+    async def get_many(self, keys: Iterable[int]) -> Dict[int, Record]:
+        """`Coro`\n
+        Gets many rows with a single query.
+
+        Args:
+            `keys` (`Iterable[int]`): The primary keys.
+
+        Returns:
+            `Dict[int, Record]`: The records by primary key. Missing rows are left out.
+
+        Example:
+        ```python
+        await get_many(member.id for member in guild.members)
+        ```
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+
+        async with self.database_manager.create_cursor(
+            readonly=True, label=f"{self.table}.get_many"
+        ) as cursor:
+            await cursor.execute(self._select_many, (json.dumps(keys),))
+            rows = await cursor.fetchall()
+
+        return {row[0]: self.record_type.from_row(row) for row in rows}
+
+    async def upsert(self, record: Record) -> None:
+        """`Coro`\n
+        Inserts a row, or replaces the existing one.
+
+        Args:
+            `record` (`Record`): The record.
+        """
+        await self.upsert_many([record])
+
+    async def upsert_many(self, records: Iterable[Record]) -> None:
+        """`Coro`\n
+        Inserts or replaces many rows in a single transaction.
+
+        Args:
+            `records` (`Iterable[Record]`): The records.
+        """
+        await self._write_many(self._upsert, [record.to_row() for record in records])
+
+    async def update_fields(self, key: int, **fields: Any) -> None:
+        """`Coro`\n
+        Changes some columns of a row.
+
+        Args:
+            `key` (`int`): The primary key.
+
+            `**fields` (`Any`): The record attribute names and their new values.
+
+        Raises:
+            `AttributeError`: Raised if a field isn't an editable record attribute.
+
+        Example:
+        ```python
+        await update_fields(1, gold=50, health=100)
+        ```
+        """
+        await self.update_fields_many([(key, fields)])
+
+    async def update_fields_many(
+        self, updates: Iterable[Tuple[int, Dict[str, Any]]]
+    ) -> None:
+        """`Coro`\n
+        Changes some columns of many rows in a single transaction. Updates of the same set of columns share one `executemany`.
+
+        Args:
+            `updates` (`Iterable[Tuple[int, Dict[str, Any]]]`): The primary keys and their changed attributes.
+
+        Raises:
+            `AttributeError`: Raised if a field isn't an editable record attribute.
+        """
+        groups: Dict[Tuple[str, ...], List[Sequence[Any]]] = {}
+
+        for key, fields in updates:
+            names = tuple(sorted(fields))
+
+            for name in names:
+                if name not in self.attributes[1:]:
+                    raise AttributeError(f"'{name}' is not an editable {self.table} field.")
+
+            groups.setdefault(names, []).append(
+                [fields[name] for name in names] + [key]
+            )
+
+        statements = []
+        for names, rows in groups.items():
+            assignments = ", ".join(
+                f"{self.columns[self.attributes.index(name)]} = ?" for name in names
+            )
+            statements.append(
+                (f"UPDATE {self.table} SET {assignments} WHERE {self.key} = ?", rows)
+            )
+
+        await self._write_statements(statements)
+
+    async def delete(self, key: int) -> None:
+        """`Coro`\n
+        Deletes a row.
+
+        Args:
+            `key` (`int`): The primary key.
+        """
+        await self.delete_many([key])
+
+    async def delete_many(self, keys: Iterable[int]) -> None:
+        """`Coro`\n
+        Deletes many rows in a single transaction.
+
+        Args:
+            `keys` (`Iterable[int]`): The primary keys.
+        """
+        await self._write_many(self._delete, [(key,) for key in keys])
+
+    async def _write_many(self, sql: str, rows: List[Sequence[Any]]) -> None:
+        await self._write_statements([(sql, rows)])
+
+    async def _write_statements(
+        self, statements: List[Tuple[str, List[Sequence[Any]]]]
+    ) -> None:
+        if self.database_manager.writer is not None:
+            await self.database_manager.writer.execute(
+                [(sql, rows) for sql, rows in statements if rows]
+            )
+            return
+
+        async with self.database_manager.transaction(
+            label=f"{self.table}.write"
+        ) as connection:
+            for sql, rows in statements:
+                if rows:
+                    await connection.executemany(sql, rows)
+
+
+class PlayerRepository(Repository[PlayerRecord]):
+    """Repository of the `players` table.
+
+    Reads return the players cache copy when there is one, since it may hold changes not flushed yet,
+    and writes are mirrored to the cached copies and to the leaderboard.
+    """
+
+    table = "players"
+    key = "user_id"
+    columns = PLAYER_COLUMNS
+    attributes = PlayerRecord.__slots__
+    record_type = PlayerRecord
+
+    async def get(self, key: int) -> Optional[PlayerRecord]:
+        return (await self.get_many([key])).get(key)
+
+    async def get_many(self, keys: Iterable[int]) -> Dict[int, PlayerRecord]:
+        cache = self.database_manager.player_cache
+        found: Dict[int, PlayerRecord] = {}
+        missing: List[int] = []
+
+        for key in keys:
+            if key in cache:
+                found[key] = cache.get(key)
+            else:
+                missing.append(key)
+
+        found.update(await super().get_many(missing))
+        return found
+
+    async def upsert_many(self, records: Iterable[PlayerRecord]) -> None:
+        records = list(records)
+        await super().upsert_many(records)
+
+        cache = self.database_manager.player_cache
+        for record in records:
+            self.database_manager.leaderboard.update_record(record)
+
+            if record.user_id in cache:
+                cache.apply(
+                    record.user_id,
+                    {name: getattr(record, name) for name in self.attributes[1:]},
+                )
+
+    async def update_fields_many(
+        self, updates: Iterable[Tuple[int, Dict[str, Any]]]
+    ) -> None:
+        updates = list(updates)
+        await super().update_fields_many(updates)
+
+        cache = self.database_manager.player_cache
+        for key, fields in updates:
+            cache.apply(key, fields)
+            self.database_manager.leaderboard.update(key, fields)
+
+    async def delete_many(self, keys: Iterable[int]) -> None:
+        keys = list(keys)
+        await super().delete_many(keys)
+
+        for key in keys:
+            self.database_manager.player_cache.discard(key)
+            self.database_manager.leaderboard.remove(key)
+
+
+class InventoryRepository(Repository[InventoryRecord]):
+    """Repository of the `inventories` table, and of the items they hold in `inventory_items`.
+
+    Items are returned as quantities by item ID, their details are in `DatabaseManager.items`.
+    """
+
+    table = "inventories"
+    key = "inventory_id"
+    columns = ("inventory_id",)
+    attributes = InventoryRecord.__slots__
+    record_type = InventoryRecord
+
+    _select_items_many = (
+        "SELECT inventory_id, item_id, quantity FROM inventory_items "
+        "WHERE inventory_id IN (SELECT value FROM json_each(?)) AND quantity > 0"
+    )
+    _select_held = (
+        "SELECT inventory_id, item_id, quantity FROM inventory_items "
+        "WHERE (inventory_id, item_id) IN "
+        "(SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]') FROM json_each(?))"
+    )
+    _add_items = (
+        "INSERT INTO inventory_items (inventory_id, item_id, quantity) VALUES (?, ?, ?) "
+        "ON CONFLICT (inventory_id, item_id) DO UPDATE SET quantity = quantity + excluded.quantity"
+    )
+    # Removals upsert the remaining quantity, so the CHECK constraint of the table rolls the whole write back
+    # if a concurrent removal went first, including when it already deleted the row
+    _remove_items = (
+        "INSERT INTO inventory_items (inventory_id, item_id, quantity) VALUES (?1, ?2, "
+        "coalesce((SELECT quantity FROM inventory_items WHERE inventory_id = ?1 AND item_id = ?2), 0) - ?3) "
+        "ON CONFLICT (inventory_id, item_id) DO UPDATE SET quantity = excluded.quantity"
+    )
+    _delete_empty_items = (
+        "DELETE FROM inventory_items WHERE inventory_id = ? AND item_id = ? AND quantity = 0"
+    )
+
+    async def get_items(self, inventory_id: int) -> Dict[int, int]:
+        """`Coro`\n
+        Gets the items of an inventory with a single query.
+
+        Args:
+            `inventory_id` (`int`): The ID of the inventory.
+
+        Returns:
+            `Dict[int, int]`: The quantities by item ID.
+        """
+        return (await self.get_items_many([inventory_id])).get(inventory_id, {})
+
+    async def get_items_many(
+        self, inventory_ids: Iterable[int]
+    ) -> Dict[int, Dict[int, int]]:
+        """`Coro`\n
+        Gets the items of many inventories with a single query.
+
+        Args:
+            `inventory_ids` (`Iterable[int]`): The IDs of the inventories.
+
+        Returns:
+            `Dict[int, Dict[int, int]]`: The quantities by item ID, by inventory ID. Empty inventories are left out.
+
+        Example:
+        ```python
+        await get_items_many(member.id for member in guild.members)
+        ```
+        """
+        inventory_ids = list(inventory_ids)
+        if not inventory_ids:
+            return {}
+
+        async with self.database_manager.create_cursor(
+            readonly=True, label="inventory_items.get_many"
+        ) as cursor:
+            await cursor.execute(self._select_items_many, (json.dumps(inventory_ids),))
+            rows = await cursor.fetchall()
+
+        inventories: Dict[int, Dict[int, int]] = {}
+        for inventory_id, item_id, quantity in rows:
+            inventories.setdefault(inventory_id, {})[item_id] = quantity
+
+        return inventories
+
+    async def has_items(self, inventory_id: int, items: Mapping[int, int]) -> bool:
+        """`Coro`\n
+        Checks whether an inventory holds at least some quantities of items.
+
+        Args:
+            `inventory_id` (`int`): The ID of the inventory.
+
+            `items` (`Mapping[int, int]`): The needed quantities by item ID.
+
+        Returns:
+            `bool`: Whether every quantity is held.
+        """
+        held = await self._get_held((inventory_id, item_id) for item_id in items)
+        return all(
+            held.get((inventory_id, item_id), 0) >= quantity
+            for item_id, quantity in items.items()
+        )
+
+    async def add_items(self, changes: Iterable[Tuple[int, int, int]]) -> None:
+        """`Coro`\n
+        Adds items to many inventories in a single transaction. Missing inventories are created.
+
+        Args:
+            `changes` (`Iterable[Tuple[int, int, int]]`): The inventory IDs, item IDs and positive quantities.
+
+        Raises:
+            `InvalidItem`: Raised if an item isn't in the catalog.
+
+            `ValueError`: Raised if a quantity isn't positive.
+
+        Example:
+        ```python
+        await add_items([(user.id, potion.item_id, 3) for user in party])
+        ```
+        """
+        rows = self._item_rows(changes)
+
+        await self._write_statements(
+            [
+                (self._upsert, sorted({(inventory_id,) for inventory_id, _, _ in rows})),
+                (self._add_items, rows),
+            ]
+        )
+
+    async def remove_items(self, changes: Iterable[Tuple[int, int, int]]) -> None:
+        """`Coro`\n
+        Removes items from many inventories in a single transaction. Nothing is removed if an inventory doesn't hold enough,
+        even when a concurrent removal took the items after they were checked.
+
+        Args:
+            `changes` (`Iterable[Tuple[int, int, int]]`): The inventory IDs, item IDs and positive quantities.
+
+        Raises:
+            `InvalidItem`: Raised if an item isn't in the catalog.
+
+            `InsufficientItems`: Raised if an inventory doesn't hold enough of an item.
+
+            `ValueError`: Raised if a quantity isn't positive.
+        """
+        rows = self._item_rows(changes)
+
+        needed: Dict[Tuple[int, int], int] = {}
+        for inventory_id, item_id, quantity in rows:
+            needed[inventory_id, item_id] = needed.get((inventory_id, item_id), 0) + quantity
+
+        await self._check_held(needed)
+
+        try:
+            await self._write_statements(
+                [
+                    (
+                        self._remove_items,
+                        [
+                            (inventory_id, item_id, quantity)
+                            for (inventory_id, item_id), quantity in needed.items()
+                        ],
+                    ),
+                    (self._delete_empty_items, list(needed)),
+                ]
+            )
+
+        except sqlite3.Error:
+            # The write was rolled back, most likely because the items were taken in the meantime
+            await self._check_held(needed)
+            raise
+
+    async def _get_held(
+        self, keys: Iterable[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], int]:
+        keys = [list(key) for key in keys]
+        if not keys:
+            return {}
+
+        async with self.database_manager.create_cursor(
+            readonly=True, label="inventory_items.get_held"
+        ) as cursor:
+            await cursor.execute(self._select_held, (json.dumps(keys),))
+            rows = await cursor.fetchall()
+
+        return {
+            (inventory_id, item_id): quantity for inventory_id, item_id, quantity in rows
+        }
+
+    async def _check_held(self, needed: Mapping[Tuple[int, int], int]) -> None:
+        held = await self._get_held(needed)
+
+        for (inventory_id, item_id), quantity in needed.items():
+            available = held.get((inventory_id, item_id), 0)
+
+            if available < quantity:
+                raise InsufficientItems(
+                    inventory_id,
+                    self.database_manager.items.find(item_id).name,
+                    available,
+                    quantity,
+                )
+
+    def _item_rows(self, changes: Iterable[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+        catalog = self.database_manager.items
+        rows = list(changes)
+
+        for _, item_id, quantity in rows:
+            if item_id not in catalog:
+                raise InvalidItem(item_id)
+
+            if quantity <= 0:
+                raise ValueError(f"Item quantities must be positive, got {quantity}.")
+
+        return rows
@@ -0,0 +1,474 @@
+"""
+Custom module for periodic jobs.
+
+No third-party dependency is required.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import datetime
+import heapq
+import itertools
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+LOGGER = logging.getLogger(__name__)
+
+JobCallback = Callable[[], Awaitable[Any]]
+
+# (name, lowest, highest) of each field of a cron expression
+CRON_FIELDS: Tuple[Tuple[str, int, int], ...] = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 6),
+)
+
+
+class CronSchedule:
+    """A cron-like schedule: `minute hour day month weekday`, in local time.
+
+    Each field accepts `*`, values, ranges and steps, separated by commas (e.g. `*/15`, `1-5`, `0,30`).
+    Weekdays go from 0 (Sunday) to 6, 7 is also Sunday. Like cron, when both the day and the weekday
+    are restricted, either of them matching is enough.
+
+    Args:
+        `expression` (`str`): The expression.
+
+    Raises:
+        `ValueError`: Raised if the expression is invalid.
+
+    Example:
+    ```python
+    CronSchedule("0 4 * * 1")  # Every Monday at 4:00
+    ```
+    """
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != len(CRON_FIELDS):
+            raise ValueError(
+                f"A cron expression has {len(CRON_FIELDS)} fields, got {expression!r}"
+            )
+
+        self.expression = expression
+        values: List[FrozenSet[int]] = []
+
+        for field, (name, lowest, highest) in zip(fields, CRON_FIELDS):
+            if name == "weekday":
+                highest = 7
+
+            parsed = self._parse_field(field, lowest, highest)
+            if name == "weekday" and 7 in parsed:
+                parsed = (parsed - {7}) | {0}
+
+            values.append(parsed)
+
+        self.minutes, self.hours, self.days, self.months, self.weekdays = values
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    @staticmethod
+    def _parse_field(field: str, lowest: int, highest: int) -> FrozenSet[int]:
+        values: Set[int] = set()
+
+        for part in field.split(","):
+            step = 1
+            if "/" in part:
+                part, step_text = part.split("/", 1)
+                step = int(step_text)
+
+                if step < 1:
+                    raise ValueError(f"Invalid step in cron field {field!r}")
+
+            if part == "*":
+                start, end = lowest, highest
+            elif "-" in part:
+                start, end = map(int, part.split("-", 1))
+            else:
+                start = int(part)
+                end = highest if step > 1 else start
+
+            if not lowest <= start <= end <= highest:
+                raise ValueError(
+                    f"Cron field {field!r} must be between {lowest} and {highest}"
+                )
+
+            values.update(range(start, end + 1, step))
+
+        return frozenset(values)
+
+    def _day_matches(self, moment: datetime.datetime) -> bool:
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays
+
+        if self._any_day or self._any_weekday:
+            return day and weekday
+
+        return day or weekday
+
+    def next_after(self, moment: datetime.datetime) -> datetime.datetime:
+        """`Method`\n
+        Gets the first matching minute after a moment.
+
+        Args:
+            `moment` (`datetime.datetime`): The moment.
+
+        Raises:
+            `ValueError`: Raised if nothing matches in the next 5 years (e.g. February 31st).
+
+        Returns:
+            `datetime.datetime`: The next matching minute.
+        """
+        current = moment.replace(second=0, microsecond=0) + datetime.timedelta(
+            minutes=1
+        )
+        limit = current + datetime.timedelta(days=366 * 5)
+
+        # Skips whole months, days and hours that can't match
+        while current < limit:
+            if current.month not in self.months:
+                current = (
+                    current.replace(day=1, hour=0, minute=0)
+                    + datetime.timedelta(days=32)
+                ).replace(day=1)
+            elif not self._day_matches(current):
+                current = current.replace(hour=0, minute=0) + datetime.timedelta(days=1)
+            elif current.hour not in self.hours:
+                current = current.replace(minute=0) + datetime.timedelta(hours=1)
+            elif current.minute not in self.minutes:
+                current += datetime.timedelta(minutes=1)
+            else:
+                return current
+
+        raise ValueError(f"The cron expression {self.expression!r} never matches.")
+
+
+class Job:
+    """A job registered in a `Scheduler`. See `Scheduler.add_job` for the arguments."""
+
+    def __init__(
+        self,
+        name: str,
+        callback: JobCallback,
+        *,
+        interval: Optional[float],
+        cron: Optional[CronSchedule],
+        jitter: float,
+        max_concurrency: int,
+        skip_if_running: bool,
+        owner: Any,
+    ) -> None:
+        self.name = name
+        self.callback = callback
+        self.interval = interval
+        self.cron = cron
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+        self.skip_if_running = skip_if_running
+        self.owner = owner
+
+        self.next_run: float = 0.0
+        self.cancelled: bool = False
+        self.tasks: Set[asyncio.Task] = set()
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+        self.runs: int = 0
+        self.failures: int = 0
+        self.skipped: int = 0
+        self.overruns: int = 0
+        self.last_runtime: float = 0.0
+        self.max_runtime: float = 0.0
+        self.total_runtime: float = 0.0
+
+    def __repr__(self) -> str:
+        schedule = (
+            f"interval={self.interval}"
+            if self.cron is None
+            else f"cron={self.cron.expression!r}"
+        )
+        return f"<Job name={self.name!r} {schedule} runs={self.runs}>"
+
+    @property
+    def running(self) -> int:
+        """The number of runs in progress."""
+        return len(self.tasks)
+
+    def delay_until_next(self) -> float:
+        """`Method`\n
+        Computes how long to wait before the next run, jitter included.
+
+        Returns:
+            `float`: The delay in seconds.
+        """
+        if self.cron is not None:
+            now = datetime.datetime.now()
+            delay = (self.cron.next_after(now) - now).total_seconds()
+        else:
+            delay = self.interval
+
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+
+        return delay
+
+    async def run(self) -> None:
+        """`Coro`\n
+        Runs the callback once and records its runtime. Errors are logged, not raised.
+        """
+        async with self._slots:
+            started = time.perf_counter()
+
+            try:
+                await self.callback()
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as e:
+                self.failures += 1
+                LOGGER.error(f"Scheduled job {self.name!r} failed.", exc_info=e)
+
+            finally:
+                runtime = time.perf_counter() - started
+                self.runs += 1
+                self.last_runtime = runtime
+                self.total_runtime += runtime
+                self.max_runtime = max(self.max_runtime, runtime)
+
+                if self.interval is not None and runtime > self.interval:
+                    self.overruns += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """`Method`\n
+        Gets the job counters.
+
+        Returns:
+            `Dict[str, Any]`: The runs, failures, skipped runs, overruns (runs longer than the interval), runs in progress and runtimes in seconds.
+        """
+        return {
+            "name": self.name,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "overruns": self.overruns,
+            "running": self.running,
+            "last_runtime": self.last_runtime,
+            "max_runtime": self.max_runtime,
+            "mean_runtime": self.total_runtime / self.runs if self.runs else 0.0,
+        }
+
+
+class Scheduler:
+    """Runs periodic jobs from a single timer task and a heap of next run times.
+
+    Jobs registered before `start()` begin once it's called.
+
+    Example:
+    ```python
+    job = bot.scheduler.add_job(self.refresh, interval=60, jitter=5, owner=self)
+    ...
+    bot.scheduler.remove_owner(self)  # In cog_unload
+    ```
+    """
+
+    def __init__(self) -> None:
+        self.jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, Job]] = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def add_job(
+        self,
+        callback: JobCallback,
+        *,
+        name: Optional[str] = None,
+        interval: Optional[float] = None,
+        cron: Optional[str] = None,
+        jitter: float = 0.0,
+        max_concurrency: int = 1,
+        skip_if_running: bool = True,
+        run_immediately: bool = False,
+        owner: Any = None,
+    ) -> Job:
+        """`Method`\n
+        Registers a periodic job.
+
+        Args:
+            `callback` (`JobCallback`): The coroutine function to run, without arguments.
+
+            `name` (`Optional[str]`, optional): The unique name of the job. Defaults to the qualified name of the callback.
+
+            `interval` (`Optional[float]`, optional): The seconds between two runs. Exactly one of `interval` and `cron` must be given. Defaults to `None`.
+
+            `cron` (`Optional[str]`, optional): A `CronSchedule` expression. Defaults to `None`.
+
+            `jitter` (`float`, optional): A random delay of up to this many seconds added to each run. Defaults to `0.0`.
+
+            `max_concurrency` (`int`, optional): The maximum number of runs at the same time. Defaults to `1`.
+
+            `skip_if_running` (`bool`, optional): Whether a run is skipped when `max_concurrency` runs are still in progress, instead of waiting for one to end. Defaults to `True`.
+
+            `run_immediately` (`bool`, optional): Whether the first run happens right away instead of after a period. Defaults to `False`.
+
+            `owner` (`Any`, optional): The object the job belongs to, like a cog, for `remove_owner`. Defaults to `None`.
+
+        Raises:
+            `ValueError`: Raised if the schedule is invalid or the name is taken.
+
+        Returns:
+            `Job`: The job.
+        """
+        if (interval is None) == (cron is None):
+            raise ValueError("Exactly one of 'interval' and 'cron' must be given.")
+        if interval is not None and interval <= 0:
+            raise ValueError(f"interval must be greater than 0, got {interval}")
+        if max_concurrency < 1:
+            raise ValueError(f"max_concurrency must be at least 1, got {max_concurrency}")
+
+        name = name or getattr(callback, "__qualname__", repr(callback))
+        if name in self.jobs:
+            raise ValueError(f"A job named {name!r} already exists.")
+
+        job = Job(
+            name,
+            callback,
+            interval=interval,
+            cron=CronSchedule(cron) if cron is not None else None,
+            jitter=jitter,
+            max_concurrency=max_concurrency,
+            skip_if_running=skip_if_running,
+            owner=owner,
+        )
+        self.jobs[name] = job
+
+        delay = 0.0 if run_immediately else job.delay_until_next()
+        self._push(job, time.monotonic() + delay)
+
+        return job
+
+    def remove_job(self, job: Job | str, *, cancel_running: bool = True) -> None:
+        """`Method`\n
+        Unregisters a job. Its heap entry is dropped when it comes up.
+
+        Args:
+            `job` (`Job | str`): The job or its name.
+
+            `cancel_running` (`bool`, optional): Whether the runs in progress are cancelled. Defaults to `True`.
+        """
+        if isinstance(job, str):
+            job = self.jobs.get(job)
+            if job is None:
+                return
+
+        if self.jobs.get(job.name) is job:
+            del self.jobs[job.name]
+
+        job.cancelled = True
+
+        if cancel_running:
+            for task in job.tasks:
+                task.cancel()
+
+    def remove_owner(self, owner: Any, *, cancel_running: bool = True) -> None:
+        """`Method`\n
+        Unregisters every job of an owner, e.g. in `cog_unload`.
+
+        Args:
+            `owner` (`Any`): The owner.
+
+            `cancel_running` (`bool`, optional): Whether the runs in progress are cancelled. Defaults to `True`.
+        """
+        for job in [job for job in self.jobs.values() if job.owner is owner]:
+            self.remove_job(job, cancel_running=cancel_running)
+
+    def start(self) -> None:
+        """`Method`\n
+        Starts the timer task on the running event loop.
+        """
+        if not self.is_running:
+            self._task = asyncio.get_running_loop().create_task(self._timer())
+
+    async def close(self) -> None:
+        """`Coro`\n
+        Stops the timer and cancels every job and run in progress.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        tasks = [task for job in self.jobs.values() for task in job.tasks]
+        for job in list(self.jobs.values()):
+            self.remove_job(job)
+
+        self._heap.clear()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """`Method`\n
+        Gets the counters of every job.
+
+        Returns:
+            `List[Dict[str, Any]]`: See `Job.stats`.
+        """
+        return [job.stats() for job in self.jobs.values()]
+
+    def _push(self, job: Job, when: float) -> None:
+        job.next_run = when
+        heapq.heappush(self._heap, (when, next(self._counter), job))
+
+        # Wakes the timer up if this job is now the first one
+        if self._heap[0][2] is job:
+            self._wakeup.set()
+
+    async def _timer(self) -> None:
+        while True:
+            self._wakeup.clear()
+            timeout = (
+                max(self._heap[0][0] - time.monotonic(), 0) if self._heap else None
+            )
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+
+            except asyncio.TimeoutError:
+                pass
+
+            now = time.monotonic()
+
+            while self._heap and self._heap[0][0] <= now:
+                _, _, job = heapq.heappop(self._heap)
+
+                if job.cancelled:
+                    continue
+
+                self._fire(job)
+
+                try:
+                    self._push(job, now + job.delay_until_next())
+
+                except ValueError as e:
+                    LOGGER.error(
+                        f"Scheduled job {job.name!r} can't be rescheduled.", exc_info=e
+                    )
+                    self.remove_job(job, cancel_running=False)
+
+    def _fire(self, job: Job) -> None:
+        if job.running >= job.max_concurrency and job.skip_if_running:
+            job.skipped += 1
+            LOGGER.debug(f"Skipped scheduled job {job.name!r}, still running.")
+            return
+
+        task = asyncio.get_running_loop().create_task(job.run())
+        job.tasks.add(task)
+        task.add_done_callback(job.tasks.discard)
@@ -0,0 +1,66 @@
+"""
+Custom module for startup timing.
+
+`colorama` is required.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Tuple
+
+import colorama
+from colorama import Fore, Style
+
+LOGGER = logging.getLogger(__name__)
+colorama.init()
+
+
+class StartupReport:
+    """Collects how long each startup step took."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.entries: List[Tuple[str, str, float]] = []
+
+    @contextmanager
+    def timed(self, kind: str, name: str) -> Iterator[None]:
+        """`Method`\n
+        Times a block and records it.
+
+        Args:
+            `kind` (`str`): The kind of step, e.g. `"import"` or `"extension"`.
+
+            `name` (`str`): The name of the step.
+
+        Example:
+        ```python
+        with timed("extension", "events.errors"):
+            await bot.load_extension("events.errors")
+        ```
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.entries.append((kind, name, time.perf_counter() - started))
+
+    def log(self) -> None:
+        """`Method`\n
+        Logs and prints every recorded step, slowest first, and the total time since the report was created.
+        """
+        total = time.perf_counter() - self.started
+
+        for kind, name, elapsed in sorted(self.entries, key=lambda entry: -entry[2]):
+            LOGGER.log(logging.INFO, f"Startup {kind} {name}: {elapsed * 1000:.1f}ms")
+            print(
+                f"{Fore.BLUE}{kind:>10} {Style.RESET_ALL}{name:<30} {elapsed * 1000:>8.1f}ms"
+            )
+
+        LOGGER.log(logging.INFO, f"Startup took {total:.2f}s.")
+        print(f"{Fore.GREEN}Startup took {total:.2f}s{Style.RESET_ALL}")
+
+
+STARTUP_REPORT = StartupReport()
@@ -0,0 +1,480 @@
+"""
+Custom module for atomic changes of the players balances.
+
+`aiosqlite >= 0.18.0` is required.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import aiosqlite
+from contextlib import AsyncExitStack, asynccontextmanager, _AsyncGeneratorContextManager
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, TYPE_CHECKING
+
+from .cache import PLAYER_COLUMNS, PlayerRecord
+from .exceptions import InsufficientFunds, UserNotFoundError
+from .levels import LEVEL_CURVE, LevelCurve, LevelUp, level_ups
+
+if TYPE_CHECKING:
+    from .database import DatabaseManager
+
+BALANCE_COLUMNS: Tuple[str, ...] = ("gold", "experience")
+# Columns whose deltas stop at 0 instead of being rejected, like the damage taken in a fight
+CLAMPED_COLUMNS: Tuple[str, ...] = ("health",)
+# Balances of existing players, and the level following the experience, only change through `TransactionEngine`
+KEPT_COLUMNS: Tuple[str, ...] = (*BALANCE_COLUMNS, "level")
+# So a flushed record never overwrites them
+UPSERT_PLAYER_KEEP_BALANCES = (
+    f"INSERT INTO players ({', '.join(PLAYER_COLUMNS)}) VALUES ({', '.join('?' * len(PLAYER_COLUMNS))}) "
+    "ON CONFLICT (user_id) DO UPDATE SET "
+    + ", ".join(
+        f"{column} = excluded.{column}"
+        for column in PLAYER_COLUMNS[1:]
+        if column not in KEPT_COLUMNS
+    )
+)
+
+
+class TransactionEngine:
+    """Applies batches of balance deltas atomically.
+
+    The affected players are locked through a fixed set of striped locks, always acquired in the
+    same order, so conflicting transactions wait for each other while unrelated ones run concurrently.
+    Every balance is then checked and written in a single SQLite transaction. The deltas are added in SQL, guarded against
+    negative balances, so they always apply to the committed balances even if a cached copy is out of date.
+
+    Balances only change through this engine: `DatabaseManager.update_player` refuses them, and flushes of the players cache keep them.
+    With a remote writer, the deltas are sent to the writer process, which checks them against the committed balances.
+    The level of a player is kept in sync with their experience by `level_curve`.
+
+    Args:
+        `database_manager` (`DatabaseManager`): The manager of the database.
+
+        `stripes` (`int`, optional): The number of locks players are spread over. Defaults to `64`.
+
+        `level_curve` (`LevelCurve`, optional): The experience needed by each level. Defaults to `LEVEL_CURVE`.
+    """
+
+    def __init__(
+        self,
+        database_manager: DatabaseManager,
+        *,
+        stripes: int = 64,
+        level_curve: LevelCurve = LEVEL_CURVE,
+    ) -> None:
+        if stripes < 1:
+            raise ValueError(f"stripes must be at least 1, got {stripes}")
+
+        self.database_manager = database_manager
+        self.level_curve = level_curve
+        self._locks: List[asyncio.Lock] = [asyncio.Lock() for _ in range(stripes)]
+
+        self.commits: int = 0
+        self.rejected: int = 0
+        self.contended: int = 0
+
+    def stripes_of(self, user_ids: Iterable[int]) -> List[int]:
+        """`Method`\n
+        Gets the lock stripes of some players, in acquisition order.
+
+        Args:
+            `user_ids` (`Iterable[int]`): The IDs of the players.
+
+        Returns:
+            `List[int]`: The sorted indexes of the stripes, without duplicates.
+        """
+        return sorted({user_id % len(self._locks) for user_id in user_ids})
+
+    @asynccontextmanager
+    async def locked(
+        self, user_ids: Iterable[int]
+    ) -> _AsyncGeneratorContextManager[None]:
+        """`Coro`\n
+        Holds the locks of some players, for changes that don't go through `apply`.
+
+        Args:
+            `user_ids` (`Iterable[int]`): The IDs of the players.
+        """
+        async with AsyncExitStack() as stack:
+            for stripe in self.stripes_of(user_ids):
+                lock = self._locks[stripe]
+                if lock.locked():
+                    self.contended += 1
+
+                await stack.enter_async_context(lock)
+
+            yield
+
+    async def apply(
+        self,
+        deltas: Mapping[int, Mapping[str, int]],
+        fields: Optional[Mapping[int, Mapping[str, Any]]] = None,
+    ) -> Dict[int, PlayerRecord]:
+        """`Coro`\n
+        Adds deltas to the balances of many players, all or nothing.
+
+        Args:
+            `deltas` (`Mapping[int, Mapping[str, int]]`): The changes of each player, by column of `BALANCE_COLUMNS` or `CLAMPED_COLUMNS`.
+
+            `fields` (`Optional[Mapping[int, Mapping[str, Any]]]`, optional): New values of other columns, like `health`, written in the same transaction. Defaults to `None`.
+
+        Raises:
+            `UserNotFoundError`: Raised if a player doesn't exist.
+
+            `InsufficientFunds`: Raised if a balance would become negative.
+
+            `AttributeError`: Raised if a column of `deltas` isn't a balance or clamped column, or one of `fields` isn't an editable column, is a balance or the level, or also has a delta.
+
+            `aiosqlite.Error`: Raised if the write fails. Nothing is changed.
+
+        Returns:
+            `Dict[int, PlayerRecord]`: The updated players.
+
+        Example:
+        ```python
+        await apply({1: {"gold": -50}, 2: {"gold": 50, "experience": 10}})
+        ```
+        """
+        for changes in deltas.values():
+            for column in changes:
+                if column not in BALANCE_COLUMNS + CLAMPED_COLUMNS:
+                    raise AttributeError(f"'{column}' is not a balance column.")
+
+        fields = fields or {}
+        for user_id, values in fields.items():
+            for column in values:
+                # The level follows the experience, see `level_curve`
+                if (
+                    column in KEPT_COLUMNS
+                    or column not in PlayerRecord.__slots__[1:]
+                    or column in deltas.get(user_id, {})
+                ):
+                    raise AttributeError(f"'{column}' can't be set along balance deltas.")
+
+        if self.database_manager.writer is not None:
+            return await self._apply_remote(deltas, fields)
+
+        user_ids = {*deltas, *fields}
+
+        async with self.locked(user_ids):
+            players = await self.database_manager.players.get_many(user_ids)
+
+            for user_id in user_ids:
+                if user_id not in players:
+                    self.rejected += 1
+                    raise UserNotFoundError(user_id)
+
+            updates: Dict[int, Dict[str, Any]] = {}
+            cache = self.database_manager.player_cache
+
+            # One transaction for the whole batch, the cache and leaderboard are updated after the commit
+            async with self.database_manager.transaction(label="players.apply") as connection:
+                # Changes not flushed yet are written first, so the deltas add to them. New players may only exist in the cache
+                pending = [players[user_id].to_row() for user_id in user_ids if cache.is_dirty(user_id)]
+                if pending:
+                    await connection.executemany(UPSERT_PLAYER_KEEP_BALANCES, pending)
+
+                for user_id in user_ids:
+                    changes = deltas.get(user_id, {})
+                    values = fields.get(user_id, {})
+                    if not changes and not values:
+                        continue
+
+                    row = await self._write_player(connection, user_id, changes, values)
+                    if row is None:
+                        self.rejected += 1
+                        raise await self._rejection(connection, user_id, changes)
+
+                    committed = PlayerRecord.from_row(row)
+                    new_values = {name: getattr(committed, name) for name in (*changes, *values)}
+
+                    if "experience" in changes:
+                        level = self.level_curve.level_for(committed.experience)
+                        if level != committed.level:
+                            await connection.execute(
+                                "UPDATE players SET level = ? WHERE user_id = ?", (level, user_id)
+                            )
+                        new_values["level"] = level
+
+                    updates[user_id] = new_values
+
+            self.commits += 1
+
+            for user_id, new_values in updates.items():
+                cache.apply(user_id, new_values)
+                self.database_manager.leaderboard.update(user_id, new_values)
+
+                for column, value in new_values.items():
+                    setattr(players[user_id], column, value)
+
+            return {user_id: players[user_id] for user_id in user_ids}
+
+    @staticmethod
+    async def _write_player(
+        connection: aiosqlite.Connection,
+        user_id: int,
+        changes: Mapping[str, int],
+        values: Mapping[str, Any],
+    ) -> Optional[Tuple[Any, ...]]:
+        assignments = [
+            f"{column} = {column} + ?"
+            if column in BALANCE_COLUMNS
+            else f"{column} = max({column} + ?, 0)"
+            for column in changes
+        ]
+        assignments += [
+            f"{PLAYER_COLUMNS[PlayerRecord.__slots__.index(name)]} = ?" for name in values
+        ]
+        guarded = [column for column in changes if column in BALANCE_COLUMNS]
+        guards = "".join(f" AND {column} + ? >= 0" for column in guarded)
+
+        cursor = await connection.execute(
+            f"UPDATE players SET {', '.join(assignments)} WHERE user_id = ?{guards} "
+            f"RETURNING {', '.join(PLAYER_COLUMNS)}",
+            (
+                *changes.values(),
+                *values.values(),
+                user_id,
+                *(changes[column] for column in guarded),
+            ),
+        )
+        rows = await cursor.fetchall()
+        await cursor.close()
+
+        return rows[0] if rows else None
+
+    @staticmethod
+    async def _rejection(
+        connection: aiosqlite.Connection, user_id: int, changes: Mapping[str, int]
+    ) -> Exception:
+        cursor = await connection.execute(
+            "SELECT gold, experience FROM players WHERE user_id = ?", (user_id,)
+        )
+        row = await cursor.fetchone()
+        await cursor.close()
+
+        if row is None:
+            return UserNotFoundError(user_id)
+
+        balances = dict(zip(BALANCE_COLUMNS, row))
+        for column, delta in changes.items():
+            if column in balances and balances[column] + delta < 0:
+                return InsufficientFunds(user_id, column, balances[column], delta)
+
+        return UserNotFoundError(user_id)
+
+    async def _apply_remote(
+        self,
+        deltas: Mapping[int, Mapping[str, int]],
+        fields: Mapping[int, Mapping[str, Any]],
+    ) -> Dict[int, PlayerRecord]:
+        try:
+            balances = await self.database_manager.writer.apply(deltas, fields)
+
+        except (InsufficientFunds, UserNotFoundError):
+            self.rejected += 1
+            raise
+
+        self.commits += 1
+
+        # The local copies only mirror the result, the writer holds the truth
+        cache = self.database_manager.player_cache
+        for user_id, fields in balances.items():
+            cache.apply(user_id, fields)
+            self.database_manager.leaderboard.update(user_id, fields)
+
+        players = await self.database_manager.players.get_many(balances)
+        for user_id, values in balances.items():
+            for column, value in values.items():
+                setattr(players[user_id], column, value)
+
+        return players
+
+    async def transfer(
+        self, sender_id: int, receiver_id: int, amount: int, column: str = "gold"
+    ) -> Tuple[PlayerRecord, PlayerRecord]:
+        """`Coro`\n
+        Moves a balance from a player to another.
+
+        Args:
+            `sender_id` (`int`): The ID of the player paying.
+
+            `receiver_id` (`int`): The ID of the player paid.
+
+            `amount` (`int`): The amount, greater than 0.
+
+            `column` (`str`, optional): The balance column. Defaults to `"gold"`.
+
+        Raises:
+            `ValueError`: Raised if the amount isn't positive or both players are the same.
+
+            `InsufficientFunds`: Raised if the sender can't pay.
+
+        Returns:
+            `Tuple[PlayerRecord, PlayerRecord]`: The updated sender and receiver.
+        """
+        if amount <= 0:
+            raise ValueError(f"amount must be greater than 0, got {amount}")
+        if sender_id == receiver_id:
+            raise ValueError("A player can't transfer to themselves.")
+
+        players = await self.apply(
+            {sender_id: {column: -amount}, receiver_id: {column: amount}}
+        )
+        return players[sender_id], players[receiver_id]
+
+    async def payout(
+        self, user_ids: Iterable[int], *, gold: int = 0, experience: int = 0
+    ) -> Dict[int, PlayerRecord]:
+        """`Coro`\n
+        Gives the same reward to many players, in one commit.
+
+        Args:
+            `user_ids` (`Iterable[int]`): The IDs of the players.
+
+            `gold` (`int`, optional): The gold given to each player. Defaults to `0`.
+
+            `experience` (`int`, optional): The experience given to each player. Defaults to `0`.
+
+        Returns:
+            `Dict[int, PlayerRecord]`: The updated players.
+
+        Example:
+        ```python
+        await payout(raid_members, gold=250, experience=1000)
+        ```
+        """
+        return await self.apply(
+            {user_id: {"gold": gold, "experience": experience} for user_id in user_ids}
+        )
+
+    async def grant_experience(
+        self, grants: Iterable[Tuple[int, int]]
+    ) -> List[LevelUp]:
+        """`Coro`\n
+        Gives experience to many players in one commit, and levels them up, even by several levels at once.
+
+        The new experience and levels are computed in one `numpy` pass, and saved with a single `executemany`.
+        With a remote writer, the grants go through `apply`, and the writer levels the players up.
+
+        Args:
+            `grants` (`Iterable[Tuple[int, int]]`): The IDs of the players and their experience. Grants of the same player add up.
+
+        Raises:
+            `UserNotFoundError`: Raised if a player doesn't exist.
+
+            `InsufficientFunds`: Raised if a negative grant would make an experience negative.
+
+            `RuntimeError`: Raised if a stored experience doesn't match the one the grant was computed from. Nothing is changed.
+
+        Returns:
+            `List[LevelUp]`: The players who levelled up, to announce them together.
+
+        Example:
+        ```python
+        level_ups = await grant_experience([(user.id, 150) for user in voice_channel.members])
+        await channel.send(announcement(level_ups))
+        ```
+        """
+        import numpy as np
+
+        totals: Dict[int, int] = {}
+        for user_id, experience in grants:
+            totals[user_id] = totals.get(user_id, 0) + experience
+
+        if not totals:
+            return []
+
+        user_ids = list(totals)
+        granted = np.fromiter(totals.values(), dtype=np.int64, count=len(totals))
+        curve = self.level_curve
+
+        if self.database_manager.writer is not None:
+            players = await self.apply(
+                {user_id: {"experience": experience} for user_id, experience in totals.items()}
+            )
+            new_experience = np.fromiter(
+                (players[user_id].experience for user_id in user_ids), dtype=np.int64, count=len(user_ids)
+            )
+            return level_ups(
+                user_ids,
+                curve.levels_for(new_experience - granted),
+                curve.levels_for(new_experience),
+            )
+
+        async with self.locked(user_ids):
+            players = await self.database_manager.players.get_many(user_ids)
+
+            for user_id in user_ids:
+                if user_id not in players:
+                    self.rejected += 1
+                    raise UserNotFoundError(user_id)
+
+            old_experience = np.fromiter(
+                (players[user_id].experience for user_id in user_ids), dtype=np.int64, count=len(user_ids)
+            )
+            new_experience = old_experience + granted
+
+            negative = np.flatnonzero(new_experience < 0)
+            if len(negative):
+                self.rejected += 1
+                index = int(negative[0])
+                raise InsufficientFunds(
+                    user_ids[index], "experience", int(old_experience[index]), int(granted[index])
+                )
+
+            old_levels = curve.levels_for(old_experience)
+            new_levels = curve.levels_for(new_experience)
+
+            # Every update sets the same two columns, so they share one executemany.
+            # Each one only applies to the experience it was computed from, so an out of date copy can't overwrite a newer one
+            rows = list(
+                zip(
+                    new_experience.tolist(),
+                    new_levels.tolist(),
+                    user_ids,
+                    old_experience.tolist(),
+                )
+            )
+            cache = self.database_manager.player_cache
+            async with self.database_manager.transaction(
+                label="players.grant_experience"
+            ) as connection:
+                pending = [players[user_id].to_row() for user_id in user_ids if cache.is_dirty(user_id)]
+                if pending:
+                    await connection.executemany(UPSERT_PLAYER_KEEP_BALANCES, pending)
+
+                cursor = await connection.executemany(
+                    "UPDATE players SET experience = ?, level = ? WHERE user_id = ? AND experience = ?",
+                    rows,
+                )
+                if cursor.rowcount != len(rows):
+                    self.rejected += 1
+                    raise RuntimeError(
+                        "The experience of a player changed outside the transaction engine."
+                    )
+
+            self.commits += 1
+
+            for experience, level, user_id, _ in rows:
+                fields = {"experience": experience, "level": level}
+                cache.apply(user_id, fields)
+                self.database_manager.leaderboard.update(user_id, fields)
+
+                players[user_id].experience = experience
+                players[user_id].level = level
+
+        return level_ups(user_ids, old_levels, new_levels)
+
+    def stats(self) -> Dict[str, int]:
+        """`Method`\n
+        Gets the engine counters.
+
+        Returns:
+            `Dict[str, int]`: The committed and rejected transactions, and the number of lock acquisitions that had to wait.
+        """
+        return {
+            "commits": self.commits,
+            "rejected": self.rejected,
+            "contended": self.contended,
+        }
@@ -0,0 +1,460 @@
+"""
+Custom module for sending the database writes of several processes to a single writer.
+
+`aiosqlite >= 0.18.0` is required. The channel is a Unix socket, so it only works on Unix systems.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import struct
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, TYPE_CHECKING
+
+from .exceptions import InsufficientFunds, UserNotFoundError
+
+if TYPE_CHECKING:
+    from .database import DatabaseManager
+
+LOGGER = logging.getLogger(__name__)
+
+Statements = List[Tuple[str, List[Sequence[Any]]]]
+
+_HEADER = struct.Struct(">I")
+
+# Errors raised by the writer that are raised again as-is by the clients
+REMOTE_ERRORS = {
+    "InsufficientFunds": InsufficientFunds,
+    "UserNotFoundError": UserNotFoundError,
+}
+
+
+class RemoteWriteError(sqlite3.Error):
+    """Raised when the writer process fails to apply a write, or can't be reached."""
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    """`Coro`\n
+    Reads a length-prefixed JSON message.
+
+    Args:
+        `reader` (`asyncio.StreamReader`): The stream.
+
+    Returns:
+        `Optional[Dict[str, Any]]`: The message, or `NoneType` if the stream ended.
+    """
+    try:
+        header = await reader.readexactly(_HEADER.size)
+        (length,) = _HEADER.unpack(header)
+        return json.loads(await reader.readexactly(length))
+
+    except asyncio.IncompleteReadError:
+        return None
+
+
+def write_frame(writer: asyncio.StreamWriter, message: Dict[str, Any]) -> None:
+    """`Function`\n
+    Writes a length-prefixed JSON message. Drain the writer afterwards.
+
+    Args:
+        `writer` (`asyncio.StreamWriter`): The stream.
+
+        `message` (`Dict[str, Any]`): The message.
+    """
+    payload = json.dumps(message, separators=(",", ":")).encode("utf-8")
+    writer.write(_HEADER.pack(len(payload)) + payload)
+
+
+class WriterServer:
+    """Applies the writes of `WriterClient`s to the database of a `DatabaseManager`.
+
+    Each batch of write operations is one SQLite transaction. Every operation runs in its own savepoint,
+    so a failing operation is rolled back alone while the others are committed together.
+
+    Args:
+        `database_manager` (`DatabaseManager`): The connected manager owning the database.
+
+        `address` (`str`): The path of the Unix socket.
+    """
+
+    def __init__(self, database_manager: DatabaseManager, address: str) -> None:
+        self.database_manager = database_manager
+        self.address = address
+        self._server: Optional[asyncio.AbstractServer] = None
+
+        self.batches: int = 0
+        self.operations: int = 0
+        self.failed_operations: int = 0
+        self.max_batch_size: int = 0
+
+    async def start(self) -> None:
+        """`Coro`\n
+        Starts listening. A leftover socket file is replaced.
+        """
+        if os.path.exists(self.address):
+            os.remove(self.address)
+
+        self._server = await asyncio.start_unix_server(self._handle, self.address)
+        LOGGER.info(f"Database writer listening on {self.address}")
+
+    async def close(self) -> None:
+        """`Coro`\n
+        Stops listening and removes the socket file.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        if os.path.exists(self.address):
+            os.remove(self.address)
+
+    def stats(self) -> Dict[str, int]:
+        """`Method`\n
+        Gets the writer counters.
+
+        Returns:
+            `Dict[str, int]`: The committed batches, applied and failed operations, and the largest batch.
+        """
+        return {
+            "batches": self.batches,
+            "operations": self.operations,
+            "failed_operations": self.failed_operations,
+            "max_batch_size": self.max_batch_size,
+        }
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while (message := await read_frame(reader)) is not None:
+                try:
+                    if message["op"] == "batch":
+                        reply = {"results": await self.run_batch(message["operations"])}
+                    elif message["op"] == "apply":
+                        reply = {
+                            "result": await self.run_apply(
+                                message["deltas"], message.get("fields")
+                            )
+                        }
+                    else:
+                        raise ValueError(f"Unknown operation {message['op']!r}")
+
+                except Exception as e:
+                    reply = {"error": _serialize_error(e)}
+
+                reply["id"] = message["id"]
+                write_frame(writer, reply)
+                await writer.drain()
+
+        except ConnectionError:
+            pass
+
+        finally:
+            writer.close()
+
+    async def run_batch(
+        self, operations: List[Statements]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """`Coro`\n
+        Applies many write operations in one transaction.
+
+        Args:
+            `operations` (`List[Statements]`): The operations, each a list of statements and their rows.
+
+        Returns:
+            `List[Optional[Dict[str, Any]]]`: For each operation, `NoneType` if it was applied or the error that rolled it back.
+        """
+        manager = self.database_manager
+        results: List[Optional[Dict[str, Any]]] = []
+
+        async with manager.write_lock:
+            connection = manager.connection
+            await connection.execute("BEGIN")
+
+            try:
+                for statements in operations:
+                    await connection.execute("SAVEPOINT operation")
+
+                    try:
+                        for sql, rows in statements:
+                            await connection.executemany(sql, rows)
+
+                    except sqlite3.Error as e:
+                        await connection.execute("ROLLBACK TO operation")
+                        results.append(_serialize_error(e))
+                        self.failed_operations += 1
+
+                    else:
+                        results.append(None)
+
+                    await connection.execute("RELEASE operation")
+
+                await connection.commit()
+
+            except BaseException:
+                await connection.rollback()
+                raise
+
+        self.batches += 1
+        self.operations += len(operations)
+        self.max_batch_size = max(self.max_batch_size, len(operations))
+
+        return results
+
+    async def run_apply(
+        self,
+        deltas: Mapping[str, Mapping[str, int]],
+        fields: Optional[Mapping[str, Mapping[str, Any]]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """`Coro`\n
+        Applies balance deltas with the `TransactionEngine` of the writer, so they are checked against the committed balances.
+
+        Args:
+            `deltas` (`Mapping[str, Mapping[str, int]]`): The deltas, by user ID as a string.
+
+            `fields` (`Optional[Mapping[str, Mapping[str, Any]]]`, optional): The other columns set in the same transaction, by user ID as a string. Defaults to `None`.
+
+        Returns:
+            `Dict[str, Dict[str, Any]]`: The new values of the changed columns, by user ID as a string.
+        """
+        fields = fields or {}
+        players = await self.database_manager.transactions.apply(
+            {int(user_id): changes for user_id, changes in deltas.items()},
+            {int(user_id): values for user_id, values in fields.items()},
+        )
+
+        self.operations += 1
+        changed: Dict[str, Dict[str, Any]] = {}
+        for changes in (deltas, fields):
+            for user_id, columns in changes.items():
+                changed.setdefault(user_id, {}).update(
+                    (column, getattr(players[int(user_id)], column)) for column in columns
+                )
+
+                # Levels follow the experience
+                if "experience" in columns:
+                    changed[user_id]["level"] = players[int(user_id)].level
+
+        return changed
+
+
+class WriterClient:
+    """Sends write operations to a `WriterServer`.
+
+    Operations submitted within `batch_delay` of each other are sent together, and committed in one transaction by the writer.
+
+    Args:
+        `address` (`str`): The path of the Unix socket.
+
+        `batch_delay` (`float`, optional): The seconds to wait for more operations before sending a batch. Defaults to `0.005`.
+
+        `max_batch_size` (`int`, optional): The number of operations that sends a batch right away. Defaults to `256`.
+    """
+
+    def __init__(
+        self, address: str, *, batch_delay: float = 0.005, max_batch_size: int = 256
+    ) -> None:
+        self.address = address
+        self.batch_delay = batch_delay
+        self.max_batch_size = max_batch_size
+
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._send_task: Optional[asyncio.Task] = None
+        self._next_id: int = 0
+        self._replies: Dict[int, asyncio.Future] = {}
+        self._batch: List[Tuple[Statements, asyncio.Future]] = []
+        self._batch_ready = asyncio.Event()
+
+        self.batches_sent: int = 0
+        self.operations_sent: int = 0
+
+    async def connect(self) -> None:
+        """`Coro`\n
+        Connects to the writer.
+
+        Raises:
+            `RemoteWriteError`: Raised if the writer can't be reached.
+        """
+        try:
+            self._reader, self._writer = await asyncio.open_unix_connection(
+                self.address
+            )
+
+        except OSError as e:
+            raise RemoteWriteError(f"Can't reach the database writer: {e}") from e
+
+        loop = asyncio.get_running_loop()
+        self._read_task = loop.create_task(self._read_replies())
+        self._send_task = loop.create_task(self._send_batches())
+
+    async def close(self) -> None:
+        """`Coro`\n
+        Sends the pending operations, waits for their replies and disconnects.
+        """
+        if self._batch:
+            await asyncio.gather(
+                *(future for _, future in self._batch), return_exceptions=True
+            )
+
+        for task in (self._send_task, self._read_task):
+            if task is not None:
+                task.cancel()
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        self._fail_pending(RemoteWriteError("The writer connection was closed."))
+
+    async def execute(self, statements: Statements) -> None:
+        """`Coro`\n
+        Applies a write operation. Its statements are committed together, with the other operations of its batch.
+
+        Args:
+            `statements` (`Statements`): The statements and their rows.
+
+        Raises:
+            `RemoteWriteError`: Raised if the operation failed. It was rolled back.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._batch.append(
+            ([(sql, [list(row) for row in rows]) for sql, rows in statements], future)
+        )
+        self._batch_ready.set()
+
+        await future
+
+    async def apply(
+        self,
+        deltas: Mapping[int, Mapping[str, int]],
+        fields: Optional[Mapping[int, Mapping[str, Any]]] = None,
+    ) -> Dict[int, Dict[str, Any]]:
+        """`Coro`\n
+        Applies balance deltas on the writer. See `TransactionEngine.apply`.
+
+        Args:
+            `deltas` (`Mapping[int, Mapping[str, int]]`): The changes of each player.
+
+            `fields` (`Optional[Mapping[int, Mapping[str, Any]]]`, optional): The other columns set in the same transaction. Defaults to `None`.
+
+        Raises:
+            `InsufficientFunds`: Raised if a balance would become negative.
+
+            `UserNotFoundError`: Raised if a player doesn't exist.
+
+            `RemoteWriteError`: Raised if the write failed.
+
+        Returns:
+            `Dict[int, Dict[str, Any]]`: The new values of the changed columns.
+        """
+        reply = await self._request(
+            {
+                "op": "apply",
+                "deltas": {str(user_id): dict(changes) for user_id, changes in deltas.items()},
+                "fields": {
+                    str(user_id): dict(values) for user_id, values in (fields or {}).items()
+                },
+            }
+        )
+        return {int(user_id): balances for user_id, balances in reply["result"].items()}
+
+    async def _request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        if self._writer is None:
+            raise RemoteWriteError("Not connected to the database writer.")
+
+        self._next_id += 1
+        message["id"] = self._next_id
+
+        future = asyncio.get_running_loop().create_future()
+        self._replies[message["id"]] = future
+
+        try:
+            write_frame(self._writer, message)
+            await self._writer.drain()
+
+        except ConnectionError as e:
+            self._replies.pop(message["id"], None)
+            raise RemoteWriteError(f"Lost the database writer: {e}") from e
+
+        reply = await future
+        if "error" in reply:
+            raise _deserialize_error(reply["error"])
+
+        return reply
+
+    async def _send_batches(self) -> None:
+        while True:
+            await self._batch_ready.wait()
+
+            if len(self._batch) < self.max_batch_size:
+                await asyncio.sleep(self.batch_delay)
+
+            batch = self._batch[: self.max_batch_size]
+            del self._batch[: self.max_batch_size]
+
+            if not self._batch:
+                self._batch_ready.clear()
+
+            loop = asyncio.get_running_loop()
+            loop.create_task(self._send_batch(batch))
+
+    async def _send_batch(self, batch: List[Tuple[Statements, asyncio.Future]]) -> None:
+        try:
+            reply = await self._request(
+                {"op": "batch", "operations": [statements for statements, _ in batch]}
+            )
+
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches_sent += 1
+        self.operations_sent += len(batch)
+
+        for (_, future), error in zip(batch, reply["results"]):
+            if future.done():
+                continue
+
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(_deserialize_error(error))
+
+    async def _read_replies(self) -> None:
+        while (reply := await read_frame(self._reader)) is not None:
+            future = self._replies.pop(reply["id"], None)
+            if future is not None and not future.done():
+                future.set_result(reply)
+
+        self._fail_pending(RemoteWriteError("The database writer disconnected."))
+
+    def _fail_pending(self, error: Exception) -> None:
+        for future in self._replies.values():
+            if not future.done():
+                future.set_exception(error)
+
+        self._replies.clear()
+
+
+def _serialize_error(error: Exception) -> Dict[str, Any]:
+    name = type(error).__name__
+    if name in REMOTE_ERRORS:
+        return {"type": name, "args": list(vars(error).values())}
+
+    return {"type": name, "message": str(error)}
+
+
+def _deserialize_error(error: Dict[str, Any]) -> Exception:
+    error_type = REMOTE_ERRORS.get(error["type"])
+    if error_type is not None:
+        return error_type(*error["args"])
+
+    return RemoteWriteError(f"{error['type']}: {error['message']}")
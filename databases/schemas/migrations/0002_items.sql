@@ -0,0 +1,29 @@
+   CREATE TABLE IF NOT EXISTS items (
+          item_id INTEGER PRIMARY KEY,
+          name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+          description TEXT NOT NULL DEFAULT '',
+          price INTEGER NOT NULL DEFAULT 0
+          );
+
+
+   /* One row per item held, clustered by inventory so a whole inventory is a single range read */
+   CREATE TABLE IF NOT EXISTS inventory_items (
+          inventory_id INTEGER NOT NULL,
+          item_id INTEGER NOT NULL,
+          quantity INTEGER NOT NULL CHECK (quantity >= 0),
+          PRIMARY KEY (inventory_id, item_id),
+          CONSTRAINT fk_inventory_items_inventory_id FOREIGN KEY (inventory_id) REFERENCES inventories (inventory_id) ON DELETE CASCADE,
+          CONSTRAINT fk_inventory_items_item_id FOREIGN KEY (item_id) REFERENCES items (item_id)
+          ) WITHOUT ROWID;
+
+
+   INSERT OR IGNORE INTO items (item_id, name, description, price)
+   VALUES
+          (1, 'Wooden Sword', 'A training sword. Better than bare hands.', 10),
+          (2, 'Iron Sword', 'A sturdy blade forged by the village smith.', 120),
+          (3, 'Leather Armor', 'Light armor made of tanned hides.', 80),
+          (4, 'Iron Shield', 'Blocks blows that would otherwise hurt.', 150),
+          (5, 'Health Potion', 'Restores some health.', 25),
+          (6, 'Mana Potion', 'Restores some mana.', 25),
+          (7, 'Bread', 'Simple food for long journeys.', 2),
+          (8, 'Torch', 'Lights up dark dungeons.', 5);
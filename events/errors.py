@@ -1,26 +1,57 @@
 from __future__ import annotations
 
 import logging
-import traceback
-from io import BytesIO, StringIO
-from typing import Any
-import datetime
+import math
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Optional
+import discord
 from discord import Embed, File, Interaction
-from discord.app_commands.errors import AppCommandError, CommandNotFound
+from discord.app_commands.errors import AppCommandError, CheckFailure, CommandNotFound
 from discord.ext import commands
 
 from custom.client import MyClient
-from custom.exceptions import InvalidItem
+from custom.exceptions import (
+    InsufficientFunds,
+    InsufficientItems,
+    InvalidItem,
+    RateLimited,
+    UserNotFoundError,
+)
+from custom.reporting import ErrorAggregator, ErrorReport
 
 LOGGER = logging.getLogger(__name__)
 
 
+# Throttled users get the same few embeds over and over, so they are built once
+@lru_cache(maxsize=64)
+def rate_limited_embed(seconds: int) -> Embed:
+    return Embed(
+        title=f"You're going too fast, try again in {seconds}s.", color=0xFF0000
+    )
+
+
 class Errors(commands.Cog):
-    def __init__(self, bot: MyClient):
+    def __init__(self, bot: MyClient, *, report_window: float = 60.0):
         self.bot = bot
         self.hidden = True
+        self.report_window = report_window
+        self.aggregator = ErrorAggregator()
+        self._owner: Optional[discord.User] = None
         bot.tree.error(self.app_command_error)
 
+    async def cog_load(self):
+        self.bot.scheduler.add_job(
+            self.send_reports,
+            name="errors.send_reports",
+            interval=self.report_window,
+            owner=self,
+        )
+
+    async def cog_unload(self):
+        self.bot.scheduler.remove_owner(self)
+        await self.send_reports()
+
     def send(self, interaction: Interaction):
         if interaction.response.is_done():
             return interaction.followup.send
@@ -30,35 +61,38 @@ class Errors(commands.Cog):
     async def app_command_error(
         self, interaction: Interaction, error: AppCommandError
     ):  # TODO Do more tests for discord.py exceptions.
+        if isinstance(error, RateLimited):
+            # Answered before anything else, without touching the database
+            return await interaction.response.send_message(
+                embed=rate_limited_embed(math.ceil(error.retry_after)), ephemeral=True
+            )
+
+        self.bot.record_command(interaction, failed=True)
         embed: Embed | None = None
-        rightNow = datetime.datetime.now()
-        rightNow = rightNow.strftime("Date: **%d/%m/%Y**\nTime: **%H:%M:%S**")
 
-        if isinstance(error, InvalidItem):
+        if isinstance(
+            error, (InvalidItem, InsufficientFunds, InsufficientItems, UserNotFoundError)
+        ):
             embed = Embed(title=str(error), color=0xFF0000)
 
+        elif isinstance(error, CheckFailure):
+            embed = Embed(title="You can't use this command.", color=0xFF0000)
+
         if embed is not None:
             return await self.send(interaction)(embed=embed)
 
         elif not isinstance(error, CommandNotFound):
-            buffer = StringIO()
-            embed = Embed(
-                title="Unhandled exception",
-                color=0xFF0000,
-                description=f"Command: **/{interaction.command.name}**\nUsed by: **[{interaction.user}](https://discord.com/users/{interaction.user.id})**\n{rightNow}",
-            )
-
-            traceback.print_exception(
-                type(error), error, error.__traceback__, file=buffer
+            command_name = (
+                interaction.command.name if interaction.command else "unknown"
             )
 
-            buffer.seek(0)
-            buffer = BytesIO(buffer.getvalue().encode("utf-8"))
-
-            owner_appdetails = await interaction.client.application_info()
-            await owner_appdetails.owner.send(
-                embed=embed, file=File(buffer, "traceback.txt")
-            )
+            if self.aggregator.add(error, command_name):
+                LOGGER.error(
+                    "Unhandled exception:",
+                    exc_info=(type(error), error, error.__traceback__),
+                )
+            else:
+                LOGGER.error(f"Unhandled exception in /{command_name}: {error!r}")
 
             embed = Embed(
                 title="It seems like I've ran into a problem. I've already reported the issue to the developer.",
@@ -67,10 +101,57 @@ class Errors(commands.Cog):
 
             await self.send(interaction)(embed=embed)
 
-            LOGGER.error(
-                "Unhandled exception:",
-                exc_info=(type(error), error, error.__traceback__),
-            )
+    async def get_owner(self) -> discord.User:
+        """Gets the owner of the application, requested only once."""
+        if self._owner is None:
+            owner_appdetails = await self.bot.application_info()
+            self._owner = owner_appdetails.owner
+
+        return self._owner
+
+    async def send_reports(self) -> None:
+        """Sends one DM to the owner for each error fingerprint seen since the last call."""
+        overflow = self.aggregator.overflow
+        reports = self.aggregator.drain()
+
+        if not reports:
+            return
+
+        try:
+            owner = await self.get_owner()
+
+            for report in reports:
+                await owner.send(**self.report_message(report))
+
+            if overflow:
+                await owner.send(
+                    embed=Embed(
+                        title=f"{overflow} more errors with other fingerprints were not reported.",
+                        color=0xFF0000,
+                    )
+                )
+
+        except discord.HTTPException as e:
+            LOGGER.error("Could not send the error reports.", exc_info=e)
+
+    def report_message(self, report: ErrorReport) -> dict[str, Any]:
+        commands_used = ", ".join(
+            f"**/{name}** ({count})" for name, count in report.commands.most_common()
+        )
+        first_seen = report.first_seen.strftime("Date: **%d/%m/%Y**\nTime: **%H:%M:%S**")
+        last_seen = report.last_seen.strftime("%H:%M:%S")
+
+        embed = Embed(
+            title="Unhandled exception",
+            color=0xFF0000,
+            description=f"`{report.title}`\nOccurrences: **{report.count}** (last at **{last_seen}**)\nCommands: {commands_used}\n{first_seen}",
+        )
+        embed.set_footer(text=f"Fingerprint: {report.fingerprint}")
+
+        return {
+            "embed": embed,
+            "file": File(BytesIO(report.sample.encode("utf-8")), "traceback.txt"),
+        }
 
 
 async def setup(bot: MyClient):
@@ -6,6 +6,7 @@ import colorama
 from colorama import Fore, Back, Style
 import logging
 import asyncio
+import itertools
 import json
 import os
 
@@ -18,6 +19,7 @@ LOGGER = logging.getLogger(__name__)
 class Events(commands.Cog):
     def __init__(self, bot: MyClient):
         self.bot = bot
+        self.statuses = itertools.cycle(["slash commands!", "your mom :)"])
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -28,25 +30,26 @@ class Events(commands.Cog):
         )
 
     async def cog_load(self):
-        self.task_change_status = self.bot.loop.create_task(self.loop_change_status())
+        self.bot.scheduler.add_job(
+            self.change_status,
+            name="events.change_status",
+            interval=10,
+            run_immediately=True,
+            owner=self,
+        )
 
     async def cog_unload(self):
-        self.task_change_status.cancel()
+        self.bot.scheduler.remove_owner(self)
 
-    async def loop_change_status(self) -> None:
+    async def change_status(self) -> None:
         await self.bot.wait_until_ready()
 
-        statuses: list[str] = ["slash commands!", "your mom :)"]
-
-        while not self.bot.is_closed():
-            for status in statuses:
-                await self.bot.change_presence(
-                    activity=discord.Activity(
-                        type=discord.ActivityType.watching, name=status
-                    ),
-                    status=discord.Status.idle,
-                )
-                await asyncio.sleep(10)
+        await self.bot.change_presence(
+            activity=discord.Activity(
+                type=discord.ActivityType.watching, name=next(self.statuses)
+            ),
+            status=discord.Status.idle,
+        )
 
 
 async def setup(bot: MyClient):
@@ -1,15 +1,23 @@
 from __future__ import annotations
-from typing import Any
+import io
+from typing import Any, Optional
 
 import discord
 from discord.ext import commands
 from discord import Interaction, app_commands
 from discord.app_commands import Choice
-from colorthief import ColorThief
 
+from custom.autocomplete import ItemTransformer
 from custom.client import MyClient
 from custom.paginator import EmbedPaginator
-from custom.exceptions import InvalidItem
+from custom.exceptions import InvalidItem, UserNotFoundError
+from custom.items import Item
+from custom.leaderboard import LeaderboardPageSource
+from custom.metrics import LatencyHistogram
+
+
+async def is_owner(interaction: Interaction) -> bool:
+    return await interaction.client.is_owner(interaction.user)
 
 
 class Slash(commands.Cog):
@@ -23,6 +31,130 @@ class Slash(commands.Cog):
             f"\U0001f4e1 My latency is **{round(self.bot.latency * 1000)}ms**"
         )
 
+    @app_commands.command()
+    @app_commands.describe(user="Whose avatar to show. Defaults to yours.")
+    async def avatar(
+        self, interaction: Interaction, user: Optional[discord.User] = None
+    ):
+        """Show the avatar of a user."""
+        user = user or interaction.user
+        await interaction.response.defer()  # The avatar may have to be downloaded first
+
+        embed = discord.Embed(
+            title=f"{user.display_name}'s avatar",
+            color=await self.bot.colors.avatar_color(user),
+        )
+        embed.set_image(url=user.display_avatar.url)
+
+        await interaction.followup.send(embed=embed)
+
+    @app_commands.command()
+    @app_commands.describe(user="Whose profile to show. Defaults to yours.")
+    async def profile(
+        self, interaction: Interaction, user: Optional[discord.User] = None
+    ):
+        """Show the profile card of a player."""
+        user = user or interaction.user
+
+        player = await self.bot.database_manager.get_player(user.id)
+        if player is None:
+            raise UserNotFoundError(user.id)
+
+        # Cached cards are served as is, and a render takes milliseconds, so no deferral is needed
+        png = await self.bot.cards.render(player, user.display_name)
+        await interaction.response.send_message(
+            file=discord.File(io.BytesIO(png), filename="profile.png")
+        )
+
+    @app_commands.command()
+    @app_commands.describe(ranking="What the players are ranked by.")
+    @app_commands.choices(
+        ranking=[
+            Choice(name="Level", value="level"),
+            Choice(name="Experience", value="experience"),
+            Choice(name="Gold", value="gold"),
+        ]
+    )
+    async def leaderboard(self, interaction: Interaction, ranking: Choice[str]):
+        """Show the best players, starting from your page."""
+        leaderboard = self.bot.database_manager.leaderboard
+        user_rank = leaderboard.rank(ranking.value, interaction.user.id)
+
+        def format_page(entries: list[tuple[int, int, int]], index: int) -> discord.Embed:
+            embed = discord.Embed(
+                title=f"Leaderboard - {ranking.name}",
+                description="\n".join(
+                    f"**#{rank}** <@{user_id}> - {score}"
+                    for rank, user_id, score in entries
+                )
+                or "No players yet.",
+                color=0x00FF00,
+            )
+            if user_rank is not None:
+                embed.set_footer(text=f"Your rank: #{user_rank}")
+
+            return embed
+
+        source = LeaderboardPageSource(leaderboard, ranking.value, format_page)
+
+        await EmbedPaginator(
+            interaction=interaction,
+            source=source,
+            current_page=source.page_of(interaction.user.id),
+        ).send()
+
+    @app_commands.command()
+    @app_commands.describe(item="The item to show.")
+    async def item(
+        self,
+        interaction: Interaction,
+        item: app_commands.Transform[Item, ItemTransformer],
+    ):
+        """Show the details of an item, and how many you have."""
+        quantity = (
+            await self.bot.database_manager.inventories.get_items(interaction.user.id)
+        ).get(item.item_id, 0)
+
+        embed = discord.Embed(
+            title=item.name, description=item.description or None, color=0x00FF00
+        )
+        embed.add_field(name="Price", value=f"{item.price} gold")
+        embed.add_field(name="Owned", value=str(quantity))
+
+        await interaction.response.send_message(embed=embed)
+
+    @app_commands.command()
+    @app_commands.check(is_owner)
+    async def stats(self, interaction: Interaction):
+        """Show the commands and database latency percentiles. Owner only."""
+        metrics = self.bot.metrics
+        embed = discord.Embed(title="Latency (p50 / p95 / p99)", color=0x00FF00)
+
+        for title, histograms, errors in (
+            ("Commands", metrics.commands, metrics.command_errors),
+            ("Queries", metrics.queries, metrics.query_errors),
+            ("Lock waits", metrics.lock_waits, {}),
+        ):
+            embed.add_field(
+                name=title,
+                value=self.format_histograms(histograms, errors),
+                inline=False,
+            )
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    def format_histograms(
+        self, histograms: dict[str, LatencyHistogram], errors: dict[str, int]
+    ) -> str:
+        lines = [
+            f"`{name}` x{count}: **{p50 * 1000:.1f}** / {p95 * 1000:.1f} / {p99 * 1000:.1f}ms"
+            + (f" ({errors[name]} errors)" if errors.get(name) else "")
+            for name, count, p50, p95, p99 in self.bot.metrics.summary(histograms)[:10]
+        ]
+
+        # Embed field values are limited to 1024 characters
+        return "\n".join(lines)[:1024] or "No data yet."
+
 
 async def setup(bot: MyClient):
     await bot.add_cog(Slash(bot))
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import asyncio
+from typing import Any, Optional, Type
 import discord
 import logging
 import datetime
@@ -12,51 +13,132 @@ from discord.utils import setup_logging
 import colorama
 from colorama import Fore, Back, Style
 
-from custom.client import MyClient
-from custom.database import DatabaseManager
+from custom.startup import STARTUP_REPORT
+
+# Timed one by one, the time of a module includes the custom modules it is the first to import
+with STARTUP_REPORT.timed("import", "custom.database"):
+    from custom.database import DatabaseManager
+with STARTUP_REPORT.timed("import", "custom.logs"):
+    from custom.logs import LoggingPipeline
+with STARTUP_REPORT.timed("import", "custom.cards"):
+    from custom.cards import CardRenderer
+with STARTUP_REPORT.timed("import", "custom.colors"):
+    from custom.colors import ColorService
+with STARTUP_REPORT.timed("import", "custom.client"):
+    from custom.client import MyClient
+with STARTUP_REPORT.timed("import", "custom.cluster"):
+    from custom.cluster import ClusterLauncher, ClusterWorker, MyShardedClient
 
 load_dotenv()
 colorama.init()
 
-print(Fore.MAGENTA + figlet_format("RPG") + Style.RESET_ALL)
-
-rightNow = datetime.datetime.now()
-rightNow = rightNow.strftime(r"%d-%m-%Y_%H-%M-%S")
-file_handler: logging.Handler = logging.FileHandler(
-    filename=f"./logs/log_{rightNow}.log", encoding="utf-8", mode="w"
-)
-
-setup_logging(
-    handler=file_handler,
-    level=logging.INFO,
-)
-
-mg = DatabaseManager(
-    "./databases/test.db",
-    database_schema_path="./databases/schemas/schema.sql",
-    database_backups_path="./databases/backups/",
-)
-
-mg.logging_setup(  # FIXME I don't know why this creates duplicate log messages
-    handler=file_handler,
-)
-
-client = MyClient(
-    command_prefix=commands.when_mentioned_or(
-        "my_message_content_perm_must_be_disabled"
-    ),
-    intents=discord.Intents.default(),
-    database_manager=mg,
-    extensions_folders=["events", "extensions"],
-    is_testing=True,
-    test_guild=discord.Object(environ["TEST_GUILD"]),
-)
+
+# Worker processes (like the colours extraction pool) import this module again,
+# so nothing below runs outside of the __main__ guard.
+def setup_log_pipeline(suffix: str = "") -> LoggingPipeline:
+    rightNow = datetime.datetime.now()
+    rightNow = rightNow.strftime(r"%d-%m-%Y_%H-%M-%S")
+    file_handler: logging.Handler = logging.FileHandler(
+        filename=f"./logs/log_{rightNow}{suffix}.log", encoding="utf-8", mode="w"
+    )
+    file_handler.setFormatter(
+        logging.Formatter(
+            "[{asctime}] [{levelname:<8}] {name}: {message}",
+            datefmt=r"%Y-%m-%d %H:%M:%S",
+            style="{",
+        )
+    )
+
+    # The file is written on a background thread, the event loop only enqueues records
+    log_pipeline = LoggingPipeline(file_handler, max_queue_size=10000)
+    log_pipeline.start()
+
+    setup_logging(
+        handler=log_pipeline.queue_handler,
+        level=logging.INFO,
+    )
+
+    return log_pipeline
+
+
+def create_database_manager(writer_address: Optional[str] = None) -> DatabaseManager:
+    return DatabaseManager(
+        "./databases/test.db",
+        database_migrations_path="./databases/schemas/migrations/",
+        database_backups_path="./databases/backups/",
+        writer_address=writer_address,
+    )
+
+
+def create_client(
+    log_pipeline: LoggingPipeline,
+    mg: Optional[DatabaseManager] = None,
+    client_cls: Type[MyClient] = MyClient,
+    **options: Any,
+) -> MyClient:
+    mg = mg or create_database_manager()
+    mg.logging_setup(handler=log_pipeline.queue_handler)
+
+    return client_cls(
+        command_prefix=commands.when_mentioned_or(
+            "my_message_content_perm_must_be_disabled"
+        ),
+        intents=discord.Intents.default(),
+        database_manager=mg,
+        extensions_folders=["events", "extensions"],
+        is_testing=True,
+        test_guild=discord.Object(environ["TEST_GUILD"]),
+        log_pipeline=log_pipeline,
+        metrics_export_path="./logs/metrics.prom",
+        color_service=ColorService(cache_path="./databases/colors.json"),
+        card_renderer=CardRenderer(cache_path="./databases/cards"),
+        **options,
+    )
+
+
+# Called in each worker process of the cluster
+def create_cluster_client(worker: ClusterWorker, mg: DatabaseManager) -> MyClient:
+    return create_client(
+        setup_log_pipeline(f"_worker{worker.worker_id}"),
+        mg,
+        MyShardedClient,
+        metrics_export_path=f"./logs/metrics_worker{worker.worker_id}.prom",
+        **worker.client_options(),
+    )
 
 
 async def main() -> None:
-    async with client, client.database_manager:
-        await client.start(environ["TOKEN"])
+    print(Fore.MAGENTA + figlet_format("RPG") + Style.RESET_ALL)
+
+    log_pipeline = setup_log_pipeline()
+
+    try:
+        client = create_client(log_pipeline)
+
+        async with client, client.database_manager:
+            await client.start(environ["TOKEN"])
+
+    finally:
+        log_pipeline.stop()
+
+
+def main_cluster() -> None:
+    print(Fore.MAGENTA + figlet_format("RPG") + Style.RESET_ALL)
+
+    processes = int(environ["CLUSTER_PROCESSES"])
+    launcher = ClusterLauncher(
+        create_database_manager,
+        create_cluster_client,
+        processes=processes,
+        shard_count=int(environ.get("SHARD_COUNT", processes)),
+        token=environ["TOKEN"],
+        writer_address="./databases/writer.sock",
+    )
+    launcher.run()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    if environ.get("CLUSTER_PROCESSES"):
+        main_cluster()
+    else:
+        asyncio.run(main())
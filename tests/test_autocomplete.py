@@ -0,0 +1,86 @@
+import random
+
+from custom.autocomplete import AutocompleteIndex
+
+NAMES = {
+    1: "Health Potion",
+    2: "Mana Potion",
+    3: "Iron Sword",
+    4: "Steel Sword",
+    5: "Healing Herb",
+    6: "Potion of Haste",
+}
+
+
+def build(names: dict) -> AutocompleteIndex:
+    index = AutocompleteIndex()
+    index.build(names.items())
+    return index
+
+
+def test_prefix_typo_and_removal():
+    index = build(NAMES)
+
+    # The exact name, then names starting with the query, then names with a word starting with it
+    assert index.search("potion") == [(6, "Potion of Haste"), (2, "Mana Potion"), (1, "Health Potion")]
+    assert index.search("Health potion")[0] == (1, "Health Potion")
+    assert [key for key, _ in index.search("hea")] == [5, 1]
+    assert [key for key, _ in index.search("sw")] == [3, 4]
+
+    # Typos only match through the trigrams
+    assert index.search("potoin")[0][0] in (1, 2, 6)
+    assert index.search("helth potoin")[0] == (1, "Health Potion")
+    assert index.search("xyzzy") == []
+
+    assert [key for key, _ in index.search("")] == [5, 1, 3, 2, 6, 4]
+    assert index.search("", limit=2) == [(5, "Healing Herb"), (1, "Health Potion")]
+
+    index.remove(1)
+    index.remove(1)
+    assert 1 not in index
+    assert [key for key, _ in index.search("hea")] == [5]
+    assert all(key != 1 for key, _ in index.search("helth potoin"))
+    assert [key for key, _ in index.search("")] == [5, 3, 2, 6, 4]
+
+    index.add(3, "Elixir")
+    assert [key for key, _ in index.search("sw")] == [4]
+    assert index.search("eli") == [(3, "Elixir")]
+    assert len(index) == 5
+
+
+def test_updates_match_a_rebuilt_index():
+    rng = random.Random(3)
+    words = ["health", "mana", "potion", "iron", "steel", "sword", "herb", "of", "the", "haste", "elixir"]
+    index = AutocompleteIndex()
+    names = {}
+
+    for step in range(1500):
+        key = rng.randint(1, 60)
+
+        if rng.random() < 0.3:
+            index.remove(key)
+            names.pop(key, None)
+        else:
+            # Adding an indexed key renames it
+            name = " ".join(rng.choice(words) for _ in range(rng.randint(1, 3))).title()
+            index.add(key, name)
+            names[key] = name
+
+        if step % 100 == 0:
+            rebuilt = build(names)
+
+            assert index._suffixes == rebuilt._suffixes
+            assert index._trigrams == rebuilt._trigrams
+            assert index._normalized == rebuilt._normalized
+            assert index._gram_counts == rebuilt._gram_counts
+
+            # Equal names tie, in no particular order
+            for query in ("po", "sword", "helth", "elixr the"):
+                assert sorted(index.search(query, limit=100)) == sorted(rebuilt.search(query, limit=100))
+
+    for key in list(names):
+        index.remove(key)
+
+    assert len(index) == 0
+    assert index._suffixes == []
+    assert index._trigrams == {}
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from custom.database import DatabaseManager
+
+MIGRATIONS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "databases", "schemas", "migrations"
+)
+
+
+def test_backup_pauses_between_steps(tmp_path):
+    async def timed_backup(manager: DatabaseManager, pages_per_step: int) -> tuple:
+        steps = []
+        started = time.perf_counter()
+
+        await manager.backup(
+            pages_per_step=pages_per_step,
+            step_sleep=0.01,
+            progress=lambda copied, total: steps.append(copied),
+        )
+        await asyncio.sleep(0)  # Lets the last progress callback run
+
+        return time.perf_counter() - started, len(steps)
+
+    async def scenario():
+        manager = DatabaseManager(
+            str(tmp_path / "players.db"),
+            database_migrations_path=MIGRATIONS_PATH,
+            database_backups_path=str(tmp_path / "backups"),
+            player_flush_interval=None,
+        )
+        os.makedirs(tmp_path / "backups")
+
+        async with manager:
+            async with manager.transaction() as connection:
+                await connection.executemany(
+                    "INSERT INTO players (user_id, class) VALUES (?, ?)",
+                    [(user_id, "Warrior" * 100) for user_id in range(100, 2100)],
+                )
+
+            few_seconds, few_steps = await timed_backup(manager, 10_000)
+            many_seconds, many_steps = await timed_backup(manager, 4)
+
+        assert few_steps == 1
+        assert many_steps > 50
+        assert many_seconds >= (many_steps - 1) * 0.01
+        assert many_seconds > few_seconds + 0.25
+
+    asyncio.run(scenario())
+
+
+def test_backups_of_the_same_second_are_kept(tmp_path):
+    async def scenario():
+        manager = DatabaseManager(
+            str(tmp_path / "players.db"),
+            database_migrations_path=MIGRATIONS_PATH,
+            database_backups_path=str(tmp_path / "backups"),
+            player_flush_interval=None,
+        )
+        os.makedirs(tmp_path / "backups")
+
+        async with manager:
+            paths = [await manager.backup(step_sleep=0) for _ in range(3)]
+            catalog = await manager.get_backup_catalog()
+
+        assert len(set(paths)) == 3
+        assert len(catalog) == 3
+        assert all(os.path.isfile(catalog.path_of(entry)) for entry in catalog.entries)
+
+        with pytest.raises(ValueError):
+            catalog.add(catalog.entries[0])
+
+    asyncio.run(scenario())
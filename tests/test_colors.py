@@ -0,0 +1,41 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from custom.colors import DEFAULT_COLOR, ColorService
+
+
+class BrokenExecutor(ThreadPoolExecutor):
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("A process of the pool died.")
+
+
+def test_followers_retry_when_the_extraction_is_cancelled():
+    async def scenario():
+        service = ColorService(executor=BrokenExecutor(1))
+        started = asyncio.Event()
+
+        async def slow_fetch() -> bytes:
+            started.set()
+            await asyncio.sleep(10)
+            return b""
+
+        async def fetch() -> bytes:
+            return b""
+
+        leader = asyncio.create_task(service.get_color("avatar", slow_fetch))
+        await started.wait()
+        follower = asyncio.create_task(service.get_color("avatar", fetch))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+        # The follower extracts the colour itself, and a broken pool falls back to the default colour
+        assert await follower == DEFAULT_COLOR
+        assert service.stats()["pending"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import threading
+
+from custom import combat
+from custom.combat import Boss
+from custom.database import DatabaseManager
+
+# The initial migration already adds players 1 and 2
+PLAYER_IDS = [101, 102, 103]
+
+MIGRATIONS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "databases", "schemas", "migrations"
+)
+
+
+async def stored_health(manager: DatabaseManager) -> dict:
+    async with manager.create_cursor() as cursor:
+        await cursor.execute(
+            "SELECT user_id, health FROM players WHERE user_id >= ?", (PLAYER_IDS[0],)
+        )
+        return dict(await cursor.fetchall())
+
+
+def test_raid_keeps_health_changed_during_the_fight(tmp_path, monkeypatch):
+    started = threading.Event()
+    proceed = threading.Event()
+
+    def paused_resolve(*args, **kwargs):
+        started.set()
+        proceed.wait(5)
+        return resolve(*args, **kwargs)
+
+    resolve = combat.resolve
+    monkeypatch.setattr(combat, "resolve", paused_resolve)
+
+    async def scenario():
+        manager = DatabaseManager(
+            str(tmp_path / "combat.db"),
+            database_migrations_path=MIGRATIONS_PATH,
+            player_flush_interval=None,
+        )
+
+        async with manager:
+            async with manager.transaction() as connection:
+                await connection.executemany(
+                    "INSERT INTO players (user_id, health, class) VALUES (?, 100, 'Warrior')",
+                    [(user_id,) for user_id in PLAYER_IDS],
+                )
+
+            raid = asyncio.create_task(
+                manager.combat.raid(PLAYER_IDS, [Boss("Troll", 300, 30, hits=2)], seed=7, gold=10)
+            )
+
+            # A potion drunk while the fight is being resolved
+            await asyncio.to_thread(started.wait, 5)
+            await manager.update_player(PLAYER_IDS[0], health=150)
+            proceed.set()
+
+            result = await raid
+            damage = result.damage_taken()
+            expected = {
+                user_id: max((150 if user_id == PLAYER_IDS[0] else 100) - damage[user_id], 0)
+                for user_id in PLAYER_IDS
+            }
+
+            assert any(damage.values())
+            assert await stored_health(manager) == expected
+            for user_id in PLAYER_IDS:
+                assert (await manager.get_player(user_id)).health == expected[user_id]
+
+    asyncio.run(scenario())
@@ -0,0 +1,76 @@
+import asyncio
+import os
+
+import pytest
+
+from custom.database import DatabaseManager
+from custom.exceptions import InsufficientItems
+
+# The initial migration already adds the inventories of players 1 and 2
+INVENTORY_ID = 1
+SWORD_ID = 1
+ARMOR_ID = 3
+
+MIGRATIONS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "databases", "schemas", "migrations"
+)
+
+
+async def stored_items(manager: DatabaseManager) -> dict:
+    async with manager.create_cursor() as cursor:
+        await cursor.execute(
+            "SELECT item_id, quantity FROM inventory_items WHERE inventory_id = ?",
+            (INVENTORY_ID,),
+        )
+        return dict(await cursor.fetchall())
+
+
+def test_has_items_checks_every_quantity(tmp_path):
+    async def scenario():
+        manager = DatabaseManager(
+            str(tmp_path / "items.db"),
+            database_migrations_path=MIGRATIONS_PATH,
+            player_flush_interval=None,
+        )
+
+        async with manager:
+            inventories = manager.inventories
+            await inventories.add_items([(INVENTORY_ID, SWORD_ID, 2), (INVENTORY_ID, ARMOR_ID, 1)])
+
+            assert await inventories.has_items(INVENTORY_ID, {SWORD_ID: 2, ARMOR_ID: 1})
+            assert not await inventories.has_items(INVENTORY_ID, {SWORD_ID: 3})
+            assert not await inventories.has_items(INVENTORY_ID + 1, {SWORD_ID: 1})
+
+    asyncio.run(scenario())
+
+
+def test_removal_of_items_taken_in_the_meantime_is_rolled_back(tmp_path):
+    async def scenario():
+        manager = DatabaseManager(
+            str(tmp_path / "items.db"),
+            database_migrations_path=MIGRATIONS_PATH,
+            player_flush_interval=None,
+        )
+
+        async with manager:
+            inventories = manager.inventories
+            await inventories.add_items([(INVENTORY_ID, SWORD_ID, 1), (INVENTORY_ID, ARMOR_ID, 1)])
+
+            check_held = inventories._check_held
+
+            async def check_then_take(needed):
+                await check_held(needed)
+                # Another removal empties the swords between the check and the write
+                inventories._check_held = check_held
+                await inventories.remove_items([(INVENTORY_ID, SWORD_ID, 1)])
+
+            inventories._check_held = check_then_take
+
+            with pytest.raises(InsufficientItems):
+                await inventories.remove_items(
+                    [(INVENTORY_ID, SWORD_ID, 1), (INVENTORY_ID, ARMOR_ID, 1)]
+                )
+
+            assert await stored_items(manager) == {ARMOR_ID: 1}
+
+    asyncio.run(scenario())
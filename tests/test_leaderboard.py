@@ -0,0 +1,121 @@
+import asyncio
+import random
+
+import discord
+
+from custom.leaderboard import Leaderboard, LeaderboardPageSource, RankedIndex
+
+
+def brute_force_ranking(scores: dict) -> list:
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def test_ranked_index_matches_a_sorted_list():
+    rng = random.Random(1)
+    # A tiny load factor splits and merges buckets often
+    index = RankedIndex(load_factor=4)
+    reference = []
+
+    for step in range(3000):
+        if reference and rng.random() < 0.4:
+            key = rng.choice(reference)
+            index.remove(key)
+            reference.remove(key)
+        else:
+            key = rng.randint(-50, 50)
+            index.add(key)
+            reference.append(key)
+
+        reference.sort()
+
+        if step % 25 == 0:
+            assert list(index) == reference
+            assert len(index) == len(reference)
+
+            key = rng.randint(-60, 60)
+            assert index.rank(key) == sum(item < key for item in reference)
+            assert index.count_below(key) == sum(item <= key for item in reference)
+
+            start = rng.randint(0, len(reference))
+            stop = start + rng.randint(0, 20)
+            assert index.slice(start, stop) == reference[start:stop]
+
+    index.load(reference[::-1])
+    assert list(index) == reference
+
+
+def test_leaderboard_matches_brute_force():
+    rng = random.Random(2)
+    leaderboard = Leaderboard(load_factor=8)
+    players = {
+        user_id: {"level": rng.randint(1, 20), "experience": rng.randint(0, 500), "gold": rng.randint(0, 50)}
+        for user_id in range(1, 301)
+    }
+    leaderboard.load(
+        (user_id, fields["level"], fields["experience"], fields["gold"])
+        for user_id, fields in players.items()
+    )
+    source = LeaderboardPageSource(
+        leaderboard, "gold", lambda entries, index: discord.Embed(description=str(entries)), page_size=7
+    )
+
+    for step in range(2000):
+        roll = rng.random()
+        user_id = rng.randint(1, 400)
+
+        if roll < 0.6:
+            # Partial updates only move the given columns, unknown players need every column
+            fields = {"gold": rng.randint(0, 50)}
+            if user_id in players or rng.random() < 0.5:
+                fields.update(level=rng.randint(1, 20), experience=rng.randint(0, 500))
+
+            leaderboard.update(user_id, fields)
+            if user_id in players:
+                players[user_id].update(fields)
+            elif len(fields) == 3:
+                players[user_id] = fields
+
+        elif roll < 0.7:
+            leaderboard.remove(user_id)
+            players.pop(user_id, None)
+
+        if step % 50 == 0:
+            assert len(leaderboard) == len(players)
+
+            for column in ("level", "experience", "gold"):
+                expected = brute_force_ranking({user_id: fields[column] for user_id, fields in players.items()})
+                assert leaderboard.top(column, 0, len(players)) == expected
+
+                start = rng.randint(0, len(players))
+                assert leaderboard.top(column, start, 10) == expected[start : start + 10]
+
+                for rank, (ranked_id, score) in enumerate(expected[:20], start=1):
+                    assert leaderboard.rank(column, ranked_id) == rank
+                    assert leaderboard.count_above(column, score) == sum(
+                        other[column] > score for other in players.values()
+                    )
+
+            ranking = brute_force_ranking({user_id: fields["gold"] for user_id, fields in players.items()})
+            for position, (ranked_id, _) in enumerate(ranking[:30]):
+                assert source.page_of(ranked_id) == position // 7
+
+            assert source.page_of(10**6) == 0
+            assert leaderboard.rank("gold", 10**6) is None
+            assert source.page_count == max(-(-len(players) // 7), 1)
+
+
+def test_leaderboard_pages_read_the_live_ranking():
+    async def scenario():
+        leaderboard = Leaderboard()
+        leaderboard.load([(1, 1, 0, 10), (2, 1, 0, 30), (3, 1, 0, 20)])
+        source = LeaderboardPageSource(
+            leaderboard, "gold", lambda entries, index: discord.Embed(description=repr(entries)), page_size=2
+        )
+
+        assert (await source.get_page(0)).description == repr([(1, 2, 30), (2, 3, 20)])
+
+        leaderboard.update(1, {"gold": 50})
+        assert (await source.get_page(0)).description == repr([(1, 1, 50), (2, 2, 30)])
+        assert (await source.get_page(1)).description == repr([(3, 3, 20)])
+
+    asyncio.run(scenario())
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+
+import aiosqlite
+
+from custom.database import DatabaseManager
+from custom.migrations import MigrationRunner
+
+MIGRATIONS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "databases", "schemas", "migrations"
+)
+
+# The database schema.sql created before there were migrations
+BASELINE_SCHEMA = """
+CREATE TABLE players (
+    user_id INTEGER PRIMARY KEY UNIQUE,
+    level INTEGER NOT NULL DEFAULT 1,
+    experience INTEGER NOT NULL DEFAULT 0,
+    health INTEGER NOT NULL DEFAULT 100,
+    gold INTEGER NOT NULL DEFAULT 0,
+    class TEXT NOT NULL
+);
+
+CREATE TABLE inventories (
+    inventory_id INTEGER PRIMARY KEY UNIQUE,
+    CONSTRAINT fk_inventory_id FOREIGN KEY (inventory_id) REFERENCES players (user_id) ON DELETE CASCADE
+);
+
+INSERT INTO players (user_id, class) VALUES (1, 'Warrior');
+INSERT INTO inventories (inventory_id) VALUES (1);
+INSERT INTO players (user_id, class) VALUES (2, 'Elf');
+INSERT INTO inventories (inventory_id) VALUES (2);
+"""
+
+CHUNKED_MIGRATION = '''
+CHUNKED = True
+
+
+async def upgrade(context):
+    await context.run_chunked(
+        "UPDATE players SET gold = gold * 100 WHERE rowid BETWEEN ? AND ?", table="players", chunk_size=3
+    )
+'''
+
+
+def create_baseline(path: str) -> None:
+    with sqlite3.connect(path) as connection:
+        connection.executescript(BASELINE_SCHEMA)
+        connection.execute("INSERT INTO players (user_id, gold, class) VALUES (7, 55, 'Elf')")
+
+    connection.close()
+
+
+async def fetch_all(connection: aiosqlite.Connection, sql: str) -> list:
+    async with connection.execute(sql) as cursor:
+        return await cursor.fetchall()
+
+
+def test_baseline_database_is_upgraded(tmp_path):
+    path = str(tmp_path / "baseline.db")
+    create_baseline(path)
+
+    async def scenario():
+        manager = DatabaseManager(path, database_migrations_path=MIGRATIONS_PATH, player_flush_interval=None)
+
+        async with manager:
+            runner = MigrationRunner(MIGRATIONS_PATH)
+            latest = runner.discover()[-1].version
+
+            assert await runner.current_version(manager.connection) == latest
+            assert (await manager.get_player(7)).gold == 55
+            assert len(manager.items) == 8
+
+            # Running them again changes nothing
+            assert await runner.run(manager.connection) == []
+            assert await fetch_all(manager.connection, "SELECT COUNT(*) FROM players") == [(3,)]
+
+    asyncio.run(scenario())
+
+
+def test_dry_run_and_chunked_migrations(tmp_path):
+    migrations_path = tmp_path / "migrations"
+    shutil.copytree(MIGRATIONS_PATH, migrations_path)
+    (migrations_path / "0003_gold_cents.py").write_text(CHUNKED_MIGRATION, encoding="utf-8")
+
+    path = str(tmp_path / "baseline.db")
+    create_baseline(path)
+
+    async def scenario():
+        runner = MigrationRunner(str(migrations_path))
+
+        async with aiosqlite.connect(path) as connection:
+            # Only the first migration is run and rolled back, the others would need its changes
+            results = await runner.run(connection, dry_run=True)
+
+            assert [(result.migration.version, result.dry_run, result.skipped) for result in results] == [
+                (1, True, False),
+                (2, True, True),
+                (3, True, True),
+            ]
+            assert await runner.current_version(connection) == 0
+            assert await fetch_all(connection, "SELECT name FROM sqlite_master WHERE name = 'items'") == []
+
+            results = await runner.run(connection, target=2)
+            assert [result.migration.version for result in results] == [1, 2]
+            assert await runner.current_version(connection) == 2
+
+            # A chunked migration is skipped by dry runs, since it commits as it goes
+            assert [result.skipped for result in await runner.run(connection, dry_run=True)] == [True]
+
+            await runner.run(connection)
+            assert await runner.current_version(connection) == 3
+            assert await fetch_all(connection, "SELECT user_id, gold FROM players ORDER BY user_id") == [
+                (1, 0),
+                (2, 0),
+                (7, 5500),
+            ]
+            assert await runner.run(connection) == []
+
+    asyncio.run(scenario())
@@ -0,0 +1,113 @@
+import asyncio
+import os
+
+import pytest
+
+from custom.cache import PlayerCache, PlayerRecord
+from custom.database import DatabaseManager
+from custom.exceptions import InsufficientFunds
+
+# The initial migration already adds players 1 and 2
+SENDER_ID = 101
+RECEIVER_ID = 102
+
+MIGRATIONS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "databases", "schemas", "migrations"
+)
+
+
+async def seed_players(manager: DatabaseManager) -> None:
+    async with manager.transaction() as connection:
+        await connection.executemany(
+            "INSERT INTO players (user_id, gold, class) VALUES (?, 100, 'Warrior')",
+            [(SENDER_ID,), (RECEIVER_ID,)],
+        )
+
+
+async def stored_gold(manager: DatabaseManager, user_id: int) -> int:
+    async with manager.create_cursor() as cursor:
+        await cursor.execute("SELECT gold FROM players WHERE user_id = ?", (user_id,))
+        return (await cursor.fetchone())[0]
+
+
+async def stored_level(manager: DatabaseManager, user_id: int) -> int:
+    async with manager.create_cursor() as cursor:
+        await cursor.execute("SELECT level FROM players WHERE user_id = ?", (user_id,))
+        return (await cursor.fetchone())[0]
+
+
+def test_flush_keeps_committed_balances(tmp_path):
+    async def scenario():
+        manager = DatabaseManager(
+            str(tmp_path / "players.db"),
+            database_migrations_path=MIGRATIONS_PATH,
+            player_flush_interval=None,
+        )
+
+        async with manager:
+            await seed_players(manager)
+            stale = PlayerRecord(*(await manager.get_player(SENDER_ID)).to_row())
+
+            await manager.transactions.transfer(SENDER_ID, RECEIVER_ID, 40)
+            await manager.update_player(SENDER_ID, health=50)
+            await manager.flush_players()
+
+            assert await stored_gold(manager, SENDER_ID) == 60
+            assert await stored_gold(manager, RECEIVER_ID) == 140
+
+            # A stale copy written back doesn't revert the transfer either, in memory or on disk
+            stale.level = 7
+            await manager.save_player(stale)
+            await manager.flush_players()
+
+            cached = await manager.get_player(SENDER_ID)
+            assert (cached.gold, cached.level) == (60, 1)
+            assert await stored_gold(manager, SENDER_ID) == 60
+            assert await stored_level(manager, SENDER_ID) == 1
+
+            # So it can't be spent twice
+            with pytest.raises(InsufficientFunds):
+                await manager.transactions.transfer(SENDER_ID, RECEIVER_ID, 100)
+
+            assert await stored_gold(manager, SENDER_ID) + await stored_gold(manager, RECEIVER_ID) == 200
+
+    asyncio.run(scenario())
+
+
+def test_update_player_refuses_balances_and_level(tmp_path):
+    async def scenario():
+        manager = DatabaseManager(
+            str(tmp_path / "players.db"),
+            database_migrations_path=MIGRATIONS_PATH,
+            player_flush_interval=None,
+        )
+
+        async with manager:
+            await seed_players(manager)
+
+            for field in ("gold", "experience", "level"):
+                with pytest.raises(AttributeError):
+                    await manager.update_player(SENDER_ID, **{field: 50})
+
+            with pytest.raises(AttributeError):
+                await manager.transactions.apply({SENDER_ID: {"experience": 10}}, {SENDER_ID: {"level": 50}})
+
+            assert (await manager.get_player(SENDER_ID)).level == 1
+
+    asyncio.run(scenario())
+
+
+def test_evicted_records_stay_readable_until_committed():
+    cache = PlayerCache(max_size=1)
+    first = PlayerRecord(1, health=10)
+
+    cache.put(first, dirty=True)
+    cache.put(PlayerRecord(2))  # Evicts the dirty first record
+
+    records = cache.dirty_records()
+    cache.mark_clean(records)
+    assert cache.dirty_count == 0
+    assert 1 in cache
+
+    cache.release_evicted(records)
+    assert 1 not in cache
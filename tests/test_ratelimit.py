@@ -0,0 +1,86 @@
+import pytest
+
+from custom.ratelimit import RateLimit, RateLimiter
+
+USER_ID = 300000000000000000
+GUILD_ID = 400000000000000000
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_throttles_and_refills_lazily():
+    clock = Clock()
+    limiter = RateLimiter(RateLimit(3, 6.0), clock=clock)
+
+    assert [limiter.hit(USER_ID) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.hit(USER_ID) == pytest.approx(2.0)
+
+    # A token comes back every 2 seconds
+    clock.now += 1.0
+    assert limiter.hit(USER_ID) == pytest.approx(1.0)
+    clock.now += 1.0
+    assert limiter.hit(USER_ID) == 0.0
+    assert limiter.hit(USER_ID) == pytest.approx(2.0)
+
+    # Refills stop at the burst size
+    clock.now += 60.0
+    assert [limiter.hit(USER_ID) for _ in range(4)][-1] == pytest.approx(2.0)
+
+    # Other users have their own buckets
+    assert limiter.hit(USER_ID + 1) == 0.0
+    assert limiter.stats()["throttled"] == 4
+
+
+def test_scopes_follow_the_most_specific_limit():
+    clock = Clock()
+    limiter = RateLimiter(RateLimit(5, 10.0), clock=clock)
+    strict = RateLimit(1, 30.0)
+    limiter.set_limit(strict, command="daily")
+    limiter.set_limit(None, command="help")
+    limiter.set_limit(RateLimit(2, 10.0), command="daily", guild_id=GUILD_ID)
+
+    assert limiter.limit_for("daily", None) is strict
+    assert limiter.limit_for("help", GUILD_ID) is None
+    assert limiter.limit_for("shop", GUILD_ID, command_limit=strict) is strict
+
+    assert limiter.hit(USER_ID, "daily") == 0.0
+    assert limiter.hit(USER_ID, "daily") == pytest.approx(30.0)
+
+    # The guild override and the default have buckets of their own
+    assert limiter.hit(USER_ID, "daily", GUILD_ID) == 0.0
+    assert limiter.hit(USER_ID, "shop") == 0.0
+    assert all(limiter.hit(USER_ID, "help") == 0.0 for _ in range(20))
+    assert len(limiter) == 3
+
+
+def test_sweep_frees_refilled_buckets_and_compacts():
+    clock = Clock()
+    limiter = RateLimiter(RateLimit(2, 10.0), clock=clock)
+
+    for user_id in range(1, 101):
+        limiter.hit(user_id)
+
+    clock.now += 5.0
+    for user_id in range(1, 11):
+        limiter.hit(user_id)
+        limiter.hit(user_id)
+
+    # The 90 untouched buckets refilled, the 10 others are still empty
+    assert limiter.sweep() == 90
+    assert len(limiter) == 10
+    assert len(limiter._keys) == 10
+
+    # The kept buckets survived the compaction
+    assert limiter.hit(1) == pytest.approx(5.0)
+    assert limiter.hit(50) == 0.0
+
+    clock.now += 10.0
+    assert limiter.sweep() == 11
+    assert len(limiter) == 0
+    assert limiter.stats()["swept"] == 101
@@ -0,0 +1,117 @@
+import asyncio
+import datetime
+
+import pytest
+
+from custom.scheduler import CronSchedule, Scheduler
+
+
+def test_cron_next_run():
+    # 2023-03-01 is a Wednesday
+    moment = datetime.datetime(2023, 3, 1, 10, 7, 30)
+
+    assert CronSchedule("*/15 * * * *").next_after(moment) == datetime.datetime(2023, 3, 1, 10, 15)
+    assert CronSchedule("0 4 * * 1").next_after(moment) == datetime.datetime(2023, 3, 6, 4, 0)
+    assert CronSchedule("0 4 * * 7").next_after(moment) == datetime.datetime(2023, 3, 5, 4, 0)
+    assert CronSchedule("30 9 1 1 *").next_after(moment) == datetime.datetime(2024, 1, 1, 9, 30)
+    assert CronSchedule("0 0-5/2 * * *").next_after(moment) == datetime.datetime(2023, 3, 2, 0, 0)
+
+    # A matching minute is never returned again
+    assert CronSchedule("7 10 * * *").next_after(moment) == datetime.datetime(2023, 3, 2, 10, 7)
+
+
+def test_cron_day_or_weekday():
+    # Like cron, the 10th of the month or any Friday
+    schedule = CronSchedule("0 12 10 * 5")
+    moment = datetime.datetime(2023, 3, 1)
+    runs = []
+
+    for _ in range(4):
+        moment = schedule.next_after(moment)
+        runs.append(moment.day)
+
+    assert runs == [3, 10, 17, 24]
+
+
+def test_cron_invalid_expressions():
+    for expression in ("* * * *", "60 * * * *", "*/0 * * * *", "5-1 * * * *"):
+        with pytest.raises(ValueError):
+            CronSchedule(expression)
+
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 31 2 *").next_after(datetime.datetime(2023, 1, 1))
+
+
+def test_skip_if_running():
+    async def scenario():
+        scheduler = Scheduler()
+        started = {"skipping": 0, "waiting": 0}
+
+        def slow(name):
+            async def callback():
+                started[name] += 1
+                await asyncio.sleep(0.12)
+
+            return callback
+
+        skipping = scheduler.add_job(slow("skipping"), name="skipping", interval=0.02, run_immediately=True)
+        waiting = scheduler.add_job(
+            slow("waiting"), name="waiting", interval=0.02, run_immediately=True, skip_if_running=False
+        )
+        scheduler.start()
+        await asyncio.sleep(0.3)
+
+        assert skipping.running <= 1
+        assert skipping.skipped > 0
+        assert started["skipping"] == skipping.runs + skipping.running
+
+        # The runs wait for their turn instead, one at a time
+        assert waiting.skipped == 0
+        assert waiting.running > 1
+        assert started["waiting"] <= 3
+
+        await scheduler.close()
+        assert scheduler.jobs == {}
+
+    asyncio.run(scenario())
+
+
+def test_jobs_fire_in_order_and_owners_are_removed():
+    async def scenario():
+        scheduler = Scheduler()
+        owner = object()
+        fired = []
+        cancelled = asyncio.Event()
+
+        async def fast():
+            fired.append("fast")
+
+        async def slow():
+            fired.append("slow")
+
+        async def endless():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        scheduler.add_job(slow, interval=0.1)
+        scheduler.add_job(fast, interval=0.04, owner=owner)
+        scheduler.add_job(endless, interval=10, run_immediately=True, owner=owner)
+        scheduler.start()
+        await asyncio.sleep(0.15)
+
+        assert fired[:3] == ["fast", "fast", "slow"]
+
+        scheduler.remove_owner(owner)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert [job.name for job in scheduler.jobs.values()] == [slow.__qualname__]
+
+        count = fired.count("fast")
+        await asyncio.sleep(0.1)
+        assert fired.count("fast") == count
+
+        await scheduler.close()
+
+    asyncio.run(scenario())
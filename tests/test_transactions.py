@@ -0,0 +1,128 @@
+import asyncio
+import os
+import random
+
+import pytest
+
+from custom.cache import PlayerRecord
+from custom.database import DatabaseManager
+from custom.exceptions import InsufficientFunds, UserNotFoundError
+
+# The initial migration already adds players 1 and 2
+PLAYER_IDS = list(range(101, 121))
+
+MIGRATIONS_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "databases", "schemas", "migrations"
+)
+
+
+def create_manager(tmp_path) -> DatabaseManager:
+    return DatabaseManager(
+        str(tmp_path / "transactions.db"),
+        database_migrations_path=MIGRATIONS_PATH,
+        player_flush_interval=None,
+    )
+
+
+async def seed_players(manager: DatabaseManager) -> None:
+    async with manager.transaction() as connection:
+        await connection.executemany(
+            "INSERT INTO players (user_id, gold, class) VALUES (?, 100, 'Warrior')",
+            [(user_id,) for user_id in PLAYER_IDS],
+        )
+
+
+async def stored_balances(manager: DatabaseManager) -> dict:
+    async with manager.create_cursor() as cursor:
+        await cursor.execute(
+            "SELECT user_id, gold, experience FROM players WHERE user_id >= ?",
+            (PLAYER_IDS[0],),
+        )
+        return {user_id: (gold, experience) for user_id, gold, experience in await cursor.fetchall()}
+
+
+def test_failing_batch_changes_nothing(tmp_path):
+    async def scenario():
+        async with create_manager(tmp_path) as manager:
+            await seed_players(manager)
+            first, second, third = PLAYER_IDS[:3]
+            before = await stored_balances(manager)
+
+            with pytest.raises(InsufficientFunds):
+                await manager.transactions.apply(
+                    {first: {"gold": 50, "experience": 10}, second: {"gold": -150}},
+                    {third: {"health": 1}},
+                )
+
+            with pytest.raises(UserNotFoundError):
+                await manager.transactions.apply({first: {"gold": 50}, 999: {"gold": 50}})
+
+            assert await stored_balances(manager) == before
+            assert (await manager.get_player(first)).gold == 100
+            assert (await manager.get_player(third)).health == 100
+
+            players = await manager.transactions.apply(
+                {first: {"gold": -100, "experience": 1000}, second: {"gold": 100}}
+            )
+
+            assert (players[first].gold, players[second].gold) == (0, 200)
+            assert players[first].level == manager.transactions.level_curve.level_for(1000)
+            assert (await stored_balances(manager))[first] == (0, 1000)
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_transfers_keep_the_total_gold(tmp_path):
+    async def scenario():
+        async with create_manager(tmp_path) as manager:
+            await seed_players(manager)
+            # A player known only to the cache takes part too
+            await manager.save_player(PlayerRecord(100, gold=100, player_class="Warrior"))
+            user_ids = [100, *PLAYER_IDS]
+            rng = random.Random(4)
+
+            async def trade() -> None:
+                sender_id, receiver_id = rng.sample(user_ids, 2)
+                try:
+                    await manager.transactions.transfer(sender_id, receiver_id, rng.randint(1, 80))
+                except InsufficientFunds:
+                    pass
+
+            await asyncio.gather(*(trade() for _ in range(500)))
+            await manager.flush_players()
+
+            async with manager.create_cursor() as cursor:
+                await cursor.execute(
+                    "SELECT SUM(gold), MIN(gold) FROM players WHERE user_id >= 100"
+                )
+                total, lowest = await cursor.fetchone()
+
+            assert total == 100 * len(user_ids)
+            assert lowest >= 0
+            cached = [await manager.get_player(user_id) for user_id in user_ids]
+            assert sum(player.gold for player in cached) == total
+            assert manager.transactions.stats()["rejected"] > 0
+
+    asyncio.run(scenario())
+
+
+def test_deltas_apply_to_the_committed_balances(tmp_path):
+    async def scenario():
+        async with create_manager(tmp_path) as manager:
+            await seed_players(manager)
+            sender_id, receiver_id = PLAYER_IDS[:2]
+
+            # An out of date cached copy claims more gold than is stored
+            await manager.get_player(sender_id)
+            manager.player_cache.apply(sender_id, {"gold": 500})
+
+            with pytest.raises(InsufficientFunds):
+                await manager.transactions.transfer(sender_id, receiver_id, 300)
+
+            sender, receiver = await manager.transactions.transfer(sender_id, receiver_id, 40)
+
+            assert (sender.gold, receiver.gold) == (60, 140)
+            balances = await stored_balances(manager)
+            assert (balances[sender_id][0], balances[receiver_id][0]) == (60, 140)
+
+    asyncio.run(scenario())